@@ -0,0 +1,1572 @@
+"""
+NFL expert, game data, announcer report and Cedar chat endpoints.
+
+Everything here talks to Gemini through the LLM gateway. The app factory in
+``main.py`` leaves this module out of PDF-only workers. When it is loaded,
+the genai client is still only built on the first model call, and the
+caches, session store and job queue are opened on first use.
+"""
+import asyncio
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+from boot import REPORT, Lazy, is_ready
+from metrics import OUTPUT_BYTES, REGISTRY, stage_timer
+from llm_gateway import LLMGateway, LLMUnavailableError, llm_priority
+from rate_limiter import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
+from chat_context import ChatContextManager
+from session_store import ChatSessionStore
+from state_backend import default_state_backend
+from response_cache import ResponseCache, game_day, make_key
+from answer_cache import SemanticAnswerCache
+from single_flight import SingleFlight
+from job_queue import JobQueue, TERMINAL_STATUSES
+from prewarm import SlatePrewarmer, load_slate, normalize_game
+from prompt_templates import PromptRegistry
+from structured_output import StructuredOutputError, default_for, extract_json, parse_structured, validate
+
+router = APIRouter()
+
+def create_gemini_client():
+    """Build the Gemini client; the gateway calls this on its first model call"""
+    api_key = os.getenv("GENAI_API_KEY")
+    if not api_key:
+        raise ValueError("GENAI_API_KEY not found in .env file!")
+    with REPORT.phase("init gemini client", "lazy"):
+        from google import genai
+        return genai.Client(api_key=api_key)
+
+# Configs are given as dicts (GenerateContentConfigDict) so building them doesn't import the SDK.
+# Google Search grounding for game data and answers:
+config = {"tools": [{"google_search": {}}]}
+
+# Plain config (no search grounding) for internal housekeeping prompts
+summary_config = {}
+
+# Prompts are static prefixes plus a short per-request suffix so the provider can reuse cached prefixes
+prompts = PromptRegistry()
+
+# Every model call goes through the gateway so none of them block the event loop
+llm = LLMGateway(config=config, usage_observer=prompts.record_usage, client_factory=create_gemini_client)
+
+# State shared by every uvicorn worker: in-process by default, a SQLite file with STATE_BACKEND=sqlite
+state = Lazy("state", default_state_backend)
+
+def create_response_cache() -> ResponseCache:
+    cache = ResponseCache(
+        max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024")),
+        snapshot_path=os.getenv("RESPONSE_CACHE_SNAPSHOT") or None,
+        state=state
+    )
+    cache.load_snapshot()
+    return cache
+
+# Cache for per-game Gemini responses, TTL depends on the game's status
+response_cache = Lazy("response_cache", create_response_cache)
+
+# Concurrent requests for the same game share one prompt build and model call
+game_flights = SingleFlight("game")
+
+# Answers to rephrased repeats of NFL expert and standalone NFL chat questions
+answer_cache = SemanticAnswerCache(
+    threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.85")),
+    ttl=float(os.getenv("ANSWER_CACHE_TTL", "900")),
+    max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "512"))
+)
+
+# Pydantic models
+class PrewarmRequest(BaseModel):
+    games: List[Dict[str, Any]]  # API request shape or frontend game objects
+    concurrency: int = 3
+    rate_per_minute: float = 12
+    lead_minutes: Optional[float] = None  # warm each game this long before kickoff
+
+class NFLQuestionRequest(BaseModel):
+    question: str
+
+class QuarterbackStatsRequest(BaseModel):
+    game_id: str
+    away_team: str
+    home_team: str
+    league: str = "nfl"
+    status: Optional[str] = None  # "final", "live", "scheduled" or an ESPN status name
+
+class GameSummaryRequest(BaseModel):
+    game_id: str
+    away_team: str
+    home_team: str
+    league: str = "nfl"
+    date: Optional[str] = None
+    status: Optional[str] = None
+
+class GameDetailsRequest(BaseModel):
+    game_id: str
+    away_team: str
+    home_team: str
+    league: str = "nfl"
+    status: Optional[str] = None
+
+# Cedar Chat Models
+class ChatMessage(BaseModel):
+    id: str
+    role: str  # "user" or "assistant"
+    content: str
+    timestamp: str
+    session_id: str
+
+class ChatRequest(BaseModel):
+    message: str
+    session_id: str = None
+    context: str = "general"  # "general", "nfl", "pdf", etc.
+
+class ChatResponse(BaseModel):
+    message: ChatMessage
+    session_id: str
+    status: str = "success"
+
+# Cedar Chat storage: hot sessions in memory under a byte budget, every message written through to SQLite
+chat_sessions = Lazy("chat_sessions", lambda: ChatSessionStore(
+    db_path=os.getenv("CHAT_SESSIONS_DB", "data/chat_sessions.db") or None,
+    max_memory_bytes=int(float(os.getenv("CHAT_SESSIONS_MEMORY_MB", "64")) * 1024 * 1024),
+    idle_seconds=float(os.getenv("CHAT_SESSIONS_IDLE_SECONDS", "1800")),
+    retention_seconds=float(os.getenv("CHAT_SESSIONS_RETENTION_DAYS", "7")) * 86400,
+    shared=state.shared
+))
+
+prompts.register(
+    "chat-summary",
+    "Update the running summary of a conversation between a user and Cedar, an AI assistant. "
+    "Keep every fact, statistic, name and open question the user may refer back to; "
+    "drop greetings, formatting and repetition. Answer with the updated summary only, at most 150 words.\n\n",
+    "Current summary:\n{summary}\n\nNew messages:\n{turns}\n\nUpdated summary:"
+)
+
+async def summarize_chat_turns(previous_summary: Optional[str], messages: List[ChatMessage]) -> str:
+    """Fold older chat turns into the session's running summary"""
+    turns = "\n".join(f"{msg.role}: {msg.content}" for msg in messages)
+    prompt = prompts.render("chat-summary", summary=previous_summary or "(none yet)", turns=turns)
+    return await llm.generate(prompt, config=summary_config, priority=PRIORITY_BACKGROUND)
+
+# Recent turns verbatim, older ones folded into a per-session summary
+chat_context = ChatContextManager(
+    summarize_chat_turns,
+    chat_sessions,
+    token_budget=int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", "1500"))
+)
+
+# Cedar Chat helper functions
+def create_chat_session() -> str:
+    """Create a new chat session and return session ID"""
+    session_id = str(uuid.uuid4())
+    chat_sessions.create(session_id)
+    return session_id
+
+def add_message_to_session(session_id: str, role: str, content: str, context: Optional[str] = None) -> ChatMessage:
+    """Add a message to a chat session and mark the session as active"""
+    message = ChatMessage(
+        id=str(uuid.uuid4()),
+        role=role,
+        content=content,
+        timestamp=datetime.now().isoformat(),
+        session_id=session_id
+    )
+    
+    chat_sessions.append(session_id, (message.id, message.role, message.content, message.timestamp), context)
+    return message
+
+def get_chat_history(session_id: str) -> List[ChatMessage]:
+    """Get chat history for a session"""
+    # Stored messages were validated on the way in, skip validation on the way out
+    return [
+        ChatMessage.model_construct(id=message_id, role=role, content=content, timestamp=timestamp, session_id=session_id)
+        for message_id, role, content, timestamp in chat_sessions.messages(session_id)
+    ]
+
+def clear_chat_session(session_id: str) -> bool:
+    """Clear all messages from a chat session"""
+    # Clearing the session drops its summary too
+    return chat_sessions.clear(session_id)
+
+def add_assistant_reply(session_id: str, content: str) -> ChatMessage:
+    """Store Cedar's reply and let older turns roll into the session summary"""
+    message = add_message_to_session(session_id, "assistant", content)
+    chat_context.schedule_refresh(session_id, get_chat_history(session_id))
+    return message
+
+# Cedar system prompts per chat context. Everything that varies per request
+# goes into the suffix so the prefix stays byte-identical between calls.
+CEDAR_SYSTEM_PROMPTS = {
+    "nfl": """You are Cedar, an NFL expert assistant specializing in detailed statistical analysis and data-driven insights. 
+
+FORMATTING RULES:
+- Use # for headers instead of **bold text**
+- Use • for bullet points instead of * asterisks
+- Use numbered lists (1., 2., 3.) for sequential information
+- Use **bold** only for key statistics and important numbers
+- Never use standalone asterisks (*) for bullet points
+
+DATA FOCUS REQUIREMENTS:
+- Always include specific statistics, records, and numerical data
+- Provide current season stats, career milestones, and historical comparisons
+- Include percentages, rankings, and performance metrics
+- Mention specific games, dates, and achievements
+- Use concrete numbers rather than general statements
+
+IMPORTANT: Always provide concrete, factual information with specific data points. Never use phrases like "information not available", "would require further search", "assume they are", or any placeholder text.""",
+    "pdf": """You are Cedar, a PDF editing assistant. Help users with PDF annotation, editing, and document management.
+
+FORMATTING RULES:
+- Use # for headers instead of **bold text**
+- Use • for bullet points instead of * asterisks
+- Use numbered lists (1., 2., 3.) for sequential information
+
+IMPORTANT: Always provide concrete, actionable information. Never use phrases like "information not available", "would require further search", or any placeholder text.""",
+    "general": """You are Cedar, a helpful AI assistant focused on providing detailed, data-rich responses.
+
+FORMATTING RULES:
+- Use # for headers instead of **bold text**
+- Use • for bullet points instead of * asterisks
+- Use numbered lists (1., 2., 3.) for sequential information
+- Use **bold** only for key statistics and important numbers
+- Never use standalone asterisks (*) for bullet points
+
+DATA FOCUS REQUIREMENTS:
+- Always include specific statistics, metrics, and numerical data when relevant
+- Provide concrete examples and specific details
+- Include percentages, rankings, and performance indicators where applicable
+- Use concrete numbers rather than general statements
+
+IMPORTANT: Always provide concrete, factual information. Never use phrases like "information not available", "would require further search", "assume they are", "for this report we'll assume", or any placeholder text.""",
+}
+
+CEDAR_RESPONSE_GUIDELINES = """RESPONSE GUIDELINES:
+- Provide direct, factual answers with specific data points
+- Use clear, confident language with concrete numbers
+- Avoid disclaimers about data availability
+- Include statistics, percentages, rankings, and metrics
+- Use proper formatting: # for headers, • for bullets, **bold** for key stats
+- Never include phrases like "information not available" or "would require further search"
+- Focus on quantifiable information and measurable outcomes
+
+"""
+
+for _context, _system_prompt in CEDAR_SYSTEM_PROMPTS.items():
+    prompts.register(
+        f"chat-{_context}",
+        f"{_system_prompt}\n\n{CEDAR_RESPONSE_GUIDELINES}",
+        "Conversation history:\n{history}\n\nUser: {message}\nCedar:"
+    )
+
+def build_cedar_prompt(user_message: str, session_id: str, context: str = "general") -> str:
+    """Build the Cedar chat prompt from the system prompt and recent history"""
+    # Get chat history for context, trimmed to the token budget
+    history = get_chat_history(session_id)
+    conversation_context = chat_context.render_history(session_id, history, user_message)
+    template = f"chat-{context}" if context in CEDAR_SYSTEM_PROMPTS else "chat-general"
+    return prompts.render(template, history=conversation_context, message=user_message)
+
+def chat_answer_namespace(session_id: str, context: str) -> Optional[str]:
+    """Answer cache namespace for a chat turn, None if the answer depends on earlier turns"""
+    # Only the opening question of an NFL chat stands on its own
+    if context == "nfl" and len(get_chat_history(session_id)) <= 1:
+        return "chat-nfl"
+    return None
+
+async def cedar_chat_response(user_message: str, session_id: str, context: str = "general") -> str:
+    """Generate AI response using Gemini for Cedar chat"""
+    namespace = chat_answer_namespace(session_id, context)
+    if namespace:
+        cached = answer_cache.lookup(namespace, user_message)
+        if cached is not None:
+            return cached
+    prompt = build_cedar_prompt(user_message, session_id, context)
+    try:
+        response_text = (await llm.generate(prompt, priority=PRIORITY_INTERACTIVE)).strip()
+        if namespace:
+            answer_cache.store(namespace, user_message, response_text)
+        return response_text
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        return f"I apologize, but I'm having trouble processing your request right now. Error: {str(e)}"
+
+# ====================== Gemini NFL functions ======================
+# Per-game prompts describe the output schema generically in the static
+# prefix and name the game only in the suffix.
+GAME_PROMPT_SUFFIX = "Game ID: {game_id}\nLeague: {league}\nAway team: {away_team}\nHome team: {home_team}\n"
+
+# Response schemas the per-game JSON answers are validated against
+QUARTERBACK_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "quarterback_name": {"type": "string", "default": "Unknown"},
+        "completion_percentage": {"type": "number"},
+        "passing_yards": {"type": "integer"},
+        "completions": {"type": "integer"},
+        "attempts": {"type": "integer"},
+    },
+}
+QUARTERBACK_STATS_SCHEMA = {
+    "type": "object",
+    "properties": {"away_team": QUARTERBACK_SCHEMA, "home_team": QUARTERBACK_SCHEMA},
+}
+
+TEAM_SUMMARY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "score": {"type": "integer"},
+        "stats": {
+            "type": "object",
+            "properties": {
+                "totalYards": {"type": "integer"},
+                "passingYards": {"type": "integer"},
+                "rushingYards": {"type": "integer"},
+                "turnovers": {"type": "integer"},
+                "timeOfPossession": {"type": "string", "default": "00:00"},
+                "firstDowns": {"type": "integer"},
+                "penalties": {"type": "integer"},
+                "penaltyYards": {"type": "integer"},
+            },
+        },
+    },
+}
+GAME_SUMMARY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "gameInfo": {
+            "type": "object",
+            "properties": {
+                "gameId": {"type": "string"},
+                "awayTeam": {"type": "string"},
+                "homeTeam": {"type": "string"},
+                "league": {"type": "string"},
+            },
+        },
+        "awayTeam": TEAM_SUMMARY_SCHEMA,
+        "homeTeam": TEAM_SUMMARY_SCHEMA,
+        "players": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "string"},
+                    "name": {"type": "string"},
+                    "position": {"type": "string"},
+                    "team": {"type": "string"},
+                    "jersey": {"type": "string"},
+                    "gameStats": {"type": "object"},
+                },
+            },
+        },
+    },
+}
+
+GAME_DETAILS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "gameId": {"type": "string"},
+        "competitions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "competitors": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "homeAway": {"type": "string"},
+                                "score": {"type": "string", "default": "0"},
+                                "statistics": {"type": "array"},
+                            },
+                        },
+                    },
+                },
+            },
+        },
+        "status": {
+            "type": "object",
+            "properties": {
+                "type": {
+                    "type": "object",
+                    "properties": {"name": {"type": "string", "default": "STATUS_SCHEDULED"}},
+                },
+            },
+        },
+    },
+}
+
+prompts.register(
+    "nfl-expert",
+    "You are an NFL expert analyst. Provide detailed, accurate insights.\n\n",
+    "User question: {question}"
+)
+
+prompts.register(
+    "quarterback-stats",
+    "You are an NFL expert analyst. For the game described at the end of this prompt, "
+    "provide quarterback stats (completion %, passing yards, completions, attempts) in JSON format "
+    "with the following structure:\n"
+    "{\n"
+    '  "away_team": {"quarterback_name": "Name", "completion_percentage": 0.0, "passing_yards": 0, "completions": 0, "attempts": 0},\n'
+    '  "home_team": {"quarterback_name": "Name", "completion_percentage": 0.0, "passing_yards": 0, "completions": 0, "attempts": 0}\n'
+    "}\n"
+    "Return zeros if not available.\n\n",
+    GAME_PROMPT_SUFFIX
+)
+
+async def ask_nfl_expert(question: str) -> str:
+    cached = answer_cache.lookup("nfl-expert", question)
+    if cached is not None:
+        return cached
+    prompt = prompts.render("nfl-expert", question=question)
+    answer = await llm.generate(prompt, priority=PRIORITY_INTERACTIVE)
+    answer_cache.store("nfl-expert", question, answer)
+    return answer
+
+async def get_quarterback_stats(game_id: str, away_team: str, home_team: str, league: str = "nfl", status: Optional[str] = None) -> Dict[str, Any]:
+    cache_key = make_key("quarterback-stats", game_id, league, away_team, home_team)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    return await game_flights.run(
+        cache_key, lambda: _generate_quarterback_stats(cache_key, game_id, away_team, home_team, league, status)
+    )
+
+async def _generate_quarterback_stats(cache_key: str, game_id: str, away_team: str, home_team: str, league: str,
+                                      status: Optional[str]) -> Dict[str, Any]:
+    prompt = prompts.render("quarterback-stats", game_id=game_id, league=league.upper(),
+                            away_team=away_team, home_team=home_team)
+    try:
+        response_text = await llm.generate(prompt)
+        with stage_timer("json_parse"):
+            parsed = parse_structured(response_text, QUARTERBACK_STATS_SCHEMA)
+        # A cut-off or partly defaulted answer keeps its good parts but isn't worth caching
+        if parsed.cacheable(QUARTERBACK_STATS_SCHEMA["properties"]):
+            response_cache.set(cache_key, parsed.data, response_cache.resolve_status(game_id, league, status))
+        return parsed.data
+    except LLMUnavailableError:
+        raise
+    except Exception:
+        # Return default empty stats
+        return {
+            "away_team": {"quarterback_name": "Unknown", "completion_percentage": 0.0, "passing_yards": 0, "completions": 0, "attempts": 0},
+            "home_team": {"quarterback_name": "Unknown", "completion_percentage": 0.0, "passing_yards": 0, "completions": 0, "attempts": 0}
+        }
+
+# ====================== API Endpoints ======================
+async def llm_unavailable_handler(request, exc: LLMUnavailableError):
+    """Tell clients to back off instead of handing them zero-filled fallbacks"""
+    headers = {}
+    if exc.retry_after is not None:
+        headers["Retry-After"] = str(max(1, int(round(exc.retry_after))))
+    return JSONResponse(status_code=503, content={"detail": str(exc), "retry_after": exc.retry_after}, headers=headers)
+
+# Installed on the app by the factory (routers can't carry exception handlers)
+exception_handlers = {LLMUnavailableError: llm_unavailable_handler}
+
+@router.get("/debug/cache")
+async def debug_cache():
+    return {"response_cache": response_cache.stats(), "answer_cache": answer_cache.stats()}
+
+@router.get("/debug/llm")
+async def debug_llm():
+    return {"gateway": llm.stats(), "game_requests": game_flights.stats(), "chat_context": chat_context.stats(),
+            "chat_sessions": chat_sessions.stats(), "prompts": prompts.stats(), "state": state.stats()}
+
+def cache_lookup_samples():
+    # Scraping doesn't open stores that haven't been used yet
+    name = "boothbrain_cache_lookups_total"
+    if is_ready(response_cache):
+        response_stats = response_cache.stats()
+        yield name, {"cache": "response", "result": "hit"}, response_stats["hits"]
+        yield name, {"cache": "response", "result": "miss"}, response_stats["misses"]
+    for namespace, answer_stats in answer_cache.stats()["namespaces"].items():
+        yield name, {"cache": f"answer:{namespace}", "result": "hit"}, answer_stats["hits"]
+        yield name, {"cache": f"answer:{namespace}", "result": "miss"}, answer_stats["misses"]
+    if is_ready(chat_sessions):
+        session_stats = chat_sessions.stats()
+        yield name, {"cache": "chat_sessions", "result": "hit"}, session_stats["hits"]
+        yield name, {"cache": "chat_sessions", "result": "miss"}, session_stats["loads_from_disk"]
+    for flights in (game_flights, llm.flights):
+        flight_stats = flights.stats()
+        yield name, {"cache": f"single_flight:{flight_stats['name']}", "result": "hit"}, flight_stats["collapsed"]
+        yield name, {"cache": f"single_flight:{flight_stats['name']}", "result": "miss"}, flight_stats["executions"]
+
+def in_flight_samples():
+    name = "boothbrain_in_flight"
+    for flights in (game_flights, llm.flights):
+        yield name, {"component": f"single_flight:{flights.name}"}, flights.stats()["in_flight"]
+    for priority, waiting in llm.limiter.stats()["waiting"].items():
+        yield name, {"component": f"llm_rate_limiter:{priority}"}, waiting
+    if is_ready(report_jobs):
+        for status, count in report_jobs.counts().items():
+            if status not in TERMINAL_STATUSES:
+                yield name, {"component": f"report_jobs:{status}"}, count
+
+def llm_event_samples():
+    gateway_stats = llm.stats()
+    name = "boothbrain_llm_events_total"
+    yield name, {"event": "retry"}, gateway_stats["retries"]
+    yield name, {"event": "upstream_error"}, gateway_stats["upstream_errors"]
+    yield name, {"event": "rate_limit_timeout"}, gateway_stats["rate_limiter"]["timeouts"]
+    yield name, {"event": "breaker_rejected"}, gateway_stats["circuit_breaker"]["rejected"]
+
+REGISTRY.add_collector("boothbrain_cache_lookups_total", "counter",
+                       "Cache, session store and request-coalescing lookups by result", cache_lookup_samples)
+REGISTRY.add_collector("boothbrain_in_flight", "gauge",
+                       "Coalesced requests, rate-limited model calls and report jobs in progress", in_flight_samples)
+REGISTRY.add_collector("boothbrain_llm_events_total", "counter",
+                       "Model gateway retries, upstream errors, rate-limit timeouts and breaker rejections", llm_event_samples)
+REGISTRY.add_collector("boothbrain_llm_breaker_open", "gauge", "1 while the model circuit breaker is open or probing",
+                       lambda: [("boothbrain_llm_breaker_open", {}, 0 if llm.breaker.state == "closed" else 1)])
+
+@router.post("/ask-nfl-expert")
+async def ask_nfl_expert_endpoint(request: NFLQuestionRequest):
+    try:
+        answer = await ask_nfl_expert(request.question)
+        return {"answer": answer, "question": request.question}
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/quarterback-stats")
+async def get_quarterback_stats_endpoint(request: QuarterbackStatsRequest):
+    try:
+        stats = await get_quarterback_stats(request.game_id, request.away_team, request.home_team, request.league, request.status)
+        return {"game_id": request.game_id, "away_team": request.away_team, "home_team": request.home_team, "league": request.league, "quarterback_stats": stats}
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+prompts.register(
+    "game-summary",
+    "You are an NFL expert analyst. For the game described at the end of this prompt, "
+    "please provide a comprehensive game summary including player statistics, team performance, and key moments. "
+    "Return the data in JSON format with the following structure:\n"
+    "{\n"
+    '  "gameInfo": {\n'
+    '    "gameId": "<Game ID>",\n'
+    '    "awayTeam": "<Away team>",\n'
+    '    "homeTeam": "<Home team>",\n'
+    '    "league": "<league, lowercase>"\n'
+    "  },\n"
+    '  "awayTeam": {\n'
+    '    "score": 0,\n'
+    '    "stats": {\n'
+    '      "totalYards": 0,\n'
+    '      "passingYards": 0,\n'
+    '      "rushingYards": 0,\n'
+    '      "turnovers": 0,\n'
+    '      "timeOfPossession": "00:00",\n'
+    '      "firstDowns": 0,\n'
+    '      "penalties": 0,\n'
+    '      "penaltyYards": 0\n'
+    "    }\n"
+    "  },\n"
+    '  "homeTeam": {\n'
+    '    "score": 0,\n'
+    '    "stats": {\n'
+    '      "totalYards": 0,\n'
+    '      "passingYards": 0,\n'
+    '      "rushingYards": 0,\n'
+    '      "turnovers": 0,\n'
+    '      "timeOfPossession": "00:00",\n'
+    '      "firstDowns": 0,\n'
+    '      "penalties": 0,\n'
+    '      "penaltyYards": 0\n'
+    "    }\n"
+    "  },\n"
+    '  "players": [\n'
+    '    {\n'
+    '      "id": "player-1",\n'
+    '      "name": "Player Name",\n'
+    '      "position": "QB",\n'
+    '      "team": "<Away team or Home team>",\n'
+    '      "jersey": "12",\n'
+    '      "gameStats": {\n'
+    '        "passingYards": 0,\n'
+    '        "passingTDs": 0,\n'
+    '        "rushingYards": 0,\n'
+    '        "tackles": 0\n'
+    "      }\n"
+    "    }\n"
+    "  ]\n"
+    "}\n"
+    "If the game hasn't started yet or data is not available, return zeros for all statistics.\n\n",
+    GAME_PROMPT_SUFFIX
+)
+
+async def get_game_summary(game_id: str, away_team: str, home_team: str, league: str = "nfl",
+                           date: Optional[str] = None, status: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Get comprehensive game summary using Gemini AI.
+    Results are cached per game with a TTL based on the game's status.
+    """
+    cache_key = make_key("game-summary", game_id, league, away_team, home_team)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    return await game_flights.run(
+        cache_key, lambda: _generate_game_summary(cache_key, game_id, away_team, home_team, league, date, status)
+    )
+
+async def _generate_game_summary(cache_key: str, game_id: str, away_team: str, home_team: str, league: str,
+                                 date: Optional[str], status: Optional[str]) -> Dict[str, Any]:
+    prompt = prompts.render("game-summary", game_id=game_id, league=league.upper(),
+                            away_team=away_team, home_team=home_team)
+
+    try:
+        response_text = await llm.generate(prompt)
+        
+        # Extract and validate the JSON, keeping whichever sections came back intact
+        try:
+            with stage_timer("json_parse"):
+                parsed = parse_structured(response_text, GAME_SUMMARY_SCHEMA)
+            summary_data = parsed.data
+            if "gameInfo" not in parsed.valid_sections:
+                summary_data["gameInfo"] = {"gameId": game_id, "awayTeam": away_team, "homeTeam": home_team, "league": league}
+            if parsed.cacheable(GAME_SUMMARY_SCHEMA["properties"]):
+                response_cache.set(cache_key, summary_data, response_cache.resolve_status(game_id, league, status, date))
+            return summary_data
+        except StructuredOutputError:
+            # If JSON parsing fails, return a structured response
+            return {
+                "gameInfo": {
+                    "gameId": game_id,
+                    "awayTeam": away_team,
+                    "homeTeam": home_team,
+                    "league": league
+                },
+                "awayTeam": {
+                    "score": 0,
+                    "stats": {
+                        "totalYards": 0,
+                        "passingYards": 0,
+                        "rushingYards": 0,
+                        "turnovers": 0,
+                        "timeOfPossession": "00:00",
+                        "firstDowns": 0,
+                        "penalties": 0,
+                        "penaltyYards": 0
+                    }
+                },
+                "homeTeam": {
+                    "score": 0,
+                    "stats": {
+                        "totalYards": 0,
+                        "passingYards": 0,
+                        "rushingYards": 0,
+                        "turnovers": 0,
+                        "timeOfPossession": "00:00",
+                        "firstDowns": 0,
+                        "penalties": 0,
+                        "penaltyYards": 0
+                    }
+                },
+                "players": []
+            }
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        print(f"Error getting game summary: {e}")
+        return {
+            "gameInfo": {
+                "gameId": game_id,
+                "awayTeam": away_team,
+                "homeTeam": home_team,
+                "league": league
+            },
+            "awayTeam": {"score": 0, "stats": {}},
+            "homeTeam": {"score": 0, "stats": {}},
+            "players": []
+        }
+
+prompts.register(
+    "game-details",
+    "You are an NFL expert analyst. For the game described at the end of this prompt, "
+    "please provide detailed game information including play-by-play highlights, key moments, and comprehensive statistics. "
+    "Return the data in JSON format with the following structure:\n"
+    "{\n"
+    '  "gameId": "<Game ID>",\n'
+    '  "competitions": [\n'
+    '    {\n'
+    '      "competitors": [\n'
+    '        {\n'
+    '          "homeAway": "away",\n'
+    '          "score": "0",\n'
+    '          "statistics": [\n'
+    '            {\n'
+    '              "label": "Total Yards",\n'
+    '              "stats": [{"label": "Total Yards", "value": "0"}]\n'
+    "            }\n"
+    "          ]\n"
+    "        },\n"
+    '        {\n'
+    '          "homeAway": "home",\n'
+    '          "score": "0",\n'
+    '          "statistics": [\n'
+    '            {\n'
+    '              "label": "Total Yards",\n'
+    '              "stats": [{"label": "Total Yards", "value": "0"}]\n'
+    "            }\n"
+    "          ]\n"
+    "        }\n"
+    "      ]\n"
+    "    }\n"
+    "  ],\n"
+    '  "status": {\n'
+    '    "type": {\n'
+    '      "name": "STATUS_SCHEDULED"\n'
+    "    }\n"
+    "  }\n"
+    "}\n"
+    "If the game hasn't started yet or data is not available, return zeros for all statistics.\n\n",
+    GAME_PROMPT_SUFFIX
+)
+
+async def get_game_details(game_id: str, away_team: str, home_team: str, league: str = "nfl",
+                           status: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Get detailed game information using Gemini AI.
+    Results are cached per game with a TTL based on the game's status.
+    """
+    cache_key = make_key("game-details", game_id, league, away_team, home_team)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    return await game_flights.run(
+        cache_key, lambda: _generate_game_details(cache_key, game_id, away_team, home_team, league, status)
+    )
+
+async def _generate_game_details(cache_key: str, game_id: str, away_team: str, home_team: str, league: str,
+                                 status: Optional[str]) -> Dict[str, Any]:
+    prompt = prompts.render("game-details", game_id=game_id, league=league.upper(),
+                            away_team=away_team, home_team=home_team)
+
+    try:
+        response_text = await llm.generate(prompt)
+        
+        # Extract and validate the JSON, keeping whichever sections came back intact
+        try:
+            with stage_timer("json_parse"):
+                parsed = parse_structured(response_text, GAME_DETAILS_SCHEMA)
+            details_data = parsed.data
+            if not details_data["gameId"]:
+                details_data["gameId"] = game_id
+            # The details payload carries the game status, remember it for the other endpoints
+            if "status" in parsed.valid_sections:
+                response_cache.record_status(game_id, league, details_data["status"]["type"]["name"])
+            if parsed.cacheable(GAME_DETAILS_SCHEMA["properties"]):
+                response_cache.set(cache_key, details_data, response_cache.resolve_status(game_id, league, status))
+            return details_data
+        except StructuredOutputError:
+            # If JSON parsing fails, return a structured response
+            return {
+                "gameId": game_id,
+                "competitions": [{
+                    "competitors": [
+                        {
+                            "homeAway": "away",
+                            "score": "0",
+                            "statistics": [{"label": "Total Yards", "stats": [{"label": "Total Yards", "value": "0"}]}]
+                        },
+                        {
+                            "homeAway": "home", 
+                            "score": "0",
+                            "statistics": [{"label": "Total Yards", "stats": [{"label": "Total Yards", "value": "0"}]}]
+                        }
+                    ]
+                }],
+                "status": {"type": {"name": "STATUS_SCHEDULED"}}
+            }
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        print(f"Error getting game details: {e}")
+        return {
+            "gameId": game_id,
+            "competitions": [{"competitors": []}],
+            "status": {"type": {"name": "STATUS_SCHEDULED"}}
+        }
+
+@router.post("/game-summary")
+async def get_game_summary_endpoint(request: GameSummaryRequest):
+    """Get comprehensive game summary using Gemini AI"""
+    try:
+        summary = await get_game_summary(request.game_id, request.away_team, request.home_team, request.league,
+                                         request.date, request.status)
+        return {
+            "game_id": request.game_id,
+            "away_team": request.away_team,
+            "home_team": request.home_team,
+            "league": request.league,
+            "game_summary": summary
+        }
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting game summary: {str(e)}")
+
+@router.post("/game-details")
+async def get_game_details_endpoint(request: GameDetailsRequest):
+    """Get detailed game information using Gemini AI"""
+    try:
+        details = await get_game_details(request.game_id, request.away_team, request.home_team, request.league, request.status)
+        return {
+            "game_id": request.game_id,
+            "away_team": request.away_team,
+            "home_team": request.home_team,
+            "league": request.league,
+            "game_details": details
+        }
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting game details: {str(e)}")
+
+async def generate_announcer_report(game_id: str, away_team: str, home_team: str, league: str = "nfl", date: str = None) -> Dict[str, Any]:
+    """
+    Generate a comprehensive 3-page announcer report using Gemini AI.
+    This report is designed to reduce research time for football announcers.
+    Complete reports are cached and concurrent requests for the same game
+    and date share a single generation.
+    """
+    date = game_day(date) or date
+    cache_key = make_key("announcer-report", game_id, league, away_team, home_team) + f"|{date or ''}"
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    async def _generate_and_cache():
+        report = await _generate_announcer_report(game_id, away_team, home_team, league, date)
+        if "error" not in report:
+            response_cache.set(cache_key, report, response_cache.resolve_status(game_id, league, date=date))
+        return report
+    
+    return await game_flights.run(cache_key, _generate_and_cache)
+
+async def get_announcer_report_pdf(game_id: str, away_team: str, home_team: str, league: str = "nfl",
+                                   date: Optional[str] = None,
+                                   progress: Optional[Callable[[int, str], None]] = None) -> Tuple[Dict[str, Any], Optional[str]]:
+    """Return the announcer report and its PDF path, reusing a previously built PDF"""
+    date = game_day(date) or date
+    cache_key = make_key("announcer-pdf", game_id, league, away_team, home_team) + f"|{date or ''}"
+    cached = response_cache.get(cache_key)
+    if cached is not None and cached["pdf_path"] and os.path.exists(cached["pdf_path"]):
+        return cached["data"], cached["pdf_path"]
+    
+    async def _build():
+        report = await generate_announcer_report(game_id, away_team, home_team, league, date)
+        if progress:
+            progress(70, "building pdf")
+        # reportlab is synchronous, keep it off the event loop
+        loop = asyncio.get_running_loop()
+        pdf_path = await loop.run_in_executor(None, generate_announcer_pdf, report, game_id, away_team, home_team)
+        if pdf_path and "error" not in report:
+            response_cache.set(cache_key, {"data": report, "pdf_path": pdf_path},
+                               response_cache.resolve_status(game_id, league, date=date))
+        return report, pdf_path
+    
+    return await game_flights.run(cache_key, _build)
+
+# Each report page is generated on its own so the pages run concurrently and
+# a bad page can be retried without regenerating the others.
+REPORT_SECTION_ATTEMPTS = 2
+
+def announcer_report_sections(is_future_game: bool) -> List[Dict[str, Any]]:
+    """Page layout of the announcer report: title, research checklist and JSON fields"""
+    return [
+        {
+            "key": "page1",
+            "title": "Team Overview & Recent Form",
+            "checklist": [
+                "Current season records and standings",
+                "Recent performance trends (last 5 games)",
+                "Key team statistics and rankings",
+                "Injury reports and roster updates",
+                "Weather conditions and venue information",
+                "Key storylines and what to expect in this matchup" if is_future_game else "Recent game highlights and key moments",
+            ],
+            "fields": ["awayTeamRecord", "homeTeamRecord", "awayTeamRecentForm", "homeTeamRecentForm",
+                       "keyStatistics", "injuryReports", "weatherVenue"],
+        },
+        {
+            "key": "page2",
+            "title": "Key Players & Matchups",
+            "checklist": [
+                "Star players to watch on both teams",
+                "Key positional matchups to highlight",
+                "Player statistics and recent performances",
+                "Rookie players or breakout stars",
+                "Coaching strategies and tendencies",
+                "Players to watch for potential breakout performances" if is_future_game else "Standout performances from recent games",
+            ],
+            "fields": ["awayTeamStars", "homeTeamStars", "keyMatchups", "playerStatistics",
+                       "rookiesBreakouts", "coachingStrategies"],
+        },
+        {
+            "key": "page3",
+            "title": "Game Narrative & Talking Points",
+            "checklist": [
+                "Historical rivalry context (if applicable)",
+                "Playoff implications and stakes",
+                "Storylines and narratives for broadcast",
+                "Key statistics to reference during the game",
+                "Potential game-changing moments to watch for",
+                "Predictions and what to expect in this matchup" if is_future_game else "Key moments and turning points from recent games",
+            ],
+            "fields": ["rivalryContext", "playoffImplications", "storylines", "keyStatistics", "gameChangingMoments"],
+        },
+    ]
+
+def report_template_name(page_number: int, is_future_game: bool) -> str:
+    return f"announcer-report-page{page_number}-{'upcoming' if is_future_game else 'recent'}"
+
+# One template per page and game timing, the game itself is only named in the suffix
+for _is_future_game in (True, False):
+    _report_intro = (
+        f"You are an expert NFL analyst creating a comprehensive 3-page announcer report for the "
+        f"{'upcoming' if _is_future_game else 'recent'} game described at the end of this prompt. "
+        "This report is specifically designed for football announcers to reduce their research time. "
+        "All information must be current and relevant to this specific match. "
+        f"{'Since this is a future game, focus on current season performance, recent trends, and what to expect in this matchup.' if _is_future_game else 'Focus on recent performance and current season context.'}\n\n"
+    )
+    for _number, _section in enumerate(announcer_report_sections(_is_future_game), start=1):
+        _checklist = "".join(f"- {item}\n" for item in _section["checklist"])
+        _schema = ",\n".join(f'  "{field}": "string"' for field in _section["fields"])
+        prompts.register(
+            report_template_name(_number, _is_future_game),
+            f"{_report_intro}"
+            f"Write PAGE {_number} of the report - {_section['title'].upper()}:\n"
+            f"{_checklist}\n"
+            f"Return only this page as JSON with the following structure:\n"
+            f"{{\n{_schema}\n}}\n\n",
+            GAME_PROMPT_SUFFIX + "Game date: {date}\n"
+        )
+
+class ReportSectionError(ValueError):
+    """A report page that failed validation; ``page`` holds the best partial version, if any"""
+
+    def __init__(self, message: str, page: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.page = page
+
+def report_section_schema(section: Dict[str, Any]) -> Dict[str, Any]:
+    return {"type": "object", "properties": {field: {"type": "string"} for field in section["fields"]}}
+
+async def _generate_report_section(game: Dict[str, str], section: Dict[str, Any], page_number: int,
+                                   is_future_game: bool) -> Dict[str, Any]:
+    """Generate one page of the announcer report, retrying only this page on failure"""
+    prompt = prompts.render(report_template_name(page_number, is_future_game), **game)
+    schema = report_section_schema(section)
+    
+    last_error = None
+    best_page, best_fields = None, 0
+    for attempt in range(1, REPORT_SECTION_ATTEMPTS + 1):
+        try:
+            response_text = await llm.generate(prompt)
+            with stage_timer("json_parse"):
+                section_data, complete, repairs = extract_json(response_text)
+                # Accept the page wrapped in its key as well as the bare object
+                if isinstance(section_data, dict) and isinstance(section_data.get(section["key"]), dict):
+                    section_data = section_data[section["key"]]
+                parsed = validate(section_data, schema, complete, repairs)
+            page = {"title": section["title"]}
+            page.update({field: parsed.data[field] for field in section["fields"]})
+            if len(parsed.valid_sections) == len(section["fields"]):
+                return page
+            if len(parsed.valid_sections) > best_fields:
+                best_page, best_fields = page, len(parsed.valid_sections)
+            missing = [field for field in section["fields"] if field not in parsed.valid_sections]
+            raise ValueError(f"missing fields {', '.join(missing)}")
+        except LLMUnavailableError:
+            # Retrying won't help while the model is rate limited or the circuit is open
+            raise
+        except Exception as e:
+            last_error = e
+            print(f"Announcer report {section['key']} attempt {attempt} failed: {e}")
+    raise ReportSectionError(f"Failed to generate {section['key']}: {last_error}", best_page)
+
+async def _generate_announcer_report(game_id: str, away_team: str, home_team: str, league: str, date: Optional[str]) -> Dict[str, Any]:
+    current_date = datetime.now().strftime("%Y-%m-%d")
+    game_date = date if date else current_date
+    
+    # Determine if this is a future game
+    is_future_game = False
+    if date:
+        try:
+            game_datetime = datetime.strptime(date, "%Y-%m-%d")
+            current_datetime = datetime.now()
+            is_future_game = game_datetime > current_datetime
+        except:
+            pass
+    
+    game = {"game_id": game_id, "league": league.upper(), "away_team": away_team, "home_team": home_team, "date": game_date}
+    sections = announcer_report_sections(is_future_game)
+    section_status = response_cache.resolve_status(game_id, league, date=date)
+
+    async def _section(section: Dict[str, Any], number: int) -> Dict[str, Any]:
+        # Pages that came out complete are cached on their own, so a retry only regenerates the failed ones
+        key = (make_key("announcer-report-section", game_id, league, away_team, home_team)
+               + f"|{date or ''}|{report_template_name(number, is_future_game)}")
+        page = response_cache.get(key)
+        if page is None:
+            page = await _generate_report_section(game, section, number, is_future_game)
+            response_cache.set(key, page, section_status)
+        return page
+
+    results = await asyncio.gather(
+        *[_section(section, number) for number, section in enumerate(sections, start=1)],
+        return_exceptions=True
+    )
+    
+    report_data = {
+        "gameInfo": {
+            "gameId": game_id,
+            "awayTeam": away_team,
+            "homeTeam": home_team,
+            "league": league,
+            "date": game_date
+        }
+    }
+    errors = []
+    for section, result in zip(sections, results):
+        if isinstance(result, LLMUnavailableError):
+            raise result
+        if isinstance(result, Exception):
+            print(f"Error generating announcer report: {result}")
+            errors.append(str(result))
+            # Keep the fields that did come back, or at least an empty page, so the PDF still builds
+            if isinstance(result, ReportSectionError) and result.page is not None:
+                report_data[section["key"]] = result.page
+            else:
+                report_data[section["key"]] = {"title": section["title"], **default_for(report_section_schema(section))}
+        else:
+            report_data[section["key"]] = result
+    
+    if errors:
+        report_data["error"] = "; ".join(errors)
+    return report_data
+
+@router.post("/generate-announcer-report")
+async def generate_announcer_report_endpoint(request: GameSummaryRequest):
+    """Generate comprehensive 3-page announcer report using Gemini AI"""
+    try:
+        report, pdf_path = await get_announcer_report_pdf(
+            request.game_id, request.away_team, request.home_team, request.league, request.date
+        )
+        
+        return {
+            "success": True,
+            "data": report,
+            "pdf_path": pdf_path
+        }
+    except LLMUnavailableError as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "retry_after": e.retry_after
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+def generate_announcer_pdf(report_data, game_id, away_team, home_team):
+    """Generate a PDF from the announcer report data"""
+    try:
+        from reportlab.lib.pagesizes import letter
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.units import inch
+        
+        # Create PDF filename
+        pdf_filename = f"announcer_report_{away_team}_vs_{home_team}_{game_id}.pdf"
+        pdf_path = f"processed/{pdf_filename}"
+        
+        # Ensure processed directory exists
+        os.makedirs("processed", exist_ok=True)
+        
+        # Create PDF document
+        doc = SimpleDocTemplate(pdf_path, pagesize=letter)
+        styles = getSampleStyleSheet()
+        
+        # Create custom styles
+        title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=16,
+            spaceAfter=30,
+            alignment=1  # Center alignment
+        )
+        
+        heading_style = ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontSize=14,
+            spaceAfter=12,
+            spaceBefore=20
+        )
+        
+        body_style = ParagraphStyle(
+            'CustomBody',
+            parent=styles['Normal'],
+            fontSize=11,
+            spaceAfter=6,
+            leftIndent=20
+        )
+        
+        # Build PDF content
+        story = []
+        
+        # Title page
+        story.append(Paragraph(f"ANNOUNCER REPORT", title_style))
+        story.append(Paragraph(f"{away_team} vs {home_team}", title_style))
+        story.append(Paragraph(f"Date: {report_data['gameInfo']['date']}", styles['Normal']))
+        story.append(Paragraph(f"League: {report_data['gameInfo']['league'].upper()}", styles['Normal']))
+        story.append(Paragraph(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']))
+        story.append(Spacer(1, 0.5*inch))
+        story.append(PageBreak())
+        
+        # Page 1 - Team Overview
+        page1 = report_data['page1']
+        story.append(Paragraph(f"PAGE 1: {page1['title']}", heading_style))
+        story.append(Spacer(1, 12))
+        
+        story.append(Paragraph(f"<b>{away_team} Record:</b>", heading_style))
+        story.append(Paragraph(page1['awayTeamRecord'], body_style))
+        story.append(Spacer(1, 12))
+        
+        story.append(Paragraph(f"<b>{home_team} Record:</b>", heading_style))
+        story.append(Paragraph(page1['homeTeamRecord'], body_style))
+        story.append(Spacer(1, 12))
+        
+        story.append(Paragraph(f"<b>{away_team} Recent Form:</b>", heading_style))
+        story.append(Paragraph(page1['awayTeamRecentForm'], body_style))
+        story.append(Spacer(1, 12))
+        
+        story.append(Paragraph(f"<b>{home_team} Recent Form:</b>", heading_style))
+        story.append(Paragraph(page1['homeTeamRecentForm'], body_style))
+        story.append(Spacer(1, 12))
+        
+        story.append(Paragraph("<b>Key Statistics:</b>", heading_style))
+        story.append(Paragraph(page1['keyStatistics'], body_style))
+        story.append(Spacer(1, 12))
+        
+        story.append(Paragraph("<b>Injury Reports:</b>", heading_style))
+        story.append(Paragraph(page1['injuryReports'], body_style))
+        story.append(Spacer(1, 12))
+        
+        story.append(Paragraph("<b>Weather & Venue:</b>", heading_style))
+        story.append(Paragraph(page1['weatherVenue'], body_style))
+        story.append(PageBreak())
+        
+        # Page 2 - Key Players
+        page2 = report_data['page2']
+        story.append(Paragraph(f"PAGE 2: {page2['title']}", heading_style))
+        story.append(Spacer(1, 12))
+        
+        story.append(Paragraph(f"<b>{away_team} Star Players:</b>", heading_style))
+        story.append(Paragraph(page2['awayTeamStars'], body_style))
+        story.append(Spacer(1, 12))
+        
+        story.append(Paragraph(f"<b>{home_team} Star Players:</b>", heading_style))
+        story.append(Paragraph(page2['homeTeamStars'], body_style))
+        story.append(Spacer(1, 12))
+        
+        story.append(Paragraph("<b>Key Matchups:</b>", heading_style))
+        story.append(Paragraph(page2['keyMatchups'], body_style))
+        story.append(Spacer(1, 12))
+        
+        story.append(Paragraph("<b>Player Statistics:</b>", heading_style))
+        story.append(Paragraph(page2['playerStatistics'], body_style))
+        story.append(Spacer(1, 12))
+        
+        story.append(Paragraph("<b>Rookies & Breakout Stars:</b>", heading_style))
+        story.append(Paragraph(page2['rookiesBreakouts'], body_style))
+        story.append(Spacer(1, 12))
+        
+        story.append(Paragraph("<b>Coaching Strategies:</b>", heading_style))
+        story.append(Paragraph(page2['coachingStrategies'], body_style))
+        story.append(PageBreak())
+        
+        # Page 3 - Game Narrative
+        page3 = report_data['page3']
+        story.append(Paragraph(f"PAGE 3: {page3['title']}", heading_style))
+        story.append(Spacer(1, 12))
+        
+        story.append(Paragraph("<b>Rivalry Context:</b>", heading_style))
+        story.append(Paragraph(page3['rivalryContext'], body_style))
+        story.append(Spacer(1, 12))
+        
+        story.append(Paragraph("<b>Playoff Implications:</b>", heading_style))
+        story.append(Paragraph(page3['playoffImplications'], body_style))
+        story.append(Spacer(1, 12))
+        
+        story.append(Paragraph("<b>Storylines:</b>", heading_style))
+        story.append(Paragraph(page3['storylines'], body_style))
+        story.append(Spacer(1, 12))
+        
+        story.append(Paragraph("<b>Key Statistics for Broadcast:</b>", heading_style))
+        story.append(Paragraph(page3['keyStatistics'], body_style))
+        story.append(Spacer(1, 12))
+        
+        story.append(Paragraph("<b>Game-Changing Moments to Watch:</b>", heading_style))
+        story.append(Paragraph(page3['gameChangingMoments'], body_style))
+        story.append(Spacer(1, 12))
+        
+        story.append(Paragraph("End of Report - Generated by BoothBrain AI", styles['Normal']))
+        
+        # Build PDF
+        with stage_timer("report_build"):
+            doc.build(story)
+        OUTPUT_BYTES.labels("report_build").inc(os.path.getsize(pdf_path))
+        
+        return pdf_path
+        
+    except Exception as e:
+        print(f"Error generating PDF: {e}")
+        return None
+
+# ====================== Announcer report jobs ======================
+async def run_announcer_report_job(job: Dict[str, Any], progress) -> Dict[str, Any]:
+    """Job handler: generate the announcer report and render it to PDF"""
+    llm_priority.set(PRIORITY_BACKGROUND)
+    request = job["payload"]
+    progress(10, "generating report")
+    report, pdf_path = await get_announcer_report_pdf(
+        request["game_id"], request["away_team"], request["home_team"], request["league"], request.get("date"),
+        progress=progress
+    )
+    if "error" in report:
+        raise ValueError(report["error"])
+    if not pdf_path:
+        raise ValueError("Failed to build the announcer report PDF")
+    
+    return {
+        "data": report,
+        "pdf_path": pdf_path,
+        "pdf_url": f"/processed/{os.path.basename(pdf_path)}"
+    }
+
+report_jobs = Lazy("report_jobs", lambda: JobQueue(
+    os.getenv("REPORT_JOBS_DB", "data/report_jobs.db"),
+    run_announcer_report_job,
+    kind="announcer-report",
+    workers=int(os.getenv("REPORT_JOB_WORKERS", "2")),
+    retention_seconds=float(os.getenv("JOB_RETENTION_HOURS", "168")) * 3600
+))
+
+def report_job_response(job: Dict[str, Any]) -> Dict[str, Any]:
+    response = {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "stage": job["stage"],
+        "error": job["error"],
+        "request": job["payload"],
+        "status_url": f"/announcer-report-jobs/{job['job_id']}",
+        "events_url": f"/announcer-report-jobs/{job['job_id']}/events"
+    }
+    if job["result"]:
+        response.update(job["result"])
+    return response
+
+@router.post("/announcer-report-jobs")
+async def submit_announcer_report_job(request: GameSummaryRequest):
+    """Queue announcer report + PDF generation and return a job id right away"""
+    dedupe_key = make_key("announcer-report", request.game_id, request.league, request.away_team, request.home_team)
+    job = report_jobs.submit(request.model_dump(), dedupe_key=f"{dedupe_key}|{request.date or ''}")
+    response = report_job_response(job)
+    response["deduplicated"] = job["deduplicated"]
+    return response
+
+@router.get("/announcer-report-jobs/{job_id}")
+async def get_announcer_report_job(job_id: str):
+    """Poll the status and progress of an announcer report job"""
+    job = report_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return report_job_response(job)
+
+@router.get("/announcer-report-jobs/{job_id}/events")
+async def stream_announcer_report_job(job_id: str):
+    """Stream announcer report job progress as Server-Sent Events"""
+    if report_jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def event_stream():
+        last_seen = None
+        while True:
+            job = report_jobs.get(job_id)
+            if job is None:
+                yield sse_event("error", {"detail": "Job not found"})
+                return
+            snapshot = (job["status"], job["progress"], job["stage"])
+            if snapshot != last_seen:
+                last_seen = snapshot
+                yield sse_event("progress", report_job_response(job))
+            if job["status"] in TERMINAL_STATUSES:
+                yield sse_event("done", report_job_response(job))
+                return
+            await asyncio.sleep(0.5)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# ====================== Slate prewarming ======================
+prewarm_state: Dict[str, Any] = {"prewarmer": None, "task": None}
+
+# Only one worker runs a prewarm at a time; the lease is renewed while it runs and expires if that worker dies
+PREWARM_LEASE_SECONDS = 60.0
+
+async def warm_game_in_process(game: Dict[str, Any]):
+    """Fill the response cache with a game's summary, announcer report and PDF"""
+    llm_priority.set(PRIORITY_BACKGROUND)
+    _summary, (report, pdf_path) = await asyncio.gather(
+        get_game_summary(game["game_id"], game["away_team"], game["home_team"], game["league"], game.get("date")),
+        get_announcer_report_pdf(game["game_id"], game["away_team"], game["home_team"], game["league"], game.get("date"))
+    )
+    if "error" in report or not pdf_path:
+        raise ValueError(report.get("error", "Failed to build the announcer report PDF"))
+
+def start_prewarm(games: List[Dict[str, Any]], concurrency: int = 3, rate_per_minute: float = 12,
+                  lead_minutes: Optional[float] = None) -> SlatePrewarmer:
+    prewarmer = SlatePrewarmer(
+        warm_game_in_process,
+        concurrency=concurrency,
+        rate_per_minute=rate_per_minute,
+        progress_path=os.getenv("PREWARM_PROGRESS", "data/prewarm_progress.json"),
+        lead_minutes=lead_minutes
+    )
+    prewarm_state["prewarmer"] = prewarmer
+    prewarm_state["task"] = asyncio.create_task(run_prewarm(prewarmer, games))
+    return prewarmer
+
+def claim_prewarm() -> bool:
+    return state.set_if_absent("prewarm", "lease", {"pid": os.getpid(), "summary": None}, PREWARM_LEASE_SECONDS)
+
+async def run_prewarm(prewarmer: SlatePrewarmer, games: List[Dict[str, Any]]):
+    async def renew_lease():
+        while True:
+            await asyncio.sleep(PREWARM_LEASE_SECONDS / 3)
+            state.set("prewarm", "lease", {"pid": os.getpid(), "summary": prewarmer.summary()}, PREWARM_LEASE_SECONDS)
+
+    renewer = asyncio.create_task(renew_lease())
+    try:
+        return await prewarmer.run(games)
+    finally:
+        renewer.cancel()
+        state.set("prewarm", "summary", prewarmer.summary())
+        state.delete("prewarm", "lease")
+
+async def schedule_slate_prewarm():
+    slate_file = os.getenv("PREWARM_SLATE_FILE")
+    if not slate_file:
+        return
+    try:
+        games = load_slate(slate_file)
+    except (OSError, ValueError) as e:
+        print(f"Skipping slate prewarm, could not load {slate_file}: {e}")
+        return
+    if not claim_prewarm():
+        print("Skipping slate prewarm, another worker is already running it")
+        return
+    lead_minutes = os.getenv("PREWARM_LEAD_MINUTES")
+    start_prewarm(games, lead_minutes=float(lead_minutes) if lead_minutes else None)
+    print(f"Scheduled prewarm for {len(games)} games from {slate_file}")
+
+@router.post("/prewarm")
+async def prewarm_slate(request: PrewarmRequest):
+    """Start warming announcer reports and game summaries for a slate of games"""
+    try:
+        games = [normalize_game(game) for game in request.games]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not claim_prewarm():
+        raise HTTPException(status_code=409, detail="A prewarm run is already in progress")
+    start_prewarm(games, request.concurrency, request.rate_per_minute, request.lead_minutes)
+    return {"message": "Prewarm started", "games": len(games)}
+
+@router.get("/prewarm")
+async def prewarm_status():
+    """Progress of the current or last prewarm run"""
+    prewarmer = prewarm_state["prewarmer"]
+    task = prewarm_state["task"]
+    if prewarmer is not None and task is not None and not task.done():
+        return {"running": True, "summary": prewarmer.summary()}
+    # The run may belong to another worker
+    lease = state.get("prewarm", "lease")
+    if lease is not None:
+        return {"running": True, "summary": lease["summary"]}
+    return {"running": False, "summary": state.get("prewarm", "summary")}
+
+# ====================== Cedar Chat API Endpoints ======================
+@router.post("/chat", response_model=ChatResponse)
+async def cedar_chat(request: ChatRequest):
+    """Main Cedar chat endpoint"""
+    try:
+        # Create session if not provided
+        session_id = request.session_id or create_chat_session()
+        
+        # Add user message to session
+        user_message = add_message_to_session(session_id, "user", request.message, request.context)
+        
+        # Generate AI response
+        ai_response = await cedar_chat_response(request.message, session_id, request.context)
+        
+        # Add AI response to session
+        assistant_message = add_assistant_reply(session_id, ai_response)
+        
+        return ChatResponse(
+            message=assistant_message,
+            session_id=session_id,
+            status="success"
+        )
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/chat/stream")
+async def cedar_chat_stream(request: ChatRequest):
+    """Streaming Cedar chat endpoint, sends the answer as SSE token events"""
+    session_id = request.session_id or create_chat_session()
+    add_message_to_session(session_id, "user", request.message, request.context)
+    namespace = chat_answer_namespace(session_id, request.context)
+    cached = answer_cache.lookup(namespace, request.message) if namespace else None
+    prompt = build_cedar_prompt(request.message, session_id, request.context) if cached is None else None
+    
+    async def event_stream():
+        chunks = []
+        completed = False
+        try:
+            yield sse_event("session", {"session_id": session_id})
+            if cached is not None:
+                chunks.append(cached)
+                yield sse_event("token", {"text": cached})
+            else:
+                try:
+                    async for text in llm.stream(prompt, priority=PRIORITY_INTERACTIVE):
+                        chunks.append(text)
+                        yield sse_event("token", {"text": text})
+                    if namespace:
+                        answer_cache.store(namespace, request.message, "".join(chunks).strip())
+                except Exception as e:
+                    chunks = [f"I apologize, but I'm having trouble processing your request right now. Error: {str(e)}"]
+                    yield sse_event("error", {"detail": chunks[0]})
+            
+            assistant_message = add_assistant_reply(session_id, "".join(chunks).strip())
+            completed = True
+            yield sse_event("done", {"message": assistant_message.model_dump(), "session_id": session_id})
+        finally:
+            # Client went away mid-stream: keep what was generated so the history stays paired
+            if not completed and chunks:
+                add_assistant_reply(session_id, "".join(chunks).strip())
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/chat-history/{session_id}")
+async def get_chat_history_endpoint(session_id: str):
+    """Get chat history for a session"""
+    try:
+        history = get_chat_history(session_id)
+        return {
+            "session_id": session_id,
+            "messages": history,
+            "message_count": len(history)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving chat history: {str(e)}")
+
+@router.post("/chat/new-session")
+async def create_new_chat_session():
+    """Create a new chat session"""
+    try:
+        session_id = create_chat_session()
+        return {
+            "session_id": session_id,
+            "message": "New chat session created successfully"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error creating session: {str(e)}")
+
+@router.delete("/chat/{session_id}")
+async def clear_chat_session_endpoint(session_id: str):
+    """Clear all messages from a chat session"""
+    try:
+        success = clear_chat_session(session_id)
+        if success:
+            return {"message": "Chat session cleared successfully", "session_id": session_id}
+        else:
+            raise HTTPException(status_code=404, detail="Session not found")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error clearing session: {str(e)}")
+
+def parse_activity_time(value: Optional[str]) -> Optional[float]:
+    """Accept a UNIX timestamp or an ISO 8601 datetime for the activity window"""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid time: {value}")
+
+@router.get("/chat/sessions")
+async def list_chat_sessions(limit: int = 50, cursor: Optional[str] = None, context: Optional[str] = None,
+                             active_since: Optional[str] = None, active_before: Optional[str] = None,
+                             include_total: bool = False):
+    """List chat sessions, most recently active first, one page at a time"""
+    if limit < 1 or limit > 500:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 500")
+    since = parse_activity_time(active_since)
+    until = parse_activity_time(active_before)
+    try:
+        sessions, next_cursor = chat_sessions.page_sessions(limit, cursor, context, since, until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    for session in sessions:
+        session["last_activity"] = datetime.fromtimestamp(session["last_activity"]).isoformat()
+    response = {"sessions": sessions, "next_cursor": next_cursor}
+    if include_total:
+        # Counting visits every matching session, so only on request
+        response["total_sessions"] = chat_sessions.count_sessions(context, since, until)
+    return response
+
+# ====================== Lifespan ======================
+async def startup():
+    """Called from the app's lifespan: resume queued report jobs and schedule the slate prewarm"""
+    report_jobs.start()
+    await schedule_slate_prewarm()
+
+async def shutdown():
+    await report_jobs.stop()
+    if is_ready(response_cache):
+        response_cache.save_snapshot()
+    llm.shutdown()
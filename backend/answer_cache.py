@@ -0,0 +1,224 @@
+"""
+Local similarity cache for free-form NFL questions.
+
+Game-day traffic asks the same things in many phrasings ("who's the Vikings
+QB", "vikings starting quarterback?"). Questions are normalized (case,
+contractions, football abbreviations, filler words), turned into TF-IDF
+vectors over words and character trigrams, and matched against earlier
+questions through an in-process inverted index. A stored answer is reused
+when cosine similarity clears the threshold and the entry is still fresh.
+Questions naming different numbers (seasons, weeks, jerseys), asking about
+a different time ("who was" vs "who is") or negated differently never match.
+"""
+import math
+import re
+import time
+from collections import Counter, OrderedDict, deque
+from typing import Any, Dict, Optional, Set
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+SYNONYMS = {
+    "qb": "quarterback", "qbs": "quarterback", "quarterbacks": "quarterback",
+    "rb": "running back", "rbs": "running back", "wr": "wide receiver", "wrs": "wide receiver",
+    "te": "tight end", "dc": "defensive coordinator", "oc": "offensive coordinator",
+    "td": "touchdown", "tds": "touchdown", "touchdowns": "touchdown", "int": "interception", "ints": "interception",
+    "yds": "yards", "yd": "yards", "stat": "statistics", "stats": "statistics", "vs": "versus", "v": "versus",
+}
+
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "be", "who", "what", "whats", "which", "how", "do", "does",
+    "of", "for", "to", "in", "on", "at", "and", "me", "tell", "please", "can", "could", "you", "i", "about",
+    "current", "currently", "starting", "right", "now", "this", "s", "many", "much", "has", "have", "get", "got",
+}
+
+# Words that change what a question is about are folded onto a marker that has to match exactly
+MARKERS = {
+    "was": "past", "were": "past", "did": "past", "had": "past", "last": "past", "previous": "past",
+    "former": "past", "will": "future", "next": "future", "upcoming": "future",
+    "not": "not", "no": "not", "never": "not", "without": "not",
+}
+_MARKER_WORDS = frozenset(MARKERS.values())
+
+
+def normalize_question(text: str) -> str:
+    text = text.lower().replace("’", "'")
+    text = re.sub(r"n't\b", " not", text)
+    text = re.sub(r"'ll\b", " will", text)
+    text = re.sub(r"'(s|re|ll|ve|d)\b", "", text)
+    words = []
+    for token in _TOKEN.findall(text):
+        token = SYNONYMS.get(token, token)
+        for word in token.split():
+            if word in MARKERS:
+                words.append(MARKERS[word])
+                continue
+            if word in STOPWORDS:
+                continue
+            # Crude plural folding so "vikings"/"viking" and "yards"/"yard" line up
+            if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+                word = word[:-1]
+            words.append(word)
+    return " ".join(words)
+
+
+def question_guards(normalized: str) -> frozenset:
+    """Numbers and tense/negation markers; questions only match when these are identical"""
+    return frozenset(word for word in normalized.split() if word.isdigit() or word in _MARKER_WORDS)
+
+
+def question_features(normalized: str) -> Counter:
+    features = Counter(f"w:{word}" for word in normalized.split())
+    padded = f" {normalized} "
+    features.update(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return features
+
+
+class _Entry:
+    __slots__ = ("question", "answer", "features", "guards", "expires_at")
+
+    def __init__(self, question: str, answer: str, features: Counter, guards: frozenset, expires_at: float):
+        self.question = question
+        self.answer = answer
+        self.features = features
+        self.guards = guards
+        self.expires_at = expires_at
+
+
+class _Namespace:
+    def __init__(self):
+        self.entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self.postings: Dict[str, Set[int]] = {}
+        self.doc_freq: Counter = Counter()
+        self.hits = 0
+        self.misses = 0
+
+
+class SemanticAnswerCache:
+    """Per-namespace nearest-neighbour answer cache with TTLs and LRU eviction"""
+
+    def __init__(self, threshold: float = 0.85, ttl: float = 900.0, max_entries: int = 512,
+                 ttls: Optional[Dict[str, float]] = None, latency_window: int = 1000):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.ttls = dict(ttls or {})
+        self.max_entries = max_entries
+        self._namespaces: Dict[str, _Namespace] = {}
+        self._next_id = 0
+        self._latencies: deque = deque(maxlen=latency_window)
+        # Best similarity seen on misses, in 0.1 buckets, to help tune the threshold
+        self.miss_scores: Counter = Counter()
+
+    def _namespace(self, name: str) -> _Namespace:
+        namespace = self._namespaces.get(name)
+        if namespace is None:
+            namespace = self._namespaces[name] = _Namespace()
+        return namespace
+
+    def _remove(self, namespace: _Namespace, entry_id: int):
+        entry = namespace.entries.pop(entry_id)
+        for feature in entry.features:
+            postings = namespace.postings.get(feature)
+            if postings is not None:
+                postings.discard(entry_id)
+                if not postings:
+                    del namespace.postings[feature]
+            namespace.doc_freq[feature] -= 1
+            if namespace.doc_freq[feature] <= 0:
+                del namespace.doc_freq[feature]
+
+    def _similarity(self, namespace: _Namespace, query: Counter, entry: _Entry) -> float:
+        total = len(namespace.entries) + 1
+        dot = query_norm = entry_norm = 0.0
+        for feature, count in query.items():
+            idf = math.log(total / (namespace.doc_freq.get(feature, 0) + 1)) + 1
+            weight = count * idf
+            query_norm += weight * weight
+            if feature in entry.features:
+                dot += weight * entry.features[feature] * idf
+        for feature, count in entry.features.items():
+            idf = math.log(total / (namespace.doc_freq.get(feature, 0) + 1)) + 1
+            entry_norm += (count * idf) ** 2
+        if not dot:
+            return 0.0
+        return dot / math.sqrt(query_norm * entry_norm)
+
+    def lookup(self, namespace_name: str, question: str) -> Optional[str]:
+        """Return a fresh stored answer for a sufficiently similar question"""
+        started = time.perf_counter()
+        namespace = self._namespace(namespace_name)
+        normalized = normalize_question(question)
+        features = question_features(normalized)
+        guards = question_guards(normalized)
+        now = time.time()
+
+        # Candidates share at least one word with the question
+        candidates: Set[int] = set()
+        for feature in features:
+            if feature.startswith("w:"):
+                candidates.update(namespace.postings.get(feature, ()))
+
+        best_id, best_score = None, 0.0
+        for entry_id in candidates:
+            entry = namespace.entries[entry_id]
+            if entry.expires_at <= now:
+                self._remove(namespace, entry_id)
+                continue
+            if entry.guards != guards:
+                continue
+            score = self._similarity(namespace, features, entry)
+            if score > best_score:
+                best_id, best_score = entry_id, score
+
+        self._latencies.append(time.perf_counter() - started)
+        if best_id is not None and best_score >= self.threshold:
+            namespace.hits += 1
+            namespace.entries.move_to_end(best_id)
+            return namespace.entries[best_id].answer
+        namespace.misses += 1
+        self.miss_scores[f"{math.floor(best_score * 10) / 10:.1f}"] += 1
+        return None
+
+    def store(self, namespace_name: str, question: str, answer: str):
+        namespace = self._namespace(namespace_name)
+        normalized = normalize_question(question)
+        if not normalized or not answer:
+            return
+        features = question_features(normalized)
+        guards = question_guards(normalized)
+        ttl = self.ttls.get(namespace_name, self.ttl)
+        entry_id = self._next_id
+        self._next_id += 1
+        namespace.entries[entry_id] = _Entry(question, answer, features, guards, time.time() + ttl)
+        for feature in features:
+            namespace.postings.setdefault(feature, set()).add(entry_id)
+            namespace.doc_freq[feature] += 1
+        while len(namespace.entries) > self.max_entries:
+            self._remove(namespace, next(iter(namespace.entries)))
+
+    def clear(self, namespace_name: Optional[str] = None):
+        if namespace_name is None:
+            self._namespaces.clear()
+        else:
+            self._namespaces.pop(namespace_name, None)
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+        namespaces = {}
+        for name, namespace in self._namespaces.items():
+            lookups = namespace.hits + namespace.misses
+            namespaces[name] = {
+                "entries": len(namespace.entries),
+                "ttl_seconds": self.ttls.get(name, self.ttl),
+                "hits": namespace.hits,
+                "misses": namespace.misses,
+                "hit_rate": round(namespace.hits / lookups, 4) if lookups else 0.0,
+            }
+        return {
+            "threshold": self.threshold,
+            "max_entries_per_namespace": self.max_entries,
+            "namespaces": namespaces,
+            "lookup_ms_avg": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+            "lookup_ms_p95": round(latencies[int(len(latencies) * 0.95)] * 1000, 3) if latencies else 0.0,
+            "miss_best_similarity": dict(sorted(self.miss_scores.items())),
+        }
@@ -0,0 +1,136 @@
+"""
+Worker boot timing and lazy initialisation.
+
+Importing google-genai alone takes over a second, and the backend used to
+build every store, client and cache at import time. Heavy modules are now
+imported through ``lazy_import`` and subsystems are wrapped in ``Lazy`` so
+they are built on first use. Every import and initialisation, eager or
+lazy, is recorded in ``REPORT``, which the app prints once it is ready and
+serves from ``GET /debug/startup``.
+"""
+import importlib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Boot phases: "import" (module imports), "init" (app factory and lifespan startup),
+# "lazy" (work deferred to first use, recorded whenever it happens)
+PHASE_KINDS = ("import", "init", "lazy")
+
+
+class BootReport:
+    """Wall-clock cost of each import and initialisation step of this worker"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.ready_at: Optional[float] = None
+        self.phases: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def record(self, name: str, kind: str, seconds: float):
+        with self._lock:
+            self.phases.append({
+                "name": name,
+                "kind": kind,
+                "ms": round(seconds * 1000, 1),
+                "start_ms": round((time.perf_counter() - seconds - self.started) * 1000, 1),
+                "thread": threading.current_thread().name,
+            })
+
+    @contextmanager
+    def phase(self, name: str, kind: str = "init") -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, kind, time.perf_counter() - started)
+
+    def mark_ready(self):
+        self.ready_at = time.perf_counter()
+
+    def totals(self) -> Dict[str, float]:
+        with self._lock:
+            phases = list(self.phases)
+        return {kind: round(sum(p["ms"] for p in phases if p["kind"] == kind), 1) for kind in PHASE_KINDS}
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            phases = list(self.phases)
+        ready_ms = round((self.ready_at - self.started) * 1000, 1) if self.ready_at is not None else None
+        return {"ready_ms": ready_ms, "totals_ms": self.totals(), "phases": phases}
+
+    def summary(self) -> str:
+        report = self.as_dict()
+        totals = report["totals_ms"]
+        slowest = sorted((p for p in report["phases"] if p["kind"] != "lazy"), key=lambda p: p["ms"], reverse=True)[:5]
+        breakdown = ", ".join(f"{p['name']} {p['ms']:.0f} ms" for p in slowest)
+        return (f"Worker ready in {report['ready_ms']:.0f} ms "
+                f"(imports {totals['import']:.0f} ms, init {totals['init']:.0f} ms; slowest: {breakdown})")
+
+
+REPORT = BootReport()
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access"""
+
+    __slots__ = ("_lazy_name", "_lazy_module", "_lazy_lock")
+
+    def __init__(self, name: str):
+        self._lazy_name = name
+        self._lazy_module = None
+        self._lazy_lock = threading.Lock()
+
+    def __getattr__(self, attr: str) -> Any:
+        module = self._lazy_module
+        if module is None:
+            with self._lazy_lock:
+                if self._lazy_module is None:
+                    with REPORT.phase(f"import {self._lazy_name}", "lazy"):
+                        self._lazy_module = importlib.import_module(self._lazy_name)
+                module = self._lazy_module
+        return getattr(module, attr)
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+class Lazy:
+    """Builds ``factory()`` the first time one of its attributes is used and forwards to it
+
+    Only attribute access is forwarded (``obj.method()``), not operators
+    such as ``len(obj)`` or ``key in obj``.
+    """
+
+    __slots__ = ("_lazy_name", "_lazy_factory", "_lazy_value", "_lazy_lock")
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self._lazy_name = name
+        self._lazy_factory = factory
+        self._lazy_value = None
+        self._lazy_lock = threading.Lock()
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(resolve(self), attr)
+
+    def __repr__(self) -> str:
+        state = "ready" if self._lazy_value is not None else "not initialised"
+        return f"<Lazy {self._lazy_name} ({state})>"
+
+
+def resolve(lazy: Lazy) -> Any:
+    """The object behind ``lazy``, building it now if needed"""
+    value = lazy._lazy_value
+    if value is None:
+        with lazy._lazy_lock:
+            if lazy._lazy_value is None:
+                with REPORT.phase(f"init {lazy._lazy_name}", "lazy"):
+                    lazy._lazy_value = lazy._lazy_factory()
+            value = lazy._lazy_value
+    return value
+
+
+def is_ready(lazy: Lazy) -> bool:
+    return lazy._lazy_value is not None
@@ -0,0 +1,156 @@
+"""
+Token-budgeted conversation context for Cedar chat.
+
+Recent turns are kept verbatim while they fit the budget. Older turns are
+folded into a rolling per-session summary that is updated incrementally in
+the background after a reply, so building a prompt never waits on the model
+and a session's summary is never recomputed from scratch.
+
+Summaries are kept by the session store next to the session itself, so
+they share its memory budget, eviction and expiry, and every worker using
+a shared store sees the same summary.
+"""
+import asyncio
+import re
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set
+
+# summarize(previous_summary, messages) -> updated summary
+Summarizer = Callable[[Optional[str], Sequence[Any]], Awaitable[str]]
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)"""
+    return (len(text) + 3) // 4
+
+
+def _normalize(text: str) -> str:
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+
+class SessionSummary:
+    __slots__ = ("text", "covered")
+
+    def __init__(self, text: str, covered: int):
+        self.text = text
+        self.covered = covered  # number of leading messages folded into the summary
+
+
+class ChatContextManager:
+    """Builds the conversation block of a chat prompt within a token budget"""
+
+    def __init__(self, summarize: Summarizer, store: Any, token_budget: int = 1500,
+                 min_recent_messages: int = 2, keep_recent_messages: int = 6, summary_batch: int = 4,
+                 legacy_window: int = 10):
+        self.summarize = summarize
+        # Anything with summary(session_id) and set_summary(session_id, text, covered), e.g. ChatSessionStore
+        self.store = store
+        self.token_budget = token_budget
+        self.min_recent_messages = min_recent_messages
+        self.keep_recent_messages = keep_recent_messages
+        self.summary_batch = summary_batch
+        self.legacy_window = legacy_window
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.prompts = 0
+        self.legacy_tokens = 0
+        self.context_tokens = 0
+        self.summaries_generated = 0
+        self.summary_failures = 0
+
+    def _summary_for(self, session_id: str, message_count: int) -> Optional[SessionSummary]:
+        stored = self.store.summary(session_id)
+        if stored is None or stored[1] > message_count:
+            # None yet, or the session was cleared since the summary was written
+            return None
+        return SessionSummary(*stored)
+
+    def render_history(self, session_id: str, messages: Sequence[Any], user_message: str) -> str:
+        """Summary of older turns plus as many verbatim recent turns as the budget allows"""
+        self.prompts += 1
+        self.legacy_tokens += sum(estimate_tokens(f"{m.role}: {m.content}\n") for m in messages[-self.legacy_window:])
+
+        # The prompt restates the new user message, don't send it twice
+        if messages and messages[-1].role == "user" and messages[-1].content == user_message:
+            messages = messages[:-1]
+
+        summary = self._summary_for(session_id, len(messages))
+        uncovered = messages[summary.covered:] if summary else messages
+        budget = self.token_budget - (estimate_tokens(summary.text) if summary else 0)
+
+        recent: List[str] = []
+        seen = set()
+        used = 0
+        for message in reversed(uncovered):
+            # Repeated questions/answers add nothing the model hasn't already got
+            fingerprint = (message.role, _normalize(message.content))
+            if fingerprint in seen:
+                continue
+            line = f"{message.role}: {message.content}"
+            cost = estimate_tokens(line) + 1
+            if len(recent) >= self.min_recent_messages and used + cost > budget:
+                break
+            seen.add(fingerprint)
+            recent.append(line)
+            used += cost
+        recent.reverse()
+
+        lines = []
+        if summary and summary.text:
+            lines.append(f"Summary of earlier conversation: {summary.text}")
+        lines.extend(recent)
+        context = "\n".join(lines) + ("\n" if lines else "")
+        self.context_tokens += estimate_tokens(context)
+        return context
+
+    def _pending_span(self, session_id: str, messages: Sequence[Any]) -> Optional[slice]:
+        summary = self._summary_for(session_id, len(messages))
+        covered = summary.covered if summary else 0
+        target = len(messages) - self.keep_recent_messages
+        if target - covered < self.summary_batch:
+            return None
+        return slice(covered, target)
+
+    async def refresh(self, session_id: str, messages: Sequence[Any]):
+        """Fold turns that left the verbatim window into the session summary"""
+        span = self._pending_span(session_id, messages)
+        if span is None:
+            return
+        previous = self._summary_for(session_id, len(messages))
+        try:
+            text = await self.summarize(previous.text if previous else None, messages[span])
+        except Exception as e:
+            self.summary_failures += 1
+            print(f"Error summarizing chat session {session_id}: {e}")
+            return
+        self.store.set_summary(session_id, text.strip(), span.stop)
+        self.summaries_generated += 1
+
+    def schedule_refresh(self, session_id: str, messages: Sequence[Any]):
+        """Update the summary in the background if enough turns have aged out"""
+        if session_id in self._refreshing or self._pending_span(session_id, messages) is None:
+            return
+        self._refreshing.add(session_id)
+
+        async def _run():
+            try:
+                await self.refresh(session_id, list(messages))
+            finally:
+                self._refreshing.discard(session_id)
+
+        task = asyncio.create_task(_run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> Dict[str, Any]:
+        saved = self.legacy_tokens - self.context_tokens
+        return {
+            "token_budget": self.token_budget,
+            "prompts": self.prompts,
+            "summaries_generated": self.summaries_generated,
+            "summary_failures": self.summary_failures,
+            "history_tokens_sent": self.context_tokens,
+            "history_tokens_last10_baseline": self.legacy_tokens,
+            "history_token_reduction": round(saved / self.legacy_tokens, 4) if self.legacy_tokens else 0.0,
+        }
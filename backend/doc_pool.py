@@ -0,0 +1,132 @@
+"""
+Pool of open PyMuPDF documents.
+
+Opening a PDF parses its xref and trailer, and every endpoint paid that
+again on each request. ``DocumentPool`` keeps recently used documents open
+in a bounded LRU keyed by path, so one handle serves an upload's blob
+(shared by every file_id with that content) and one serves each saved
+edit. A document is used by one thread at a time: ``checkout`` hands out
+an idle handle or opens a new one, and takes it back afterwards.
+
+A checkout with ``mutate=True`` (annotating, rewriting text) is closed
+afterwards instead of going back to the pool. Handles of a path are
+dropped when ``invalidate(path)`` is called after a new version is written,
+and when the file's size or mtime has changed by the next checkout (for
+versions written by another worker).
+"""
+import itertools
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+# (st_size, st_mtime_ns) of the file a handle was opened from
+Signature = Tuple[int, int]
+
+
+def _signature(path: str) -> Signature:
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+class DocumentPool:
+    """Bounded LRU of idle open documents with exclusive checkout"""
+
+    def __init__(self, opener: Callable[[str], Any], max_documents: int = 32):
+        self.opener = opener
+        self.max_documents = max_documents
+        # Idle handles, least recently returned first: token -> (path, signature, document)
+        self._idle: "OrderedDict[int, Tuple[str, Signature, Any]]" = OrderedDict()
+        self._tokens = itertools.count()
+        # Bumped by invalidate(), so handles checked out before it are closed on return
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.checked_out = 0
+        self.opens = 0
+        self.reuses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _close(documents: List[Any]):
+        for document in documents:
+            try:
+                document.close()
+            except Exception:
+                pass
+
+    def _take(self, path: str, signature: Signature) -> Tuple[Any, List[Any]]:
+        """Most recently returned idle handle of ``path``; handles of an older file version come back as stale"""
+        found, stale = None, []
+        for token in reversed(self._idle):
+            idle_path, idle_signature, document = self._idle[token]
+            if idle_path != path:
+                continue
+            if idle_signature != signature:
+                stale.append(token)
+            elif found is None:
+                found = token
+        documents = [self._idle.pop(token)[2] for token in stale]
+        self.invalidations += len(stale)
+        return (self._idle.pop(found)[2] if found is not None else None), documents
+
+    @contextmanager
+    def checkout(self, path: str, mutate: bool = False) -> Iterator[Any]:
+        """An open document for ``path``, exclusively yours until the block exits"""
+        signature = _signature(path)
+        with self._lock:
+            document, stale = self._take(path, signature)
+            generation = self._generations.get(path, 0)
+            self.checked_out += 1
+            if document is not None:
+                self.reuses += 1
+        self._close(stale)
+        try:
+            if document is None:
+                document = self.opener(path)
+                with self._lock:
+                    self.opens += 1
+            yield document
+        except BaseException:
+            # Don't pool a handle that was in use when something went wrong
+            self._close([document] if document is not None else [])
+            document = None
+            raise
+        finally:
+            with self._lock:
+                self.checked_out -= 1
+                keep = document is not None and not mutate and self._generations.get(path, 0) == generation
+                evicted = []
+                if keep:
+                    self._idle[next(self._tokens)] = (path, signature, document)
+                    while len(self._idle) > self.max_documents:
+                        evicted.append(self._idle.popitem(last=False)[1][2])
+                        self.evictions += 1
+            if document is not None and not keep:
+                self._close([document])
+            self._close(evicted)
+
+    def invalidate(self, path: str) -> int:
+        """Close the idle handles of ``path`` and retire the ones in use; call when a new version is written"""
+        with self._lock:
+            self._generations[path] = self._generations.get(path, 0) + 1
+            tokens = [token for token, (idle_path, _signature, _document) in self._idle.items() if idle_path == path]
+            documents = [self._idle.pop(token)[2] for token in tokens]
+            self.invalidations += len(documents)
+        self._close(documents)
+        return len(documents)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            checkouts = self.opens + self.reuses
+            return {
+                "idle": len(self._idle),
+                "checked_out": self.checked_out,
+                "max_documents": self.max_documents,
+                "opens": self.opens,
+                "reuses": self.reuses,
+                "reuse_rate": round(self.reuses / checkouts, 3) if checkouts else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
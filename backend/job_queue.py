@@ -0,0 +1,283 @@
+"""
+SQLite-backed background job queue.
+
+Jobs are persisted in a local SQLite file so they survive a worker crash:
+each running job holds a lease that its worker keeps renewing, and jobs whose
+lease ran out are put back on the queue. Submitting a job with the same
+dedupe key as an active one attaches to the existing job instead.
+Completed and failed jobs are kept for ``retention_seconds`` so clients can
+still fetch their result, then deleted by a periodic sweep.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+ACTIVE_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+TERMINAL_STATUSES = (JOB_COMPLETED, JOB_FAILED)
+
+# handler(job, progress) -> result; progress(percent, stage) records progress
+ProgressCallback = Callable[[int, str], None]
+JobHandler = Callable[[Dict[str, Any], ProgressCallback], Awaitable[Any]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    dedupe_key TEXT,
+    status TEXT NOT NULL,
+    progress INTEGER NOT NULL DEFAULT 0,
+    stage TEXT,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_expires_at REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_dedupe ON jobs (dedupe_key, status);
+CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (kind, status, updated_at);
+"""
+
+
+class JobQueue:
+    """Bounded pool of async workers pulling jobs from a SQLite table"""
+
+    def __init__(self, db_path: str, handler: JobHandler, kind: str = "default", workers: int = 2,
+                 lease_seconds: float = 120.0, max_attempts: int = 3, poll_interval: float = 1.0,
+                 retention_seconds: float = 7 * 86400.0, prune_interval: float = 600.0):
+        self.db_path = db_path
+        self.handler = handler
+        self.kind = kind
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self.prune_interval = prune_interval
+        self._last_prune = 0.0
+        self.pruned = 0
+        self._lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+
+    # ---- submission and lookup ----------------------------------------
+    def submit(self, payload: Dict[str, Any], dedupe_key: Optional[str] = None) -> Dict[str, Any]:
+        """Queue a job, or return the active job with the same dedupe key"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if dedupe_key:
+                    row = self._conn.execute(
+                        "SELECT * FROM jobs WHERE kind = ? AND dedupe_key = ? AND status IN (?, ?) "
+                        "ORDER BY created_at DESC LIMIT 1",
+                        (self.kind, dedupe_key, *ACTIVE_STATUSES)
+                    ).fetchone()
+                    if row is not None:
+                        self._conn.execute("COMMIT")
+                        job = self._row_to_job(row)
+                        job["deduplicated"] = True
+                        return job
+                job_id = str(uuid.uuid4())
+                self._conn.execute(
+                    "INSERT INTO jobs (job_id, kind, dedupe_key, status, progress, stage, payload, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, 0, 'queued', ?, ?, ?)",
+                    (job_id, self.kind, dedupe_key, JOB_QUEUED, json.dumps(payload), now, now)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if self._wakeup is not None:
+            self._wakeup.set()
+        job = self.get(job_id)
+        job["deduplicated"] = False
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row is not None else None
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) AS n FROM jobs WHERE kind = ? GROUP BY status", (self.kind,)
+            ).fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "job_id": row["job_id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "progress": row["progress"],
+            "stage": row["stage"],
+            "payload": json.loads(row["payload"]),
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+    # ---- state transitions --------------------------------------------
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT job_id FROM jobs WHERE kind = ? AND status = ? ORDER BY created_at LIMIT 1",
+                    (self.kind, JOB_QUEUED)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, stage = 'starting', attempts = attempts + 1, "
+                    "lease_expires_at = ?, updated_at = ? WHERE job_id = ?",
+                    (JOB_RUNNING, now + self.lease_seconds, now, row["job_id"])
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(row["job_id"])
+
+    def _update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        if fields.get("status") == JOB_RUNNING or "progress" in fields:
+            fields.setdefault("lease_expires_at", fields["updated_at"] + self.lease_seconds)
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+
+    def recover_expired(self) -> int:
+        """Requeue running jobs whose worker stopped renewing the lease"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = 'worker lost, giving up', lease_expires_at = NULL, updated_at = ? "
+                    "WHERE kind = ? AND status = ? AND lease_expires_at < ? AND attempts >= ?",
+                    (JOB_FAILED, now, self.kind, JOB_RUNNING, now, self.max_attempts)
+                )
+                cursor = self._conn.execute(
+                    "UPDATE jobs SET status = ?, stage = 'requeued', lease_expires_at = NULL, updated_at = ? "
+                    "WHERE kind = ? AND status = ? AND lease_expires_at < ?",
+                    (JOB_QUEUED, now, self.kind, JOB_RUNNING, now)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return cursor.rowcount
+
+    def prune_finished(self) -> int:
+        """Delete completed and failed jobs that finished more than ``retention_seconds`` ago"""
+        now = time.time()
+        self._last_prune = now
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE kind = ? AND status IN (?, ?) AND updated_at < ?",
+                (self.kind, *TERMINAL_STATUSES, now - self.retention_seconds)
+            )
+        self.pruned += cursor.rowcount
+        return cursor.rowcount
+
+    def _maintain(self):
+        """Housekeeping for an idle worker: requeue lost jobs, now and then drop old finished ones"""
+        self.recover_expired()
+        if time.time() - self._last_prune >= self.prune_interval:
+            self.prune_finished()
+
+    # ---- workers ------------------------------------------------------
+    async def _run_job(self, job: Dict[str, Any]):
+        job_id = job["job_id"]
+
+        def progress(percent: int, stage: str):
+            self._update(job_id, progress=int(percent), stage=stage)
+
+        # Keep the lease alive while long steps (model calls, PDF builds) run
+        async def heartbeat():
+            while True:
+                await asyncio.sleep(self.lease_seconds / 3)
+                self._update(job_id, lease_expires_at=time.time() + self.lease_seconds)
+
+        beat = asyncio.create_task(heartbeat())
+        try:
+            result = await self.handler(job, progress)
+            self._update(job_id, status=JOB_COMPLETED, progress=100, stage="completed",
+                         result=json.dumps(result), error=None, lease_expires_at=None)
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back so the next worker picks it up
+            self._update(job_id, status=JOB_QUEUED, stage="requeued", lease_expires_at=None)
+            raise
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            self._update(job_id, status=JOB_FAILED, stage="failed", error=str(e), lease_expires_at=None)
+        finally:
+            beat.cancel()
+
+    async def _worker(self):
+        # Python 3.11's wait_for can swallow a cancel that lands as the wakeup fires,
+        # so stop() also raises a flag the loop checks before claiming the next job
+        while not self._stopping:
+            job = self._claim()
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    self._maintain()
+                continue
+            await self._run_job(job)
+
+    def start(self):
+        """Start the worker pool on the running event loop"""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        recovered = self.recover_expired()
+        if recovered:
+            print(f"Requeued {recovered} interrupted {self.kind} job(s)")
+        pruned = self.prune_finished()
+        if pruned:
+            print(f"Deleted {pruned} finished {self.kind} job(s) past retention")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "workers": self.workers, "jobs": self.counts(), "pruned": self.pruned,
+                "retention_seconds": self.retention_seconds}
@@ -0,0 +1,362 @@
+"""
+Shared async gateway for every Gemini call made by the backend.
+
+The google-genai client is synchronous (its ``aio`` surface just wraps the
+sync call in ``asyncio.to_thread`` and opens a fresh ``requests.Session`` per
+request), so the gateway runs calls on its own bounded thread pool and swaps
+in a pooled HTTP session so connections to the API are reused.
+
+Every upstream call also passes through the rate limiter, retry policy and
+circuit breaker from ``rate_limiter``. Callers pick a priority explicitly or
+inherit it from the ``llm_priority`` context variable.
+
+The client can be handed over ready-made or as a ``client_factory``, which
+is called on a gateway thread the first time a model call needs it, so
+importing the SDK neither slows worker boot nor blocks the event loop.
+"""
+import asyncio
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import LLM_IN_FLIGHT, LLM_PROMPT_CHARS, LLM_RESPONSE_CHARS, STAGE_SECONDS, stage_timer
+from rate_limiter import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_DEFAULT,
+    PRIORITY_INTERACTIVE,
+    CircuitBreaker,
+    PriorityTokenBucket,
+    RetryPolicy,
+    is_retryable,
+    retry_after_seconds,
+)
+from single_flight import SingleFlight
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+DEFAULT_RATE_PER_MINUTE = float(os.getenv("LLM_RATE_PER_MINUTE", "300"))
+DEFAULT_RATE_BURST = int(os.getenv("LLM_RATE_BURST", "20"))
+# (connect, read) seconds for the pooled session when the SDK doesn't set a timeout itself
+DEFAULT_HTTP_TIMEOUT = (10.0, float(os.getenv("LLM_HTTP_TIMEOUT_SECONDS", "120")))
+
+# _request_unauthorized is private SDK API; only replace it on versions whose signature we match
+POOLED_SESSION_GENAI_VERSIONS = ("0.3.",)
+
+# How long a call may queue for a rate-limit token before we give up (None = wait)
+DEFAULT_QUEUE_TIMEOUTS = {
+    PRIORITY_INTERACTIVE: 30.0,
+    PRIORITY_DEFAULT: 60.0,
+    PRIORITY_BACKGROUND: None,
+}
+
+# Marks the end of an upstream stream on the queue stream() reads from
+_STREAM_END = object()
+
+# Priority used when a caller doesn't pass one, e.g. set to background in job workers
+llm_priority: ContextVar[int] = ContextVar("llm_priority", default=PRIORITY_DEFAULT)
+
+
+class LLMUnavailableError(Exception):
+    """The model can't be reached right now (rate limited, failing or circuit open)"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _install_pooled_session(client, pool_size: int) -> bool:
+    """Make the genai API client reuse one keep-alive HTTP session"""
+    api_client = getattr(client, "_api_client", None)
+    if api_client is None or not hasattr(api_client, "_request_unauthorized"):
+        return False
+    import google.genai
+    version = getattr(google.genai, "__version__", "")
+    if not version.startswith(POOLED_SESSION_GENAI_VERSIONS):
+        print(f"google-genai {version or '(unknown)'} isn't known to work with the pooled HTTP session, "
+              "using the SDK's own requests")
+        return False
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    # Imported lazily so fake clients used in development don't need genai.
+    from google.genai import errors
+    from google.genai._api_client import HttpResponse, RequestJsonEncoder
+
+    def _request_unauthorized(http_request, stream: bool = False):
+        data = http_request.data
+        if data and not isinstance(data, bytes):
+            data = json.dumps(data, cls=RequestJsonEncoder)
+        # Newer SDKs carry a per-request timeout in seconds; without one a hung socket would pin a gateway thread
+        timeout = getattr(http_request, "timeout", None) or DEFAULT_HTTP_TIMEOUT
+        response = session.request(
+            http_request.method,
+            http_request.url,
+            headers=http_request.headers,
+            data=data or None,
+            stream=stream,
+            timeout=timeout,
+        )
+        errors.APIError.raise_for_response(response)
+        return HttpResponse(response.headers, response if stream else [response.text])
+
+    api_client._request_unauthorized = _request_unauthorized
+    return True
+
+
+class LLMGateway:
+    """Runs model calls off the event loop with bounded concurrency"""
+
+    def __init__(self, client: Any = None, config: Any = None, model: str = DEFAULT_MODEL,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 rate_per_minute: float = DEFAULT_RATE_PER_MINUTE, burst: int = DEFAULT_RATE_BURST,
+                 retry_policy: Optional[RetryPolicy] = None, breaker: Optional[CircuitBreaker] = None,
+                 queue_timeouts: Optional[Dict[int, Optional[float]]] = None,
+                 usage_observer: Optional[Callable[[str, Any], None]] = None,
+                 client_factory: Optional[Callable[[], Any]] = None):
+        self._client = client
+        self.client_factory = client_factory
+        self._client_lock = threading.Lock()
+        self.config = config
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.limiter = PriorityTokenBucket(rate_per_minute, burst)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.queue_timeouts = dict(DEFAULT_QUEUE_TIMEOUTS if queue_timeouts is None else queue_timeouts)
+        self.retries = 0
+        self.upstream_errors = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+        self.pooled_http = _install_pooled_session(client, max_concurrency) if client is not None else False
+        # Identical prompts sent while one is already in flight share its result
+        self.flights = SingleFlight("llm")
+        # usage_observer(template_name, usage_metadata) for prompts rendered from a template
+        self.usage_observer = usage_observer
+
+    @property
+    def client(self) -> Any:
+        """The model client, built by ``client_factory`` on first use"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    if self.client_factory is None:
+                        raise LLMUnavailableError("No model client is configured")
+                    try:
+                        client = self.client_factory()
+                    except Exception as e:
+                        raise LLMUnavailableError(f"The model client could not be created: {e}") from e
+                    self.pooled_http = _install_pooled_session(client, self.max_concurrency)
+                    self._client = client
+        return self._client
+
+    @client.setter
+    def client(self, client: Any):
+        self._client = client
+
+    def _observe_usage(self, prompt: Any, usage: Any):
+        template_name = getattr(prompt, "template_name", None)
+        if self.usage_observer is not None and template_name and usage is not None:
+            self.usage_observer(template_name, usage)
+
+    @staticmethod
+    def _template_label(prompt: Any) -> str:
+        return getattr(prompt, "template_name", None) or "adhoc"
+
+    def _generate_sync(self, prompt: Any, config: Any, model: str) -> str:
+        client = self.client
+        template = self._template_label(prompt)
+        LLM_PROMPT_CHARS.labels(template).inc(len(prompt) if isinstance(prompt, str) else 0)
+        LLM_IN_FLIGHT.inc()
+        try:
+            with stage_timer("llm"):
+                response = client.models.generate_content(
+                    model=model,
+                    contents=prompt,
+                    config=config
+                )
+        finally:
+            LLM_IN_FLIGHT.dec()
+        self._observe_usage(prompt, getattr(response, "usage_metadata", None))
+        text = response.text or ""
+        LLM_RESPONSE_CHARS.labels(template).inc(len(text))
+        return text
+
+    async def _admit(self, priority: int):
+        """Wait for a rate-limit token, then check the circuit breaker"""
+        if not await self.limiter.acquire(priority, self.queue_timeouts.get(priority)):
+            raise LLMUnavailableError("Too many requests queued for the model, try again shortly", retry_after=5.0)
+        if not self.breaker.allow():
+            raise LLMUnavailableError("The model is temporarily unavailable", retry_after=self.breaker.retry_after())
+
+    def _record_outcome(self, error: Optional[BaseException]):
+        # Only upstream trouble counts against the breaker; a bad request still proves it's healthy
+        if error is not None and is_retryable(error):
+            self.upstream_errors += 1
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    async def _call_with_retries(self, call, priority: int) -> str:
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            await self._admit(priority)
+            try:
+                result = await loop.run_in_executor(self._executor, call)
+            except Exception as e:
+                self._record_outcome(e)
+                attempt += 1
+                delay = self.retry_policy.delay(attempt, e)
+                if delay is None:
+                    if is_retryable(e):
+                        raise LLMUnavailableError(f"The model request failed: {e}", retry_after_seconds(e)) from e
+                    raise
+                self.retries += 1
+                print(f"Retrying model call in {delay:.1f}s after error: {e}")
+                await asyncio.sleep(delay)
+                continue
+            self._record_outcome(None)
+            return result
+
+    async def generate(self, prompt: Any, config: Any = None, model: Optional[str] = None,
+                       priority: Optional[int] = None) -> str:
+        """Generate a completion for ``prompt`` and return the response text"""
+        config = config if config is not None else self.config
+        model = model or self.model
+        priority = llm_priority.get() if priority is None else priority
+        call = functools.partial(self._generate_sync, prompt, config, model)
+        key = self._prompt_key(prompt, config, model)
+        return await self.flights.run(key, lambda: self._call_with_retries(call, priority))
+
+    async def stream(self, prompt: Any, config: Any = None, model: Optional[str] = None,
+                     priority: Optional[int] = None) -> AsyncIterator[str]:
+        """Yield response text chunks as the model produces them
+
+        The blocking stream is consumed on the gateway pool and handed to the
+        event loop through a queue. Closing the iterator early (e.g. the
+        client disconnected) stops the worker at the next chunk and counts
+        as neither a success nor a failure. Retryable errors raised before
+        the first chunk are retried like ``generate``; once text has been
+        handed out the stream can't be restarted, so later errors propagate.
+        """
+        config = config if config is not None else self.config
+        model = model or self.model
+        priority = llm_priority.get() if priority is None else priority
+        attempt = 0
+        while True:
+            await self._admit(priority)
+            error = None
+            delivered = False
+            finished_normally = False
+            stop = threading.Event()
+            queue = self._start_stream(prompt, config, model, stop)
+            try:
+                while True:
+                    item = await queue.get()
+                    if item is _STREAM_END:
+                        break
+                    if isinstance(item, Exception):
+                        error = item
+                        break
+                    delivered = True
+                    yield item
+                finished_normally = True
+            finally:
+                stop.set()
+                if finished_normally:
+                    self._record_outcome(error)
+                else:
+                    # The consumer went away: says nothing about the upstream's health
+                    self.breaker.record_abort()
+            if error is None:
+                return
+            attempt += 1
+            delay = None if delivered else self.retry_policy.delay(attempt, error)
+            if delay is None:
+                if is_retryable(error) and not delivered:
+                    raise LLMUnavailableError(f"The model request failed: {error}", retry_after_seconds(error)) from error
+                raise error
+            self.retries += 1
+            print(f"Retrying model stream in {delay:.1f}s after error: {error}")
+            await asyncio.sleep(delay)
+
+    def _start_stream(self, prompt: Any, config: Any, model: str, stop: threading.Event) -> asyncio.Queue:
+        """Consume one upstream stream on the gateway pool; chunks, then an error or ``_STREAM_END``, arrive on the queue"""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+
+        def _put(item):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                # Event loop already closed, nobody is listening any more
+                stop.set()
+
+        def _produce():
+            usage = None
+            template = self._template_label(prompt)
+            LLM_PROMPT_CHARS.labels(template).inc(len(prompt) if isinstance(prompt, str) else 0)
+            LLM_IN_FLIGHT.inc()
+            started = time.perf_counter()
+            first_chunk = True
+            try:
+                client = self.client
+                with stage_timer("llm_stream"):
+                    chunks = client.models.generate_content_stream(
+                        model=model,
+                        contents=prompt,
+                        config=config
+                    )
+                    for chunk in chunks:
+                        if stop.is_set():
+                            break
+                        # Usage is reported on the final chunk
+                        usage = getattr(chunk, "usage_metadata", None) or usage
+                        text = getattr(chunk, "text", None)
+                        if text:
+                            if first_chunk:
+                                STAGE_SECONDS.labels("llm_first_chunk").observe(time.perf_counter() - started)
+                                first_chunk = False
+                            LLM_RESPONSE_CHARS.labels(template).inc(len(text))
+                            _put(text)
+                self._observe_usage(prompt, usage)
+            except Exception as e:
+                _put(e)
+            finally:
+                LLM_IN_FLIGHT.dec()
+                _put(_STREAM_END)
+
+        loop.run_in_executor(self._executor, _produce)
+        return queue
+
+    @staticmethod
+    def _prompt_key(prompt: Any, config: Any, model: str) -> str:
+        digest = hashlib.sha256(str(prompt).encode("utf-8")).hexdigest()
+        return f"{model}:{id(config)}:{digest}"
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "max_concurrency": self.max_concurrency,
+            "client_ready": self._client is not None,
+            "pooled_http": self.pooled_http,
+            "single_flight": self.flights.stats(),
+            "rate_limiter": self.limiter.stats(),
+            "circuit_breaker": self.breaker.stats(),
+            "retries": self.retries,
+            "upstream_errors": self.upstream_errors,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Load-test benchmarks for the PDF endpoints.
+
+Builds a reproducible corpus (synthetic PDFs of different sizes and page
+counts, generated from a fixed seed, plus the distinct sample PDFs in
+``uploads/``) and drives upload, page rendering, text extraction,
+annotation, text update and download requests at a configurable
+concurrency, either against the app in process or against a running
+server over HTTP. Each scenario/document pair reports req/s, p50/p95/p99
+latency, error counts, peak RSS and bytes written; results are saved as
+JSON and can be compared with a stored baseline to flag regressions.
+
+    python loadtest.py                                  # in process, temp working dir
+    python loadtest.py --url http://localhost:8000 --server-pid 1234 --concurrency 16
+    python loadtest.py --save-baseline                  # store this run as the baseline
+    python loadtest.py --baseline data/benchmarks/baseline.json --tolerance 0.25
+
+Needs httpx (``pip install httpx``) in addition to the backend requirements.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from collections import Counter
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import fitz  # PyMuPDF
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join("data", "benchmarks", "baseline.json")
+
+# name -> pages, raster images per page and their edge in pixels (noise, so they don't compress)
+SYNTHETIC_PROFILES: Dict[str, Dict[str, int]] = {
+    "text-1p": {"pages": 1, "images": 0, "image_size": 0},
+    "text-20p": {"pages": 20, "images": 0, "image_size": 0},
+    "mixed-8p": {"pages": 8, "images": 2, "image_size": 300},
+    "scan-4p": {"pages": 4, "images": 1, "image_size": 900},
+}
+
+_WORDS = ("touchdown", "quarterback", "drive", "yards", "kickoff", "field", "goal", "defense", "coverage",
+          "booth", "broadcast", "timeout", "red", "zone", "third", "down", "sack", "pass", "rush", "punt")
+
+
+def synthetic_pdf(pages: int, images: int = 0, image_size: int = 0, seed: int = 0) -> bytes:
+    """A deterministic letter-size PDF with lines of text, vector shapes and optional raster images"""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page(width=612, height=792)
+        for line in range(32):
+            text = " ".join(rng.choice(_WORDS) for _ in range(10))
+            page.insert_text(fitz.Point(54, 60 + line * 20), text, fontsize=10)
+        page.draw_rect(fitz.Rect(40, 40, 572, 752), color=(0.2, 0.2, 0.6), width=1)
+        for index in range(images):
+            samples = rng.randbytes(image_size * image_size * 3)
+            pixmap = fitz.Pixmap(fitz.csRGB, image_size, image_size, samples, False)
+            top = 420 + index * 160
+            page.insert_image(fitz.Rect(330, top, 560, top + 150), pixmap=pixmap)
+    # Fixed metadata and file ID so the same seed always gives the same bytes
+    doc.set_metadata({"creationDate": "D:20240101000000", "modDate": "D:20240101000000", "producer": "loadtest"})
+    data = doc.tobytes(deflate=True, no_new_id=True)
+    doc.close()
+    return data
+
+
+def build_corpus(profiles: List[str], sample_dir: Optional[str], max_samples: int, seed: int) -> List[Dict[str, Any]]:
+    corpus = []
+    for name in profiles:
+        data = synthetic_pdf(seed=seed + zlib.crc32(name.encode("utf-8")), **SYNTHETIC_PROFILES[name])
+        corpus.append({"name": name, "data": data})
+    if sample_dir and os.path.isdir(sample_dir):
+        seen = set()
+        # Uploads live in uploads/blobs/ once the server has moved them into its blob store
+        paths = sorted(os.path.join(root, filename) for root, _dirs, files in os.walk(sample_dir) for filename in files)
+        for path in paths:
+            if len(seen) >= max_samples or not path.lower().endswith(".pdf"):
+                continue
+            with open(path, "rb") as f:
+                data = f.read()
+            digest = hashlib.sha256(data).hexdigest()
+            if digest in seen:
+                continue  # uploads/ holds the same sample many times over
+            seen.add(digest)
+            corpus.append({"name": f"sample-{len(seen)}", "data": data})
+    for document in corpus:
+        with fitz.open(stream=document["data"], filetype="pdf") as pdf:
+            document["pages"] = pdf.page_count
+        document["bytes"] = len(document["data"])
+        document["sha256"] = hashlib.sha256(document["data"]).hexdigest()[:16]
+    return corpus
+
+
+# ---- process probes -------------------------------------------------------
+def read_rss_bytes(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if pid == os.getpid():
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # kB on Linux
+    return None
+
+
+def read_write_bytes(pid: int) -> Optional[int]:
+    """Bytes the process handed to write() so far (files, sqlite, logs), from /proc/<pid>/io"""
+    try:
+        with open(f"/proc/{pid}/io", "r") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+class RSSSampler:
+    """Polls a process's RSS while a scenario runs and keeps the peak"""
+
+    def __init__(self, pid: Optional[int], interval: float = 0.02):
+        self.pid = pid
+        self.interval = interval
+        self.peak: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            rss = read_rss_bytes(self.pid)
+            if rss is not None:
+                self.peak = max(self.peak or 0, rss)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self.pid is not None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> Optional[int]:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        return self.peak
+
+
+# ---- scenarios ------------------------------------------------------------
+Operation = Callable[[httpx.AsyncClient, Dict[str, Any], int], Awaitable[httpx.Response]]
+
+
+async def op_upload(client: httpx.AsyncClient, document: Dict[str, Any], index: int) -> httpx.Response:
+    response = await client.post("/upload-pdf", files={"file": (f"{document['name']}.pdf", document["data"], "application/pdf")})
+    if response.status_code == 200:
+        document.setdefault("extra_ids", []).append(response.json()["file_id"])
+    return response
+
+
+async def op_page(client: httpx.AsyncClient, document: Dict[str, Any], index: int) -> httpx.Response:
+    return await client.get(f"/pdf-page/{document['file_id']}/{index % document['pages']}")
+
+
+async def op_extract_text(client: httpx.AsyncClient, document: Dict[str, Any], index: int) -> httpx.Response:
+    return await client.post("/extract-pdf-text", json={"file_id": document["file_id"], "page": index % document["pages"]})
+
+
+async def op_add_annotations(client: httpx.AsyncClient, document: Dict[str, Any], index: int) -> httpx.Response:
+    annotations = [
+        {"id": f"t{index}", "type": "text", "x": 72, "y": 700, "text": f"Note {index}", "size": 12},
+        {"id": f"r{index}", "type": "rectangle", "x": 60, "y": 60, "width": 200, "height": 80, "color": "#ff0000"},
+        {"id": f"d{index}", "type": "drawing", "x": 0, "y": 0,
+         "points": [{"x": 100 + i * 10, "y": 300 + (i % 2) * 15} for i in range(20)]},
+    ]
+    return await client.post("/add-annotations", json={
+        "file_id": document["file_id"], "page": index % document["pages"], "annotations": annotations
+    })
+
+
+async def op_update_text(client: httpx.AsyncClient, document: Dict[str, Any], index: int) -> httpx.Response:
+    blocks = [{"text": f"Updated line {line}", "x": 72, "y": 80 + line * 18, "height": 12, "font_size": 11}
+              for line in range(12)]
+    return await client.post("/update-pdf-text", json={
+        "file_id": document["file_id"], "page": index % document["pages"], "text_blocks": blocks
+    })
+
+
+async def op_download_edited(client: httpx.AsyncClient, document: Dict[str, Any], index: int) -> httpx.Response:
+    return await client.get(f"/download-pdf/{document['file_id']}")
+
+
+async def op_download_text(client: httpx.AsyncClient, document: Dict[str, Any], index: int) -> httpx.Response:
+    return await client.get(f"/download-text-pdf/{document['file_id']}")
+
+
+# Run in this order: the downloads need the edits made by the scenarios before them
+SCENARIOS: Dict[str, Operation] = {
+    "upload": op_upload,
+    "page": op_page,
+    "extract_text": op_extract_text,
+    "add_annotations": op_add_annotations,
+    "update_text": op_update_text,
+    "download_edited": op_download_edited,
+    "download_text": op_download_text,
+}
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest rank
+    rank = math.ceil(fraction * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(1, rank)) - 1]
+
+
+async def run_scenario(client: httpx.AsyncClient, operation: Operation, document: Dict[str, Any],
+                       requests: int, concurrency: int, server_pid: Optional[int]) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors: Counter = Counter()
+    received = 0
+    indexes = iter(range(requests))
+
+    async def worker():
+        nonlocal received
+        # Workers share one iterator, so exactly ``requests`` calls are made in total
+        for index in indexes:
+            started = time.perf_counter()
+            try:
+                response = await operation(client, document, index)
+                received += len(response.content)
+                if response.status_code >= 400:
+                    errors[f"http_{response.status_code}"] += 1
+            except httpx.HTTPError as e:
+                errors[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - started)
+
+    sampler = RSSSampler(server_pid)
+    written_before = read_write_bytes(server_pid) if server_pid is not None else None
+    sampler.start()
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(max(1, concurrency))])
+    elapsed = time.perf_counter() - started
+    peak_rss = await sampler.stop()
+    written_after = read_write_bytes(server_pid) if server_pid is not None else None
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_second": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        "errors": dict(errors),
+        "error_rate": round(sum(errors.values()) / len(latencies), 4) if latencies else 0.0,
+        "bytes_received": received,
+        "bytes_written": written_after - written_before if written_before is not None and written_after is not None else None,
+        "peak_rss_mb": round(peak_rss / (1024 * 1024), 1) if peak_rss else None,
+    }
+
+
+async def run_benchmarks(client: httpx.AsyncClient, corpus: List[Dict[str, Any]], scenarios: List[str],
+                         requests: int, concurrency: int, server_pid: Optional[int]) -> Dict[str, Dict[str, Any]]:
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        # Every document is uploaded once up front so the other scenarios have a file to work on
+        for document in corpus:
+            response = await client.post(
+                "/upload-pdf", files={"file": (f"{document['name']}.pdf", document["data"], "application/pdf")}
+            )
+            response.raise_for_status()
+            document["file_id"] = response.json()["file_id"]
+
+        for scenario in scenarios:
+            for document in corpus:
+                key = f"{scenario}/{document['name']}"
+                result = await run_scenario(client, SCENARIOS[scenario], document, requests, concurrency, server_pid)
+                results[key] = result
+                print(f"  {key:<32} {result['requests_per_second']:>8.1f} req/s  p50 {result['p50_ms']:>8.1f} ms  "
+                      f"p95 {result['p95_ms']:>8.1f} ms  p99 {result['p99_ms']:>8.1f} ms  errors {sum(result['errors'].values())}")
+    finally:
+        for document in corpus:
+            for file_id in [document.get("file_id")] + document.get("extra_ids", []):
+                if file_id:
+                    await client.delete(f"/pdf/{file_id}")
+    return results
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Scenario results that are slower, lower-throughput or more error-prone than the baseline"""
+    regressions = []
+    for key, current in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(key)
+        if base is None:
+            continue
+        if current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{key}: p95 {current['p95_ms']} ms vs baseline {base['p95_ms']} ms")
+        if current["requests_per_second"] < base["requests_per_second"] * (1 - tolerance):
+            regressions.append(f"{key}: {current['requests_per_second']} req/s vs baseline {base['requests_per_second']} req/s")
+        if current["error_rate"] > base["error_rate"] + 0.01:
+            regressions.append(f"{key}: error rate {current['error_rate']} vs baseline {base['error_rate']}")
+    changed = [name for name, document in results["corpus"].items()
+               if name in baseline.get("corpus", {}) and baseline["corpus"][name]["sha256"] != document["sha256"]]
+    if changed:
+        print(f"⚠️  {', '.join(changed)} differ from the baseline's documents, comparisons may not be meaningful")
+    return regressions
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def in_process_client(workdir: str) -> httpx.AsyncClient:
+    """Import the app with ``workdir`` as its working directory so uploads and outputs stay out of the tree"""
+    os.environ.setdefault("GENAI_API_KEY", "unused-by-pdf-benchmarks")
+    os.environ["RESPONSE_CACHE_SNAPSHOT"] = ""
+    os.chdir(workdir)
+    os.makedirs("uploads", exist_ok=True)
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    import main
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://benchmark", timeout=None)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the PDF endpoints")
+    parser.add_argument("--url", default=None, help="Benchmark a running server instead of the app in process")
+    parser.add_argument("--server-pid", type=int, default=None,
+                        help="PID of the server behind --url, for peak RSS and bytes written")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight at once")
+    parser.add_argument("--requests", type=int, default=30, help="Requests per scenario and document")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenarios to run")
+    parser.add_argument("--profiles", default=",".join(SYNTHETIC_PROFILES), help="Comma-separated synthetic PDF profiles")
+    parser.add_argument("--samples", default="uploads", help="Directory of sample PDFs to include ('' for none)")
+    parser.add_argument("--max-samples", type=int, default=3, help="Distinct sample PDFs to include")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the synthetic PDFs")
+    parser.add_argument("--output", default=None, help="Results JSON (default data/benchmarks/<timestamp>.json)")
+    parser.add_argument("--baseline", default=None, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Also write the results to {DEFAULT_BASELINE}")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative p95/throughput change")
+    args = parser.parse_args(argv)
+
+    # Paths are relative to the backend directory, like start.py and prewarm.py
+    os.chdir(BACKEND_DIR)
+    scenarios = [name for name in args.scenarios.split(",") if name]
+    profiles = [name for name in args.profiles.split(",") if name]
+    unknown = [name for name in scenarios if name not in SCENARIOS] + [name for name in profiles if name not in SYNTHETIC_PROFILES]
+    if unknown:
+        parser.error(f"Unknown scenario or profile: {', '.join(unknown)}")
+    corpus = build_corpus(profiles, os.path.abspath(args.samples) if args.samples else None, args.max_samples, args.seed)
+    output = os.path.abspath(args.output or os.path.join(
+        "data", "benchmarks", f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"))
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    default_baseline = os.path.abspath(DEFAULT_BASELINE)
+
+    print(f"📊 {len(scenarios)} scenarios x {len(corpus)} documents, {args.requests} requests each "
+          f"at concurrency {args.concurrency} ({'in process' if not args.url else args.url})")
+    for document in corpus:
+        print(f"  {document['name']:<10} {document['pages']:>3} pages {document['bytes'] / 1024:>9.1f} KiB")
+
+    workdir = None
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url.rstrip("/"), timeout=300.0,
+                                   limits=httpx.Limits(max_connections=max(1, args.concurrency)))
+        server_pid = args.server_pid
+    else:
+        workdir = tempfile.mkdtemp(prefix="boothbrain-bench-")
+        client = in_process_client(workdir)
+        server_pid = os.getpid()
+
+    async def run():
+        async with client:
+            return await run_benchmarks(client, corpus, scenarios, args.requests, args.concurrency, server_pid)
+
+    try:
+        scenario_results = asyncio.run(run())
+    finally:
+        if workdir:
+            os.chdir(BACKEND_DIR)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "mode": "http" if args.url else "in-process",
+            "url": args.url,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pymupdf": fitz.VersionBind,
+        },
+        "corpus": {document["name"]: {"pages": document["pages"], "bytes": document["bytes"], "sha256": document["sha256"]}
+                   for document in corpus},
+        "scenarios": scenario_results,
+    }
+    for path in [output] + ([default_baseline] if args.save_baseline else []):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results to {path}")
+
+    if baseline_path:
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} regressions against {baseline_path}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"✅ No regressions against {baseline_path} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,20 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pdf2image import convert_from_path, convert_from_bytes
+from pdf2image import convert_from_path, convert_from_bytes, pdfinfo_from_bytes, pdfinfo_from_path
 from PIL import Image
+import asyncio
 import io
 import base64
+import hashlib
 import json
 import os
+import re
+import time
 import uuid
-from datetime import datetime
 from typing import List, Dict, Any
 from pydantic import BaseModel
+from upload_manifest import UploadManifest
 
 app = FastAPI(title="PDF Editor API (Alternative)", version="1.0.0")
 
@@ -46,46 +50,52 @@ class PDFInfo(BaseModel):
 # Store file info in memory
 file_storage = {}
 
+# Page sizes are reported in pixels at pdf2image's default rendering DPI
+RENDER_DPI = 200
+
+def page_info(pdfinfo: Dict[str, Any]) -> Dict[str, Any]:
+    """Page count and first page size (pixels at RENDER_DPI) from poppler's pdfinfo, without rasterising"""
+    width, height = (float(value) for value in re.findall(r"[\d.]+", pdfinfo["Page size"])[:2])
+    return {
+        "total_pages": int(pdfinfo["Pages"]),
+        "page_size": {"width": round(width * RENDER_DPI / 72), "height": round(height * RENDER_DPI / 72)}
+    }
+
+# Metadata of everything in uploads/; its own file because page sizes here are pixels, not points
+upload_manifest = UploadManifest(
+    os.getenv("UPLOAD_MANIFEST_ALT_DB", "data/upload_manifest_alt.db"),
+    lambda file_path: page_info(pdfinfo_from_path(file_path)),
+    scan_workers=int(os.getenv("UPLOAD_SCAN_WORKERS", "4"))
+)
+
 def load_existing_files():
-    """Load existing files from uploads directory on startup"""
-    uploads_dir = "uploads"
-    if os.path.exists(uploads_dir):
-        for filename in os.listdir(uploads_dir):
-            if filename.endswith('.pdf'):
-                file_id = filename.split('_')[0]
-                file_path = os.path.join(uploads_dir, filename)
-                
-                try:
-                    # Get PDF info using pdf2image
-                    images = convert_from_path(file_path, first_page=1, last_page=1)
-                    if images:
-                        page_size = {
-                            "width": images[0].width,
-                            "height": images[0].height
-                        }
-                        
-                        # Get total pages by converting all pages
-                        all_images = convert_from_path(file_path)
-                        total_pages = len(all_images)
-                        
-                        file_info = {
-                            "file_id": file_id,
-                            "filename": filename,
-                            "file_path": file_path,
-                            "total_pages": total_pages,
-                            "page_size": page_size,
-                            "created_at": datetime.now().isoformat()
-                        }
-                        
-                        file_storage[file_id] = file_info
-                        print(f"Loaded existing file: {file_id}")
-                        
-                except Exception as e:
-                    print(f"Error loading file {filename}: {e}")
+    """Load existing files from the upload manifest on startup"""
+    started = time.perf_counter()
+    entries = upload_manifest.load()
+    for file_info in entries:
+        file_storage[file_info["file_id"]] = file_info
+    print(f"Loaded {len(entries)} files from the upload manifest in {(time.perf_counter() - started) * 1000:.1f} ms")
 
 # Load existing files on startup
 load_existing_files()
 
+async def scan_uploads():
+    """Pick up new or changed uploads in the background and forget deleted ones"""
+    # MIGRATE_UPLOADS=1 moves loose uploads into the blob store; otherwise they stay where they are
+    migrate = os.getenv("MIGRATE_UPLOADS", "").lower() in ("1", "true", "yes")
+    changed, removed = await asyncio.to_thread(upload_manifest.scan, migrate)
+    for file_info in changed:
+        # Keep annotations made since startup
+        file_info["annotations"] = file_storage.get(file_info["file_id"], {}).get("annotations", [])
+        file_storage[file_info["file_id"]] = file_info
+    for file_id in removed:
+        file_storage.pop(file_id, None)
+    print(f"Upload scan: {upload_manifest.last_scan}")
+
+@app.on_event("startup")
+async def schedule_upload_scan():
+    asyncio.create_task(scan_uploads())
+
 @app.get("/")
 async def root():
     return {"message": "PDF Editor API (Alternative) is running!"}
@@ -93,50 +103,36 @@ async def root():
 @app.get("/debug/files")
 async def debug_files():
     """Debug endpoint to see loaded files"""
-    return {"loaded_files": list(file_storage.keys()), "file_count": len(file_storage)}
+    return {"loaded_files": list(file_storage.keys()), "file_count": len(file_storage),
+            "manifest": upload_manifest.stats()}
 
 @app.post("/upload-pdf")
 async def upload_pdf(file: UploadFile = File(...)):
     """Upload and process a PDF file using pdf2image"""
     try:
         file_id = str(uuid.uuid4())
-        file_path = f"uploads/{file_id}_{file.filename}"
+        # Not a .pdf until it is in the blob store, so the upload scan leaves it alone
+        file_path = f"uploads/{file_id}_{file.filename}.part"
         
         # Save file
         with open(file_path, "wb") as f:
             content = await file.read()
             f.write(content)
         
-        # Convert PDF to images to get info
+        # Read page count and size without rasterising the pages
         try:
-            # Get first page for dimensions
-            images = convert_from_bytes(content, first_page=1, last_page=1)
-            if not images:
-                raise HTTPException(status_code=400, detail="Cannot process PDF file")
-            
-            page_size = {
-                "width": images[0].width,
-                "height": images[0].height
-            }
-            
-            # Get total pages
-            all_images = convert_from_bytes(content)
-            total_pages = len(all_images)
+            info = page_info(pdfinfo_from_bytes(content))
+            page_size = info["page_size"]
+            total_pages = info["total_pages"]
             
         except Exception as e:
             os.remove(file_path)
             raise HTTPException(status_code=400, detail=f"Error processing PDF: {str(e)}")
         
-        # Store file info
-        file_info = {
-            "file_id": file_id,
-            "filename": file.filename,
-            "file_path": file_path,
-            "total_pages": total_pages,
-            "page_size": page_size,
-            "created_at": datetime.now().isoformat()
-        }
-        
+        # Store by content hash; a copy of a stored PDF just gets another file_id
+        file_info, _deduplicated = upload_manifest.store(
+            file_id, file.filename, file_path, hashlib.sha256(content).hexdigest(), info=info
+        )
         file_storage[file_id] = file_info
         
         return JSONResponse({
@@ -0,0 +1,757 @@
+"""
+PDF upload, rendering and editing endpoints.
+
+Imported by the app factory in ``main.py`` for every worker role. PyMuPDF
+is imported on first use and the upload manifest is opened on first use,
+so importing this module costs next to nothing.
+"""
+import asyncio
+import base64
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, File, Header, HTTPException, Query, Request, UploadFile
+from fastapi.responses import FileResponse, JSONResponse, Response
+from pydantic import BaseModel
+from starlette.requests import ClientDisconnect
+
+from boot import Lazy, is_ready, lazy_import
+from job_queue import ACTIVE_STATUSES, JobQueue
+from metrics import OUTPUT_BYTES, REGISTRY, STAGE_SECONDS, stage_timer
+import pdf_workers
+from pdf_workers import PDFWorkerError, PDFWorkerPool, process_count
+from render_cache import MEDIA_TYPES, RenderCache, etag, render_key
+from state_backend import StateNamespace, default_state_backend
+from upload_manifest import UploadManifest, sha256_file
+from upload_stream import ChunkedUploads, IncomingUpload, UploadRejected
+
+fitz = lazy_import("fitz")  # PyMuPDF
+
+router = APIRouter()
+
+# State shared by every uvicorn worker: in-process by default, a SQLite file with STATE_BACKEND=sqlite
+state = Lazy("state", default_state_backend)
+
+# Pydantic models
+class AnnotationData(BaseModel):
+    id: str
+    type: str
+    x: float
+    y: float
+    width: float = 0
+    height: float = 0
+    text: str = ""
+    color: str = "#000000"
+    size: int = 2
+    page: int = 0
+    points: List[Dict[str, float]] = []
+
+class PDFEditRequest(BaseModel):
+    file_id: str
+    annotations: List[AnnotationData]
+    page: int = 0
+
+class PDFTextEditRequest(BaseModel):
+    file_id: str
+    page: int
+    text_blocks: List[Dict[str, Any]]  # List of text blocks with position and content
+
+class PDFTextExtractRequest(BaseModel):
+    file_id: str
+    page: int = 0
+
+class ChunkedUploadRequest(BaseModel):
+    filename: str
+    total_size: Optional[int] = None  # bytes; when given, the upload must be exactly this long
+
+# Uploaded file metadata, shared between workers (entries are replaced, never mutated in place)
+file_storage = StateNamespace(state, "files")
+
+def inspect_pdf(file_path: str) -> Dict[str, Any]:
+    """Page count and first page size of a PDF on disk"""
+    with stage_timer("pdf_open"):
+        pdf_doc = fitz.open(file_path)
+    with pdf_doc:
+        page_rect = pdf_doc[0].rect
+        return {"total_pages": pdf_doc.page_count, "page_size": {"width": page_rect.width, "height": page_rect.height}}
+
+# Open documents of this process, by path: an upload's blob or one of its saved edits.
+# PDF worker processes keep their own, which notice new versions by size and mtime.
+doc_pool = pdf_workers.documents
+
+def observe_stage(stage: str, seconds: float):
+    STAGE_SECONDS.labels(stage).observe(seconds)
+
+# Rendering, text extraction and saving run in worker processes, off the event loop
+pdf_pool = Lazy("pdf_pool", lambda: PDFWorkerPool(
+    process_count(os.getenv("PDF_WORKERS", "auto")),
+    max_pending=int(os.getenv("PDF_QUEUE_SIZE", "0")) or None,
+    task_timeout=float(os.getenv("PDF_TASK_TIMEOUT_SECONDS", "30")),
+    queue_wait=float(os.getenv("PDF_QUEUE_WAIT_SECONDS", "2")),
+    observe=observe_stage
+))
+
+async def pdf_worker_error_handler(request, exc: PDFWorkerError):
+    """Busy or timed-out PDF workers: ask the client to retry rather than reporting a bad request"""
+    headers = {"Retry-After": "1"} if exc.status_code == 503 else {}
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail}, headers=headers)
+
+# Installed on the app by the factory (routers can't carry exception handlers)
+exception_handlers = {PDFWorkerError: pdf_worker_error_handler}
+
+# Metadata of everything in uploads/, so startup doesn't open every PDF
+upload_manifest = Lazy("upload_manifest", lambda: UploadManifest(
+    os.getenv("UPLOAD_MANIFEST_DB", "data/upload_manifest.db"),
+    inspect_pdf,
+    scan_workers=int(os.getenv("UPLOAD_SCAN_WORKERS", "4"))
+))
+
+def load_existing_files():
+    """Register the uploads recorded in the manifest; the startup scan picks up anything newer"""
+    started = time.perf_counter()
+    entries = upload_manifest.load()
+    for file_info in entries:
+        if file_info["file_id"] not in file_storage:
+            file_storage[file_info["file_id"]] = file_info
+    print(f"Loaded {len(entries)} files from the upload manifest in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+# Moving loose uploads/*.pdf files into the blob store rewrites uploads/, so it only happens when asked for
+MIGRATE_UPLOADS = os.getenv("MIGRATE_UPLOADS", "").lower() in ("1", "true", "yes")
+
+async def scan_uploads():
+    """Register loose uploads in the background (moving them into the blob store with MIGRATE_UPLOADS)
+    and drop entries whose file is gone"""
+    started = time.perf_counter()
+    changed, removed = await asyncio.to_thread(upload_manifest.scan, MIGRATE_UPLOADS)
+    for file_info in changed:
+        file_storage[file_info["file_id"]] = file_info
+    for file_id in removed:
+        file_storage.pop(file_id, None)
+    print(f"Upload scan: {upload_manifest.last_scan} in {time.perf_counter() - started:.2f}s")
+    state.delete("uploads", "scan")
+
+# Uploads are written to disk as they arrive, never held in memory whole
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", "100")) * 1024 * 1024)
+UPLOAD_READ_BYTES = 1024 * 1024
+
+# Resumable uploads in progress; kept under uploads/ so completing one is a rename
+chunked_uploads = Lazy("chunked_uploads", lambda: ChunkedUploads(
+    "uploads/.partial",
+    MAX_UPLOAD_BYTES,
+    chunk_bytes=int(float(os.getenv("UPLOAD_CHUNK_MB", "8")) * 1024 * 1024),
+    ttl_seconds=float(os.getenv("CHUNKED_UPLOAD_TTL_HOURS", "24")) * 3600
+))
+
+def require_file(file_id: str) -> Dict[str, Any]:
+    """Metadata of an uploaded file, checked against the file on disk (one stat); 404 if unknown or gone"""
+    file_info = file_storage.get(file_id)
+    if file_info is None:
+        # Possibly recorded by another worker since this process loaded the manifest
+        file_info = upload_manifest.get(file_id)
+        if file_info is None:
+            raise HTTPException(status_code=404, detail="File not found")
+    checked = upload_manifest.validate(file_info)
+    if checked is None:
+        file_storage.pop(file_id, None)
+        raise HTTPException(status_code=404, detail="File not found")
+    if checked is not file_info or file_id not in file_storage:
+        file_storage[file_id] = checked
+    return checked
+
+# Rendered pages by content hash, page, zoom and format: memory first, then a directory shared by workers
+render_cache = Lazy("render_cache", lambda: RenderCache(
+    max_memory_bytes=int(float(os.getenv("RENDER_CACHE_MEMORY_MB", "64")) * 1024 * 1024),
+    disk_dir=os.getenv("RENDER_CACHE_DIR", "data/render_cache") or None,
+    max_disk_bytes=int(float(os.getenv("RENDER_CACHE_DISK_MB", "512")) * 1024 * 1024)
+))
+
+# Document versions a page can be rendered from: the upload itself or one of its saved edits
+EDITED_VERSIONS = {
+    "edited": "processed/{file_id}_edited.pdf",
+    "text_edited": "processed/{file_id}_text_edited.pdf",
+}
+
+# Saved edits are hashed once per version: path -> (size, mtime_ns, sha256); delete_pdf drops a file's entries
+version_hashes: Dict[str, Tuple[int, int, str]] = {}
+
+async def version_hash(path: str) -> Optional[str]:
+    """Content hash of a saved edit, None if there is none; new versions are hashed off the event loop"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        version_hashes.pop(path, None)
+        return None
+    known = version_hashes.get(path)
+    if known is not None and known[:2] == (stat.st_size, stat.st_mtime_ns):
+        return known[2]
+    content_hash = await asyncio.to_thread(sha256_file, path)
+    version_hashes[path] = (stat.st_size, stat.st_mtime_ns, content_hash)
+    return content_hash
+
+async def save_version(task, file_info: Dict[str, Any], page: int, edits: List[Dict[str, Any]], output_path: str):
+    """Apply an edit in a PDF worker, save it over ``output_path`` and drop the open handles and cached pages
+    of the version it replaces"""
+    previous = await version_hash(output_path)
+    # The worker saves aside and it is renamed here, so handles still reading the previous version
+    # never see a half-written file
+    temp_path = f"{output_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        size = await pdf_pool.run(task, file_info["file_path"], page, edits, temp_path)
+        doc_pool.invalidate(output_path)
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    OUTPUT_BYTES.labels("save").inc(size)
+    if previous is not None and previous != await version_hash(output_path):
+        render_cache.invalidate(previous)
+
+async def render_pages(path: str, pages: List[int], zoom: float, fmt: str) -> List[bytes]:
+    """Pages of a PDF as encoded images, rendered in a PDF worker"""
+    images = await pdf_pool.run(pdf_workers.render_pages, path, pages, zoom, fmt)
+    OUTPUT_BYTES.labels("render").inc(sum(len(img_data) for img_data in images))
+    return images
+
+def split_pages(pages: List[int], parts: int) -> List[List[int]]:
+    """Contiguous runs of ``pages`` for up to ``parts`` workers"""
+    size = max(1, -(-len(pages) // max(1, parts)))
+    return [pages[i:i + size] for i in range(0, len(pages), size)]
+
+# Upload returns metadata only; page thumbnails are rendered into the render cache in the background
+THUMBNAIL_DPI = int(os.getenv("THUMBNAIL_DPI", "36"))
+THUMBNAIL_FORMAT = os.getenv("THUMBNAIL_FORMAT", "webp")
+
+def thumbnail_key(file_info: Dict[str, Any], page: int):
+    return render_key(file_info["sha256"], page, THUMBNAIL_DPI / 72, THUMBNAIL_FORMAT)
+
+# Thumbnails rendered per PDF worker task: small enough to report progress and leave room for requests
+THUMBNAIL_BATCH_PAGES = 8
+
+async def render_thumbnails(file_info: Dict[str, Any], progress) -> int:
+    """Render every thumbnail of an upload that isn't cached yet; returns how many were rendered"""
+    # A re-upload of stored content usually has them all already, and then the PDF isn't opened
+    missing = [page_num for page_num in range(file_info["total_pages"])
+               if not render_cache.contains(thumbnail_key(file_info, page_num))]
+    done = 0
+    for batch in split_pages(missing, -(-len(missing) // THUMBNAIL_BATCH_PAGES)):
+        await render_thumbnail_pages(file_info, batch)
+        done += len(batch)
+        progress(int(done * 100 / len(missing)), f"page {done}/{len(missing)}")
+    return len(missing)
+
+async def run_thumbnail_job(job: Dict[str, Any], progress) -> Dict[str, Any]:
+    file_info = job["payload"]
+    if not os.path.exists(file_info["file_path"]):
+        # Deleted before its thumbnails were built
+        return {"file_id": file_info["file_id"], "total_pages": file_info["total_pages"], "rendered": 0}
+    rendered = await render_thumbnails(file_info, progress)
+    return {"file_id": file_info["file_id"], "total_pages": file_info["total_pages"], "rendered": rendered}
+
+thumbnail_jobs = Lazy("thumbnail_jobs", lambda: JobQueue(
+    os.getenv("THUMBNAIL_JOBS_DB", "data/thumbnail_jobs.db"),
+    run_thumbnail_job,
+    kind="thumbnails",
+    workers=int(os.getenv("THUMBNAIL_WORKERS", "1")),
+    retention_seconds=float(os.getenv("JOB_RETENTION_HOURS", "168")) * 3600
+))
+
+# Thumbnail job of each upload, so any worker can report its progress: file_id -> job_id
+thumbnail_job_ids = StateNamespace(state, "thumbnails")
+
+def queue_thumbnails(file_info: Dict[str, Any]) -> Dict[str, Any]:
+    # Identical uploads share one job while it runs, and their thumbnails afterwards
+    job = thumbnail_jobs.submit(file_info, dedupe_key=file_info["sha256"])
+    thumbnail_job_ids[file_info["file_id"]] = job["job_id"]
+    return job
+
+def render_cache_samples():
+    # Nothing to report until the first page was rendered
+    if is_ready(render_cache):
+        stats = render_cache.stats()
+        name = "boothbrain_render_cache_lookups_total"
+        yield name, {"result": "memory_hit"}, stats["memory_hits"]
+        yield name, {"result": "disk_hit"}, stats["disk_hits"]
+        yield name, {"result": "miss"}, stats["misses"]
+
+REGISTRY.add_collector("boothbrain_render_cache_lookups_total", "counter",
+                       "Rendered page cache lookups by tier and result", render_cache_samples)
+
+def doc_pool_samples():
+    # Handles opened in this process (PDF_WORKERS=0); worker processes keep their own
+    stats = doc_pool.stats()
+    name = "boothbrain_doc_pool_checkouts_total"
+    yield name, {"result": "reused"}, stats["reuses"]
+    yield name, {"result": "opened"}, stats["opens"]
+
+REGISTRY.add_collector("boothbrain_doc_pool_checkouts_total", "counter",
+                       "PDF document checkouts served by a pooled open handle or a fresh open", doc_pool_samples)
+
+def pdf_pool_samples():
+    if is_ready(pdf_pool):
+        stats = pdf_pool.stats()
+        name = "boothbrain_pdf_tasks_total"
+        for result in ("completed", "failed", "rejected", "timeouts", "resubmitted"):
+            yield name, {"result": result}, stats[result]
+
+REGISTRY.add_collector("boothbrain_pdf_tasks_total", "counter",
+                       "PDF worker tasks by outcome (rejected: queue full; timeouts: killed after the task timeout; "
+                       "resubmitted: moved off a pool retired for another task's timeout)",
+                       pdf_pool_samples)
+
+async def startup():
+    """Called from the app's lifespan: register known uploads, then scan for new ones in the background"""
+    load_existing_files()
+    # One worker scans; the others see its results through the shared manifest
+    if state.set_if_absent("uploads", "scan", os.getpid(), ttl=300):
+        asyncio.create_task(scan_uploads())
+    # Picks up thumbnail jobs interrupted by a restart
+    thumbnail_jobs.start()
+
+async def shutdown():
+    await thumbnail_jobs.stop()
+    if is_ready(pdf_pool):
+        await asyncio.to_thread(pdf_pool.shutdown)
+
+@router.get("/debug/files")
+async def debug_files():
+    return {"loaded_files": list(file_storage.keys()), "file_count": len(file_storage),
+            "manifest": upload_manifest.stats(), "render_cache": render_cache.stats(),
+            "thumbnail_jobs": thumbnail_jobs.stats(), "chunked_uploads": chunked_uploads.stats(),
+            "doc_pool": doc_pool.stats(), "pdf_workers": pdf_pool.stats()}
+
+async def render_previews(file_info: Dict[str, Any]) -> List[str]:
+    """Every page as a base64 PNG at 2x zoom, for clients of the inline upload response"""
+    pages = list(range(file_info["total_pages"]))
+    # Split across the worker processes so a long document renders on every core
+    batches = split_pages(pages, pdf_pool.processes)
+    rendered = await asyncio.gather(*(render_pages(file_info["file_path"], batch, 2, "png") for batch in batches))
+    page_images = []
+    for page_num, img_data in zip(pages, (img_data for images in rendered for img_data in images)):
+        page_images.append(base64.b64encode(img_data).decode())
+        # The editor asks for these pages next
+        render_cache.put(render_key(file_info["sha256"], page_num, 2, "png"), img_data)
+    return page_images
+
+def pdf_filename(filename: Optional[str]) -> str:
+    filename = os.path.basename(filename or "")
+    if not filename.lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+    return filename
+
+async def accept_upload(incoming: IncomingUpload, filename: str, inline_previews: bool) -> JSONResponse:
+    """Store a fully received upload by content hash, register its file_id and queue its thumbnails
+
+    Content that is already stored is not parsed again: the new file_id
+    shares the existing blob, its metadata and everything cached for it.
+    """
+    file_id = str(uuid.uuid4())
+    try:
+        incoming.finish()
+        # Already computed while receiving, unless a resumed upload changed workers
+        sha256 = await asyncio.to_thread(incoming.sha256)
+        file_info, deduplicated = await asyncio.to_thread(upload_manifest.store, file_id, filename, incoming.path, sha256)
+    except Exception as e:
+        incoming.discard()
+        detail = e.detail if isinstance(e, UploadRejected) else f"Invalid PDF: {e}"
+        raise HTTPException(status_code=400, detail=detail)
+    file_storage[file_id] = file_info
+    
+    page_images = None
+    if inline_previews:
+        page_images = await render_previews(file_info)
+    
+    job = queue_thumbnails(file_info)
+    response = {
+        "file_id": file_id,
+        "filename": filename,
+        "total_pages": file_info["total_pages"],
+        "page_size": file_info["page_size"],
+        "sha256": sha256,
+        "deduplicated": deduplicated,
+        "thumbnails": {
+            "job_id": job["job_id"],
+            "status": job["status"],
+            "format": THUMBNAIL_FORMAT,
+            "dpi": THUMBNAIL_DPI,
+            "url": f"/thumbnails/{file_id}",
+        },
+        "message": "PDF uploaded successfully"
+    }
+    if page_images is not None:
+        response["page_images"] = page_images
+    return JSONResponse(response)
+
+@router.post("/upload-pdf")
+async def upload_pdf(file: UploadFile = File(...), inline_previews: bool = False):
+    """Store a PDF and return its metadata; page thumbnails are rendered in the background
+
+    ``inline_previews=true`` also returns every page as a base64 PNG, as upload used to.
+    """
+    filename = pdf_filename(file.filename)
+    incoming = IncomingUpload(chunked_uploads.temp_path(), MAX_UPLOAD_BYTES)
+    try:
+        while chunk := await file.read(UPLOAD_READ_BYTES):
+            incoming.write(chunk)
+    except UploadRejected as e:
+        incoming.discard()
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    return await accept_upload(incoming, filename, inline_previews)
+
+@router.post("/upload-pdf/stream")
+async def upload_pdf_stream(request: Request, filename: str, inline_previews: bool = False):
+    """Same as /upload-pdf, with the PDF as the raw request body, written to disk as it arrives"""
+    filename = pdf_filename(filename)
+    declared = request.headers.get("content-length")
+    if declared is not None and declared.isdigit() and int(declared) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload is larger than {MAX_UPLOAD_BYTES} bytes")
+    incoming = IncomingUpload(chunked_uploads.temp_path(), MAX_UPLOAD_BYTES)
+    try:
+        async for chunk in request.stream():
+            incoming.write(chunk)
+    except UploadRejected as e:
+        incoming.discard()
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except ClientDisconnect:
+        incoming.discard()
+        raise
+    return await accept_upload(incoming, filename, inline_previews)
+
+@router.post("/uploads")
+async def create_chunked_upload(request: ChunkedUploadRequest):
+    """Start a resumable upload; send the file with PUT /uploads/{upload_id}?offset=..."""
+    try:
+        return chunked_uploads.create(pdf_filename(request.filename), request.total_size)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+@router.get("/uploads/{upload_id}")
+async def get_chunked_upload(upload_id: str):
+    """How much of a resumable upload has arrived; resume from ``offset``"""
+    status = chunked_uploads.status(upload_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return status
+
+@router.put("/uploads/{upload_id}")
+async def put_upload_chunk(upload_id: str, offset: int, request: Request):
+    """Append the request body to a resumable upload; ``offset`` must match the bytes already received"""
+    # One chunk at a time per upload, whichever worker receives it
+    if not state.set_if_absent("upload_chunks", upload_id, os.getpid(), ttl=300):
+        raise HTTPException(status_code=409, detail="Another chunk of this upload is being written")
+    try:
+        incoming = chunked_uploads.open_chunk(upload_id, offset)
+        try:
+            async for chunk in request.stream():
+                incoming.write(chunk)
+        finally:
+            # Whatever arrived before a rejection or disconnect stays, and the client resumes from there
+            status = chunked_uploads.chunk_written(upload_id, incoming)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    finally:
+        state.delete("upload_chunks", upload_id)
+    return status
+
+@router.post("/uploads/{upload_id}/complete")
+async def complete_chunked_upload(upload_id: str, inline_previews: bool = False):
+    """Finish a resumable upload; answers like /upload-pdf"""
+    # Same lease as put_upload_chunk, so a chunk still being written can't be cut off
+    if not state.set_if_absent("upload_chunks", upload_id, os.getpid(), ttl=300):
+        raise HTTPException(status_code=409, detail="A chunk of this upload is still being written")
+    try:
+        try:
+            incoming, filename = chunked_uploads.complete(upload_id)
+        except UploadRejected as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        return await accept_upload(incoming, filename, inline_previews)
+    finally:
+        state.delete("upload_chunks", upload_id)
+
+@router.delete("/uploads/{upload_id}")
+async def abort_chunked_upload(upload_id: str):
+    if not chunked_uploads.abort(upload_id):
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return {"message": "Upload aborted"}
+
+async def render_thumbnail_pages(file_info: Dict[str, Any], pages: List[int]) -> Dict[int, bytes]:
+    """Render thumbnails of ``pages`` into the render cache"""
+    images = await render_pages(file_info["file_path"], pages, THUMBNAIL_DPI / 72, THUMBNAIL_FORMAT)
+    thumbnails = dict(zip(pages, images))
+    for page_num, img_data in thumbnails.items():
+        render_cache.put(thumbnail_key(file_info, page_num), img_data)
+    return thumbnails
+
+@router.get("/thumbnail/{file_id}/{page}")
+async def get_thumbnail(file_id: str, page: int, if_none_match: Optional[str] = Header(None)):
+    """Thumbnail of one page, rendered now if the background job hasn't produced it yet"""
+    file_info = require_file(file_id)
+    if page < 0 or page >= file_info["total_pages"]:
+        raise HTTPException(status_code=400, detail="Page number out of range")
+    
+    key = thumbnail_key(file_info, page)
+    headers = {"Access-Control-Allow-Origin": "*", "ETag": etag(key), "Cache-Control": "no-cache"}
+    if if_none_match == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    
+    img_data = render_cache.get(key)
+    if img_data is None:
+        try:
+            # The background job hasn't got to it, or it was evicted
+            img_data = (await render_thumbnail_pages(file_info, [page]))[page]
+        except PDFWorkerError:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Error rendering thumbnail: {str(e)}")
+    return Response(content=img_data, media_type=MEDIA_TYPES[THUMBNAIL_FORMAT], headers=headers)
+
+@router.get("/thumbnails/{file_id}")
+async def get_thumbnails(file_id: str, start: int = 0, limit: int = 50):
+    """Base64 thumbnails of up to ``limit`` pages from ``start``
+
+    Pages the background job is still working through are listed under
+    ``pending``; poll again for them. Thumbnails missing for any other
+    reason (evicted, or uploaded before thumbnails existed) are rendered
+    on the spot.
+    """
+    file_info = require_file(file_id)
+    if start < 0 or not 1 <= limit <= 200:
+        raise HTTPException(status_code=400, detail="start must be >= 0 and limit between 1 and 200")
+    
+    job_id = thumbnail_job_ids.get(file_id)
+    job = thumbnail_jobs.get(job_id) if job_id else None
+    building = job is not None and job["status"] in ACTIVE_STATUSES
+    
+    thumbnails, pending, missing = {}, [], []
+    for page in range(start, min(start + limit, file_info["total_pages"])):
+        img_data = render_cache.get(thumbnail_key(file_info, page))
+        if img_data is not None:
+            thumbnails[page] = img_data
+        elif building:
+            pending.append(page)
+        else:
+            missing.append(page)
+    if missing:
+        try:
+            thumbnails.update(await render_thumbnail_pages(file_info, missing))
+        except PDFWorkerError:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Error rendering thumbnails: {str(e)}")
+    
+    return {
+        "file_id": file_id,
+        "total_pages": file_info["total_pages"],
+        "format": THUMBNAIL_FORMAT,
+        "media_type": MEDIA_TYPES[THUMBNAIL_FORMAT],
+        "job": {"job_id": job["job_id"], "status": job["status"], "progress": job["progress"]} if job else None,
+        "thumbnails": {str(page): base64.b64encode(thumbnails[page]).decode() for page in sorted(thumbnails)},
+        "pending": pending,
+    }
+
+@router.get("/pdf-info/{file_id}")
+async def get_pdf_info(file_id: str):
+    """Get PDF file information: name, page count and page size were read once at upload"""
+    return require_file(file_id)
+
+@router.get("/pdf-page/{file_id}/{page}")
+async def get_pdf_page(file_id: str, page: int, zoom: float = 2.0, fmt: str = Query("png", alias="format"),
+                       version: str = "original", if_none_match: Optional[str] = Header(None)):
+    """Get a specific page of a PDF as an image, from the render cache when possible"""
+    file_info = require_file(file_id)
+    fmt = "jpg" if fmt == "jpeg" else fmt
+    if fmt not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(MEDIA_TYPES)}")
+    if not 0.25 <= zoom <= 4:
+        raise HTTPException(status_code=400, detail="zoom must be between 0.25 and 4")
+    if page < 0 or page >= file_info["total_pages"]:
+        raise HTTPException(status_code=400, detail="Page number out of range")
+    
+    if version == "original":
+        pdf_path, content_hash = file_info["file_path"], file_info["sha256"]
+    elif version in EDITED_VERSIONS:
+        pdf_path = EDITED_VERSIONS[version].format(file_id=file_id)
+        content_hash = await version_hash(pdf_path)
+        if content_hash is None:
+            raise HTTPException(status_code=404, detail="Edited PDF not found")
+    else:
+        raise HTTPException(status_code=400, detail=f"version must be original or one of {', '.join(EDITED_VERSIONS)}")
+    
+    key = render_key(content_hash, page, zoom, fmt)
+    headers = {"Access-Control-Allow-Origin": "*", "ETag": etag(key), "Cache-Control": "no-cache"}
+    if if_none_match == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    
+    img_data = render_cache.get(key)
+    if img_data is None:
+        try:
+            img_data = (await render_pages(pdf_path, [page], zoom, fmt))[0]
+        except PDFWorkerError:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Error rendering page: {str(e)}")
+        render_cache.put(key, img_data)
+    
+    headers["Content-Disposition"] = f'attachment; filename="page_{page + 1}.{fmt}"'
+    return Response(content=img_data, media_type=MEDIA_TYPES[fmt], headers=headers)
+
+@router.post("/add-annotations")
+async def add_annotations(request: PDFEditRequest):
+    file_info = require_file(request.file_id)
+    if request.page < 0 or request.page >= file_info["total_pages"]:
+        raise HTTPException(status_code=400, detail="Page number out of range")
+    
+    try:
+        output_path = f"processed/{request.file_id}_edited.pdf"
+        annotations = [annotation.model_dump() for annotation in request.annotations]
+        await save_version(pdf_workers.annotate, file_info, request.page, annotations, output_path)
+        return {"message": "Annotations added successfully", "output_path": output_path}
+    except PDFWorkerError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/download-pdf/{file_id}")
+async def download_pdf(file_id: str):
+    file_info = require_file(file_id)
+    output_path = f"processed/{file_id}_edited.pdf"
+    if not os.path.exists(output_path):
+        raise HTTPException(status_code=404, detail="Edited PDF not found")
+    return FileResponse(output_path, filename=f"edited_{file_info['filename']}", media_type="application/pdf")
+
+# ====================== PDF Text Editing Endpoints ======================
+# Extracted text by (content hash, page), shared by every file_id with the same content
+TEXT_CACHE_PAGES = int(os.getenv("TEXT_CACHE_PAGES", "512"))
+page_text_cache: "OrderedDict[Tuple[str, int], Tuple[List[Dict[str, Any]], Dict[str, float]]]" = OrderedDict()
+
+@router.post("/extract-pdf-text")
+async def extract_pdf_text(request: PDFTextExtractRequest):
+    """Extract text from a specific page of a PDF with position information"""
+    file_info = require_file(request.file_id)
+    if request.page < 0 or request.page >= file_info["total_pages"]:
+        raise HTTPException(status_code=400, detail="Page number out of range")
+    
+    key = (file_info["sha256"], request.page)
+    cached = page_text_cache.get(key)
+    if cached is not None:
+        page_text_cache.move_to_end(key)
+    else:
+        try:
+            cached = await pdf_pool.run(pdf_workers.page_text, file_info["file_path"], request.page)
+        except PDFWorkerError:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Error extracting text: {str(e)}")
+        page_text_cache[key] = cached
+        while len(page_text_cache) > TEXT_CACHE_PAGES:
+            page_text_cache.popitem(last=False)
+    text_blocks, page_size = cached
+    
+    response_data = {
+        "file_id": request.file_id,
+        "page": request.page,
+        # Block ids are per response, as before
+        "text_blocks": [{"id": str(uuid.uuid4()), **block} for block in text_blocks],
+        "page_size": page_size
+    }
+    
+    return JSONResponse(
+        content=response_data,
+        headers={"Access-Control-Allow-Origin": "*"}
+    )
+
+@router.post("/update-pdf-text")
+async def update_pdf_text(request: PDFTextEditRequest):
+    """Update text content in a PDF by replacing text blocks"""
+    file_info = require_file(request.file_id)
+    if request.page < 0 or request.page >= file_info["total_pages"]:
+        raise HTTPException(status_code=400, detail="Page number out of range")
+    
+    try:
+        # Clears the page and writes the new text blocks on it
+        output_path = f"processed/{request.file_id}_text_edited.pdf"
+        await save_version(pdf_workers.replace_text, file_info, request.page, request.text_blocks, output_path)
+        
+        response_data = {
+            "message": "PDF text updated successfully",
+            "output_path": output_path,
+            "file_id": request.file_id
+        }
+        
+        return JSONResponse(
+            content=response_data,
+            headers={"Access-Control-Allow-Origin": "*"}
+        )
+        
+    except PDFWorkerError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error updating PDF text: {str(e)}")
+
+@router.get("/download-text-pdf/{file_id}")
+async def download_text_pdf(file_id: str):
+    """Download the text-edited PDF or original if no edits exist"""
+    file_info = require_file(file_id)
+    output_path = f"processed/{file_id}_text_edited.pdf"
+    
+    # If no edited version exists, return the original PDF
+    if not os.path.exists(output_path):
+        return FileResponse(
+            file_info["file_path"], 
+            filename=f"original_{file_info['filename']}", 
+            media_type="application/pdf",
+            headers={"Access-Control-Allow-Origin": "*"}
+        )
+    
+    return FileResponse(
+        output_path, 
+        filename=f"text_edited_{file_info['filename']}", 
+        media_type="application/pdf",
+        headers={"Access-Control-Allow-Origin": "*"}
+    )
+
+@router.get("/processed/{filename}")
+async def serve_processed_file(filename: str):
+    """Serve files from the processed directory"""
+    try:
+        file_path = f"processed/{filename}"
+        if not os.path.exists(file_path):
+            raise HTTPException(status_code=404, detail="File not found")
+        
+        return FileResponse(
+            file_path,
+            media_type='application/pdf',
+            filename=filename,
+            headers={"Access-Control-Allow-Origin": "*"}
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error serving file: {str(e)}")
+
+@router.delete("/pdf/{file_id}")
+async def delete_pdf(file_id: str):
+    file_info = require_file(file_id)
+    
+    edited_paths = [template.format(file_id=file_id) for template in EDITED_VERSIONS.values()]
+    for path in edited_paths:
+        content_hash = await version_hash(path)
+        version_hashes.pop(path, None)
+        if content_hash is not None:
+            render_cache.invalidate(content_hash)
+            doc_pool.invalidate(path)
+    
+    for path in [f"processed/{file_id}_final.pdf"] + edited_paths:
+        if os.path.exists(path):
+            os.remove(path)
+    
+    # The upload's bytes and cached pages go only with the last file_id sharing them
+    released = upload_manifest.release(file_id)
+    if released is not None:
+        render_cache.invalidate(released)
+        doc_pool.invalidate(file_info["file_path"])
+        for key in [key for key in page_text_cache if key[0] == released]:
+            del page_text_cache[key]
+    file_storage.pop(file_id, None)
+    thumbnail_job_ids.pop(file_id, None)
+    return {"message": "PDF deleted successfully", "content_deleted": released is not None}
@@ -0,0 +1,462 @@
+"""
+Worker processes for CPU-bound PDF work.
+
+Rasterising, encoding, text extraction and saving used to run on the
+event loop thread, so one heavy page stalled every request and a worker
+used a single core. ``PDFWorkerPool`` runs them in a pool of processes.
+Tasks are the module-level functions below: they take a file path, page
+numbers and small parameters and return image bytes or small dicts.
+Edited documents are saved to a path the caller gives rather than sent
+back, so nothing large is pickled. Each process keeps its own pool of
+open documents, so the process that rendered a page can reuse the parsed
+document.
+
+Only ``max_pending`` tasks are queued or running at once. A caller waits
+up to ``queue_wait`` seconds for a slot and then gets ``PDFWorkersBusy``
+(503), so overload turns into fast refusals rather than a growing backlog.
+Each task reports when a process actually starts it, so the timeout
+measures running time, not time spent queued. A task that runs past
+``task_timeout`` raises ``PDFTaskTimeout`` (504); one that waited that long
+without starting raises ``PDFWorkersBusy``. A running task can't be
+cancelled, and killing one process breaks the whole
+``ProcessPoolExecutor``, so the pool holding the runaway is retired
+instead: new tasks go to a fresh pool, tasks already running beside the
+runaway finish normally, and only then are the old processes killed.
+Tasks that were still queued on the retired pool are resubmitted to the
+fresh one rather than failed.
+
+With ``processes=0`` tasks run on threads in this process instead
+(development, or platforms where spawning is unwelcome).
+"""
+import asyncio
+import io
+import itertools
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from boot import lazy_import
+from doc_pool import DocumentPool
+
+fitz = lazy_import("fitz")  # PyMuPDF
+Image = lazy_import("PIL.Image")  # WebP encoding
+
+# ---- worker side ------------------------------------------------------
+_current = threading.local()
+
+
+@contextmanager
+def _stage(name: str) -> Iterator[None]:
+    """Time one stage of the running task; the caller records it in its own metrics"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = getattr(_current, "timings", None)
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - started
+
+
+def _task(fn: Callable) -> Callable:
+    """Make ``fn`` return ``(result, {stage: seconds})``"""
+    @wraps(fn)
+    def run(*args):
+        _current.timings = {}
+        try:
+            return fn(*args), _current.timings
+        finally:
+            _current.timings = None
+    return run
+
+
+def _open_document(path: str):
+    with _stage("pdf_open"):
+        return fitz.open(path)
+
+
+# Open documents of this process, by path
+documents = DocumentPool(_open_document, max_documents=int(os.getenv("DOC_POOL_SIZE", "32")))
+
+
+def hex_to_rgb(hex_color: str):
+    hex_color = hex_color.lstrip("#")
+    return tuple(int(hex_color[i:i+2], 16)/255 for i in (0, 2, 4))
+
+
+def encode_pixmap(pix, fmt: str) -> bytes:
+    """PNG and JPEG straight from PyMuPDF, WebP through Pillow"""
+    if fmt != "webp":
+        return pix.tobytes(fmt)
+    buffer = io.BytesIO()
+    Image.frombytes("RGB", (pix.width, pix.height), pix.samples).save(buffer, "WEBP", quality=75)
+    return buffer.getvalue()
+
+
+@_task
+def render_pages(path: str, pages: List[int], zoom: float, fmt: str) -> List[bytes]:
+    """Pages of a PDF as encoded images, in the order asked for"""
+    images = []
+    with documents.checkout(path) as pdf_doc:
+        for page_num in pages:
+            with _stage("render"):
+                pix = pdf_doc[page_num].get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+            with _stage("encode"):
+                images.append(encode_pixmap(pix, fmt))
+    return images
+
+
+@_task
+def page_text(path: str, page_num: int) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+    """Text blocks (without ids) and size of one page"""
+    with documents.checkout(path) as pdf_doc, _stage("text"):
+        page = pdf_doc[page_num]
+        text_blocks = []
+        for block in page.get_text("dict")["blocks"]:
+            if "lines" in block:  # Text block
+                block_text = ""
+                block_bbox = block["bbox"]  # [x0, y0, x1, y1]
+                for line in block["lines"]:
+                    line_text = ""
+                    for span in line["spans"]:
+                        line_text += span["text"]
+                    block_text += line_text + "\n"
+                if block_text.strip():
+                    text_blocks.append({
+                        "text": block_text.strip(),
+                        "bbox": block_bbox,
+                        "x": block_bbox[0],
+                        "y": block_bbox[1],
+                        "width": block_bbox[2] - block_bbox[0],
+                        "height": block_bbox[3] - block_bbox[1],
+                        "font_size": line["spans"][0]["size"] if line["spans"] else 12,
+                        "font_family": line["spans"][0]["font"] if line["spans"] else "helvetica"
+                    })
+        return text_blocks, {"width": page.rect.width, "height": page.rect.height}
+
+
+@_task
+def annotate(path: str, page_num: int, annotations: List[Dict[str, Any]], output_path: str) -> int:
+    """Draw annotations on one page and save the document to ``output_path``; returns its size"""
+    with documents.checkout(path, mutate=True) as pdf_doc:
+        page = pdf_doc[page_num]
+        for annotation in annotations:
+            color_rgb = hex_to_rgb(annotation["color"])
+            x, y, width, height, size = (annotation[key] for key in ("x", "y", "width", "height", "size"))
+            if annotation["type"] == "text":
+                page.insert_text(fitz.Point(x, y), annotation["text"], fontsize=size, color=color_rgb)
+            elif annotation["type"] == "rectangle":
+                page.draw_rect(fitz.Rect(x, y, x+width, y+height), color=color_rgb, width=size)
+            elif annotation["type"] == "circle":
+                center = fitz.Point(x + width/2, y + height/2)
+                page.draw_circle(center, width / 2, color=color_rgb, width=size)
+            elif annotation["type"] == "drawing" and len(annotation["points"]) > 1:
+                points = [fitz.Point(p["x"], p["y"]) for p in annotation["points"]]
+                page.draw_polyline(points, color=color_rgb, width=size)
+        with _stage("save"):
+            pdf_doc.save(output_path)
+    return os.path.getsize(output_path)
+
+
+@_task
+def replace_text(path: str, page_num: int, text_blocks: List[Dict[str, Any]], output_path: str) -> int:
+    """Clear one page's content, write ``text_blocks`` on it and save to ``output_path``; returns its size"""
+    with documents.checkout(path, mutate=True) as pdf_doc:
+        page = pdf_doc[page_num]
+        page.clean_contents()
+        for text_block in text_blocks:
+            if text_block.get("text", "").strip():
+                point = fitz.Point(text_block["x"], text_block["y"] + text_block["height"])
+                page.insert_text(
+                    point,
+                    text_block["text"],
+                    fontsize=text_block.get("font_size", 12),
+                    fontname=text_block.get("font_family", "helvetica")
+                )
+        with _stage("save"):
+            pdf_doc.save(output_path)
+    return os.path.getsize(output_path)
+
+
+_started_queue = None
+
+
+def _init_process(started_queue):
+    global _started_queue
+    # Ctrl-C is the parent's business; it shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _started_queue = started_queue
+
+
+def _tracked(token: int, task: Callable, *args):
+    """Tell the parent when a process picks the task up, then run it"""
+    _started_queue.put((token, time.time()))
+    return task(*args)
+
+
+# ---- caller side ------------------------------------------------------
+class PDFWorkerError(Exception):
+    """PDF work that couldn't be done; ``status_code`` is the HTTP status to answer with"""
+
+    status_code = 503
+
+    def __init__(self, detail: str):
+        super().__init__(detail)
+        self.detail = detail
+
+
+class PDFWorkersBusy(PDFWorkerError):
+    status_code = 503
+
+
+class PDFTaskTimeout(PDFWorkerError):
+    status_code = 504
+
+
+def process_count(value: str) -> int:
+    """PDF processes for a PDF_WORKERS setting; ``auto`` shares the CPUs between the uvicorn workers on the box"""
+    if value != "auto":
+        return max(0, int(value))
+    workers = os.getenv("WORKERS", "1")
+    workers = 1 if workers == "auto" else max(1, int(workers))
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+class PDFWorkerPool:
+    """Process pool for the tasks above with a bounded queue, backpressure and per-task timeouts"""
+
+    def __init__(self, processes: int, max_pending: Optional[int] = None, task_timeout: float = 30.0,
+                 queue_wait: float = 2.0, observe: Optional[Callable[[str, float], None]] = None):
+        self.processes = processes
+        self.max_pending = max_pending or max(4, processes * 4)
+        self.task_timeout = task_timeout
+        self.queue_wait = queue_wait
+        # observe(stage, seconds) receives the stage timings reported by each task
+        self.observe = observe
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        # Unfinished futures of every live pool, and the timed-out ones of pools being retired
+        self._in_flight: Dict[ProcessPoolExecutor, Set[Future]] = {}
+        self._retiring: Dict[ProcessPoolExecutor, Set[Future]] = {}
+        self._retired: "weakref.WeakSet[ProcessPoolExecutor]" = weakref.WeakSet()
+        # Per pool, the queue its processes report task starts on; start times of awaited tasks by token
+        self._start_queues: Dict[ProcessPoolExecutor, Any] = {}
+        self._started: Dict[int, Optional[float]] = {}
+        self._tokens = itertools.count()
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.restarts = 0
+        self.resubmitted = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: children don't inherit the server's threads, sockets or SQLite handles
+                context = multiprocessing.get_context("spawn")
+                started_queue = context.SimpleQueue()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes, mp_context=context,
+                    initializer=_init_process, initargs=(started_queue,)
+                )
+                self._start_queues[self._executor] = started_queue
+            return self._executor
+
+    def _start_time(self, executor: ProcessPoolExecutor, token: int) -> Optional[float]:
+        """When a process started the task ``token``, None if none has yet"""
+        started_queue = self._start_queues.get(executor)
+        while started_queue is not None and not started_queue.empty():
+            started, at = started_queue.get()
+            # Starts of tasks nobody awaits any more are dropped
+            if started in self._started:
+                self._started[started] = at
+        return self._started.get(token)
+
+    def _restart(self, executor: ProcessPoolExecutor):
+        """Kill a pool whose process crashed; the next task starts a fresh one"""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+            self._in_flight.pop(executor, None)
+            self.restarts += 1
+        self._kill(executor)
+
+    def _kill(self, executor: ProcessPoolExecutor):
+        self._start_queues.pop(executor, None)
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _track(self, executor: ProcessPoolExecutor, future: Future):
+        with self._lock:
+            self._in_flight.setdefault(executor, set()).add(future)
+        future.add_done_callback(lambda done: self._untrack(executor, done))
+
+    def _untrack(self, executor: ProcessPoolExecutor, future: Future):
+        # Runs on the executor's manager thread; only bookkeeping here, the killing happens in _reap
+        with self._lock:
+            futures = self._in_flight.get(executor)
+            if futures is not None:
+                futures.discard(future)
+
+    def _retire(self, executor: ProcessPoolExecutor, future: Future):
+        """Stop sending work to the pool running the timed-out ``future`` and let its other tasks finish"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                self.restarts += 1
+            self._retired.add(executor)
+            self._retiring.setdefault(executor, set()).add(future)
+            queued = list(self._in_flight.get(executor, ()))
+        # Tasks that haven't started yet are resubmitted by their callers
+        for other in queued:
+            if other is not future:
+                other.cancel()
+        self._reap()
+
+    def _reap(self):
+        """Kill retired pools once nothing but their runaway tasks is left running"""
+        doomed = []
+        with self._lock:
+            for executor, stuck in list(self._retiring.items()):
+                busy = self._in_flight.get(executor, set())
+                # If every process is stuck, whatever else is unfinished is only queued
+                if busy - stuck and len(busy & stuck) < self.processes:
+                    continue
+                del self._retiring[executor]
+                self._in_flight.pop(executor, None)
+                doomed.append(executor)
+        for executor in doomed:
+            self._kill(executor)
+
+    async def _wait(self, executor: ProcessPoolExecutor, waiter: asyncio.Future, token: int) -> bool:
+        """Wait for the task until it has run for ``task_timeout``, or queued that long; False on timeout"""
+        deadline = time.time() + self.task_timeout
+        extended = False
+        while True:
+            done, _ = await asyncio.wait({waiter}, timeout=max(0.0, deadline - time.time()))
+            if done:
+                return True
+            started_at = self._start_time(executor, token)
+            if started_at is None and executor in self._retired and not extended:
+                # Prefetched by a pool retired for another task: it either runs there or fails
+                # with the pool and gets resubmitted, so don't give up on it yet
+                deadline = time.time() + self.task_timeout
+                extended = True
+                continue
+            if started_at is None or time.time() - started_at >= self.task_timeout:
+                return False
+            # It started late: give it its full running time
+            deadline = started_at + self.task_timeout
+
+    async def _run_in_process(self, task: Callable, args: tuple) -> Any:
+        for _ in range(2):
+            executor = self._get_executor()
+            token = next(self._tokens)
+            self._started[token] = None
+            future = executor.submit(_tracked, token, task, *args)
+            self._track(executor, future)
+            waiter = asyncio.wrap_future(future)
+            try:
+                try:
+                    done = await self._wait(executor, waiter, token)
+                except asyncio.CancelledError:
+                    future.cancel()
+                    raise
+                if not done:
+                    # Still queued on a pool retired for another task's timeout: move to the fresh pool
+                    if future.cancel() and executor in self._retired:
+                        self.resubmitted += 1
+                        continue
+                    waiter.cancel()
+                    if self._started.get(token) is None:
+                        # Never started: the queue is long, but nothing is wrong with the pool
+                        raise PDFWorkersBusy("PDF workers are busy, try again shortly")
+                    self.timeouts += 1
+                    self._retire(executor, future)
+                    raise PDFTaskTimeout(f"PDF task took longer than {self.task_timeout:g}s")
+                if not future.cancelled():
+                    return waiter.result()
+            except BrokenProcessPool:
+                if executor not in self._retired:
+                    self._restart(executor)
+                    raise PDFWorkersBusy("A PDF worker process died, try again")
+            finally:
+                self._started.pop(token, None)
+                self._reap()
+            # Caught up in another task's timeout before it could run: try again on the fresh pool
+            self.resubmitted += 1
+        raise PDFWorkersBusy("PDF workers are restarting, try again shortly")
+
+    async def run(self, task: Callable, *args) -> Any:
+        """Run one of the tasks above and return its result"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_wait)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise PDFWorkersBusy("PDF workers are busy, try again shortly")
+        self.pending += 1
+        if self.observe is not None:
+            self.observe("pdf_queue", time.perf_counter() - started)
+        try:
+            if self.processes == 0:
+                result, timings = await asyncio.wait_for(asyncio.to_thread(task, *args), timeout=self.task_timeout)
+            else:
+                result, timings = await self._run_in_process(task, args)
+        except PDFWorkerError:
+            self.failed += 1
+            raise
+        except asyncio.TimeoutError:
+            self.failed += 1
+            self.timeouts += 1
+            raise PDFTaskTimeout(f"PDF task took longer than {self.task_timeout:g}s")
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+            self._slots.release()
+        self.completed += 1
+        if self.observe is not None:
+            for stage, seconds in timings.items():
+                self.observe(stage, seconds)
+        return result
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            retiring = list(self._retiring)
+            self._retiring.clear()
+        for stuck in retiring:
+            self._kill(stuck)
+        if executor is not None:
+            self._start_queues.pop(executor, None)
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "processes": self.processes,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "restarts": self.restarts,
+            "resubmitted": self.resubmitted,
+            "task_timeout": self.task_timeout,
+        }
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Pre-warm announcer reports, report PDFs and game summaries for a weekly slate.
+
+The slate is a JSON list of games, either in the request shape the frontend
+posts (game_id/away_team/home_team/league/date) or the game objects it
+renders (id/awayTeam/homeTeam/league/date). A ``{"games": [...]}`` wrapper
+is accepted too.
+
+Usage:
+    python prewarm.py slate.json                        # warm every game now
+    python prewarm.py slate.json --lead-minutes 90      # warm each game 90 min before kickoff
+    python prewarm.py slate.json --concurrency 4 --rate 20 --url http://localhost:8000
+
+Progress is recorded in a JSON file so an interrupted run picks up where it
+left off. The same SlatePrewarmer also runs inside the API (POST /prewarm or
+PREWARM_SLATE_FILE) where it fills the in-process caches directly.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import urllib.request
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+DEFAULT_PROGRESS_PATH = "data/prewarm_progress.json"
+
+WarmFunction = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def normalize_game(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Accept either the API request shape or the frontend game object shape"""
+    game = {
+        "game_id": str(raw.get("game_id") or raw.get("id") or ""),
+        "away_team": raw.get("away_team") or raw.get("awayTeam"),
+        "home_team": raw.get("home_team") or raw.get("homeTeam"),
+        "league": (raw.get("league") or "nfl").lower(),
+        "date": raw.get("date"),
+    }
+    if not game["game_id"] or not game["away_team"] or not game["home_team"]:
+        raise ValueError(f"Game is missing an id or team names: {raw}")
+    return game
+
+
+def load_slate(path: str) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("games", [])
+    return [normalize_game(game) for game in data]
+
+
+def game_key(game: Dict[str, Any]) -> str:
+    return "|".join([game["league"], game["game_id"], game["away_team"], game["home_team"], game.get("date") or ""])
+
+
+def kickoff_time(game: Dict[str, Any]) -> Optional[float]:
+    """Kickoff as a UNIX timestamp when the date carries a time (ESPN ISO format)"""
+    date = game.get("date")
+    if not date or "T" not in date:
+        return None
+    try:
+        kickoff = datetime.fromisoformat(date.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if kickoff.tzinfo is None:
+        kickoff = kickoff.replace(tzinfo=timezone.utc)
+    return kickoff.timestamp()
+
+
+class RateBudget:
+    """Token bucket limiting how many games start warming per minute"""
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.capacity = max(1.0, per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.per_minute <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.per_minute / 60.0)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) * 60.0 / self.per_minute)
+
+
+class SlatePrewarmer:
+    """Warms a slate of games with a concurrency limit, a rate budget and resumable progress"""
+
+    def __init__(self, warm_game: WarmFunction, concurrency: int = 3, rate_per_minute: float = 12,
+                 progress_path: Optional[str] = DEFAULT_PROGRESS_PATH, lead_minutes: Optional[float] = None):
+        self.warm_game = warm_game
+        self.concurrency = concurrency
+        self.rate = RateBudget(rate_per_minute)
+        self.progress_path = progress_path
+        self.lead_minutes = lead_minutes
+        self.progress: Dict[str, Dict[str, Any]] = self._load_progress()
+        self.total = 0
+
+    def _load_progress(self) -> Dict[str, Dict[str, Any]]:
+        if not self.progress_path or not os.path.exists(self.progress_path):
+            return {}
+        try:
+            with open(self.progress_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_progress(self):
+        if not self.progress_path:
+            return
+        directory = os.path.dirname(self.progress_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.progress_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.progress, f, indent=2)
+        os.replace(tmp_path, self.progress_path)
+
+    def _record(self, game: Dict[str, Any], status: str, error: Optional[str] = None):
+        self.progress[game_key(game)] = {
+            "status": status,
+            "game": game,
+            "error": error,
+            "updated_at": datetime.now().isoformat(),
+        }
+        self._save_progress()
+
+    def summary(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for entry in self.progress.values():
+            counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        return {"total": self.total, "counts": counts}
+
+    async def _wait_for_window(self, game: Dict[str, Any]):
+        if self.lead_minutes is None:
+            return
+        kickoff = kickoff_time(game)
+        if kickoff is None:
+            return
+        delay = kickoff - self.lead_minutes * 60 - time.time()
+        if delay > 0:
+            self._record(game, "scheduled")
+            await asyncio.sleep(delay)
+
+    async def _warm(self, game: Dict[str, Any], semaphore: asyncio.Semaphore):
+        await self._wait_for_window(game)
+        async with semaphore:
+            await self.rate.acquire()
+            self._record(game, "running")
+            started = time.monotonic()
+            try:
+                await self.warm_game(game)
+            except Exception as e:
+                print(f"Prewarm failed for {game['away_team']} vs {game['home_team']}: {e}")
+                self._record(game, "failed", str(e))
+                return
+            self._record(game, "done")
+            print(f"Prewarmed {game['away_team']} vs {game['home_team']} in {time.monotonic() - started:.1f}s")
+
+    async def run(self, games: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Warm every game that isn't already marked done in the progress file"""
+        self.total = len(games)
+        pending = [game for game in games if self.progress.get(game_key(game), {}).get("status") != "done"]
+        if len(pending) < len(games):
+            print(f"Resuming prewarm: {len(games) - len(pending)} of {len(games)} games already done")
+        semaphore = asyncio.Semaphore(self.concurrency)
+        await asyncio.gather(*[self._warm(game, semaphore) for game in pending])
+        return self.summary()
+
+
+def http_warmer(base_url: str, timeout: float = 300.0) -> WarmFunction:
+    """Warm a running API by requesting the summary and announcer report"""
+    base_url = base_url.rstrip("/")
+
+    def _post(path: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        request = urllib.request.Request(
+            f"{base_url}{path}",
+            data=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read().decode("utf-8"))
+
+    async def warm(game: Dict[str, Any]):
+        summary, report = await asyncio.gather(
+            asyncio.to_thread(_post, "/game-summary", game),
+            asyncio.to_thread(_post, "/generate-announcer-report", game),
+        )
+        if not report.get("success") or not report.get("pdf_path"):
+            raise RuntimeError(report.get("error") or report.get("data", {}).get("error") or "report generation failed")
+
+    return warm
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Pre-warm announcer reports and game summaries for a slate")
+    parser.add_argument("slate", help="JSON file with the list of games")
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the running API")
+    parser.add_argument("--concurrency", type=int, default=3, help="Games warmed at the same time")
+    parser.add_argument("--rate", type=float, default=12, help="Maximum games started per minute (0 = unlimited)")
+    parser.add_argument("--lead-minutes", type=float, default=None,
+                        help="Wait until this many minutes before each kickoff instead of warming now")
+    parser.add_argument("--progress", default=DEFAULT_PROGRESS_PATH, help="Progress file used to resume runs")
+    parser.add_argument("--restart", action="store_true", help="Ignore previous progress and warm every game")
+    args = parser.parse_args(argv)
+
+    # Resolve the slate before switching to the backend directory like start.py does
+    slate_path = os.path.abspath(args.slate)
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    os.chdir(backend_dir)
+
+    if args.restart and os.path.exists(args.progress):
+        os.remove(args.progress)
+
+    games = load_slate(slate_path)
+    print(f"🔥 Prewarming {len(games)} games against {args.url}")
+    prewarmer = SlatePrewarmer(
+        http_warmer(args.url),
+        concurrency=args.concurrency,
+        rate_per_minute=args.rate,
+        progress_path=args.progress,
+        lead_minutes=args.lead_minutes,
+    )
+    summary = asyncio.run(prewarmer.run(games))
+    print(f"Done: {summary}")
+    return 0 if not summary["counts"].get("failed") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
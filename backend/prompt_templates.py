@@ -0,0 +1,117 @@
+"""
+Registry of prefix-stable prompt templates.
+
+Every template is a static prefix (role, rules, output schema) that stays
+byte-identical across calls, followed by a compact suffix holding the
+per-request values. Keeping the variable part at the end lets the provider's
+context caching reuse the prefix. The registry counts how many prefix tokens
+each template sends and how many of them were reusable, and records the
+cached-token counts the provider reports back.
+"""
+import hashlib
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from chat_context import estimate_tokens
+
+
+class RenderedPrompt(str):
+    """Prompt text that remembers the template it was rendered from"""
+
+    template_name: str
+
+    def __new__(cls, text: str, template_name: str):
+        prompt = super().__new__(cls, text)
+        prompt.template_name = template_name
+        return prompt
+
+
+class PromptTemplate:
+    def __init__(self, name: str, prefix: str, suffix: str):
+        self.name = name
+        self.prefix = prefix
+        self.suffix = suffix
+        self.prefix_hash = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+        self.prefix_tokens = estimate_tokens(prefix)
+
+    def render(self, **values: Any) -> RenderedPrompt:
+        return RenderedPrompt(self.prefix + self.suffix.format(**values), self.name)
+
+
+class _TemplateStats:
+    __slots__ = ("calls", "prefix_hits", "prefix_tokens_sent", "prefix_tokens_reusable", "suffix_tokens_sent",
+                 "provider_prompt_tokens", "provider_cached_tokens", "last_sent", "last_hash")
+
+    def __init__(self):
+        self.calls = 0
+        self.prefix_hits = 0
+        self.prefix_tokens_sent = 0
+        self.prefix_tokens_reusable = 0
+        self.suffix_tokens_sent = 0
+        self.provider_prompt_tokens = 0
+        self.provider_cached_tokens = 0
+        self.last_sent: Optional[float] = None
+        self.last_hash: Optional[str] = None
+
+
+class PromptRegistry:
+    """Named prompt templates plus per-template prefix reuse accounting"""
+
+    def __init__(self, reuse_window: float = 300.0):
+        # Provider-side caches expire, a prefix only counts as reusable if it was sent recently
+        self.reuse_window = reuse_window
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._stats: Dict[str, _TemplateStats] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, prefix: str, suffix: str) -> PromptTemplate:
+        template = PromptTemplate(name, prefix, suffix)
+        self._templates[name] = template
+        self._stats.setdefault(name, _TemplateStats())
+        return template
+
+    def get(self, name: str) -> PromptTemplate:
+        return self._templates[name]
+
+    def render(self, name: str, **values: Any) -> RenderedPrompt:
+        template = self._templates[name]
+        prompt = template.render(**values)
+        now = time.time()
+        with self._lock:
+            stats = self._stats[name]
+            if (stats.last_hash == template.prefix_hash and stats.last_sent is not None
+                    and now - stats.last_sent <= self.reuse_window):
+                stats.prefix_hits += 1
+                stats.prefix_tokens_reusable += template.prefix_tokens
+            stats.calls += 1
+            stats.prefix_tokens_sent += template.prefix_tokens
+            stats.suffix_tokens_sent += estimate_tokens(prompt) - template.prefix_tokens
+            stats.last_sent = now
+            stats.last_hash = template.prefix_hash
+        return prompt
+
+    def record_usage(self, name: str, usage: Any):
+        """Record the prompt/cached token counts reported with a model response"""
+        if usage is None or name not in self._stats:
+            return
+        with self._lock:
+            stats = self._stats[name]
+            stats.provider_prompt_tokens += getattr(usage, "prompt_token_count", None) or 0
+            stats.provider_cached_tokens += getattr(usage, "cached_content_token_count", None) or 0
+
+    def stats(self) -> Dict[str, Any]:
+        report = {}
+        with self._lock:
+            for name, stats in self._stats.items():
+                report[name] = {
+                    "calls": stats.calls,
+                    "prefix_tokens": self._templates[name].prefix_tokens,
+                    "prefix_hit_rate": round(stats.prefix_hits / stats.calls, 4) if stats.calls else 0.0,
+                    "prefix_tokens_sent": stats.prefix_tokens_sent,
+                    "prefix_tokens_reusable": stats.prefix_tokens_reusable,
+                    "suffix_tokens_sent": stats.suffix_tokens_sent,
+                    "provider_prompt_tokens": stats.provider_prompt_tokens,
+                    "provider_cached_tokens": stats.provider_cached_tokens,
+                }
+        return report
@@ -0,0 +1,225 @@
+"""
+Outbound protection for Gemini calls: a priority-aware token bucket sized to
+our quota, jittered exponential backoff that honours Retry-After, and a
+circuit breaker that fails fast while the upstream is unhealthy.
+
+Errors are classified by duck typing (``code`` / ``response.headers``), so a
+local fake client only needs to raise exceptions shaped like genai's
+``APIError`` to exercise every path.
+"""
+import asyncio
+import heapq
+import itertools
+import random
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+PRIORITY_INTERACTIVE = 0  # chat and expert questions, a user is waiting
+PRIORITY_DEFAULT = 1      # game pages opened in the UI
+PRIORITY_BACKGROUND = 2   # report jobs and slate prewarming
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_DEFAULT: "default",
+    PRIORITY_BACKGROUND: "background",
+}
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+_RETRY_DELAY_PATTERN = re.compile(r"([\d.]+)s")
+
+
+def error_status_code(error: BaseException) -> Optional[int]:
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code
+    response = getattr(error, "response", None)
+    status_code = getattr(response, "status_code", None)
+    return status_code if isinstance(status_code, int) else None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Rate limits, upstream 5xx and transport failures are worth retrying"""
+    code = error_status_code(error)
+    if code is not None:
+        return code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (ConnectionError, TimeoutError)) or type(error).__name__ in (
+        "ConnectionError", "Timeout", "ReadTimeout", "ConnectTimeout", "ChunkedEncodingError"
+    )
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Read the server's requested delay from Retry-After or Gemini's RetryInfo detail"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+
+    details = getattr(error, "details", None)
+    if isinstance(details, dict):
+        for detail in details.get("error", details).get("details", []) or []:
+            if isinstance(detail, dict) and "retryDelay" in detail:
+                match = _RETRY_DELAY_PATTERN.match(str(detail["retryDelay"]))
+                if match:
+                    return float(match.group(1))
+    return None
+
+
+class PriorityTokenBucket:
+    """Token bucket whose waiters are served strictly by priority, then arrival"""
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = float(max(1, burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._waiters: List[list] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.granted: Dict[int, int] = {}
+        self.timeouts = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate_per_second)
+        self.updated = now
+
+    def _dispatch(self):
+        self._timer = None
+        self._refill()
+        while self._waiters and self.tokens >= 1:
+            _priority, _seq, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self.tokens -= 1
+            future.set_result(None)
+        # Drop abandoned waiters at the head so they don't keep the timer alive
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+        if self._waiters:
+            delay = (1 - self.tokens) / self.rate_per_second
+            self._timer = asyncio.get_running_loop().call_later(max(delay, 0.001), self._dispatch)
+
+    async def acquire(self, priority: int = PRIORITY_DEFAULT, timeout: Optional[float] = None) -> bool:
+        """Wait for a token; returns False if ``timeout`` passed first"""
+        if self.rate_per_second <= 0:
+            return True
+        self._refill()
+        if not self._waiters and self.tokens >= 1:
+            self.tokens -= 1
+            self.granted[priority] = self.granted.get(priority, 0) + 1
+            return True
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, [priority, next(self._sequence), future])
+        if self._timer is None:
+            self._dispatch()
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            return False
+        self.granted[priority] = self.granted.get(priority, 0) + 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill()
+        waiting: Dict[str, int] = {}
+        for priority, _seq, future in self._waiters:
+            if not future.done():
+                name = PRIORITY_NAMES.get(priority, str(priority))
+                waiting[name] = waiting.get(name, 0) + 1
+        return {
+            "rate_per_minute": self.rate_per_second * 60,
+            "burst": self.capacity,
+            "tokens": round(self.tokens, 2),
+            "waiting": waiting,
+            "granted": {PRIORITY_NAMES.get(p, str(p)): n for p, n in self.granted.items()},
+            "timeouts": self.timeouts,
+        }
+
+
+class CircuitBreaker:
+    """Opens after consecutive upstream failures, lets one probe through after a cooldown"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, cooldown_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self.rejected = 0
+        self.trips = 0
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.cooldown_seconds - time.monotonic())
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream right now"""
+        if self.state == self.OPEN and self.retry_after() <= 0:
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_abort(self):
+        """A call that ended without a verdict (the caller went away): free the probe slot, change nothing else"""
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.trips += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_after": round(self.retry_after(), 2) if self.state == self.OPEN else 0,
+            "trips": self.trips,
+            "rejected": self.rejected,
+        }
+
+
+class RetryPolicy:
+    """Full-jitter exponential backoff, stretched to honour Retry-After"""
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 20.0,
+                 max_retry_after: float = 60.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def delay(self, attempt: int, error: BaseException) -> Optional[float]:
+        """Seconds to wait before retry number ``attempt`` (1-based), None to give up"""
+        if attempt > self.max_retries or not is_retryable(error):
+            return None
+        requested = retry_after_seconds(error)
+        if requested is not None:
+            if requested > self.max_retry_after:
+                return None
+            return requested + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
@@ -0,0 +1,226 @@
+"""
+Two-tier cache for rendered PDF pages.
+
+Entries are keyed on (content hash, page, zoom, format), so an edited or
+replaced document never gets another version's pixels and identical
+uploads share their renders. The first tier is an in-process LRU bounded
+by bytes. The second is a directory of image files bounded by bytes. It
+survives restarts and is shared by every worker on the box. A disk hit is
+promoted back into memory.
+
+``invalidate(content_hash)`` drops every page of a version once it has
+been superseded (a new edit was saved, or the upload was deleted).
+"""
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# (content_hash, page, zoom, format)
+RenderKey = Tuple[str, int, str, str]
+
+MEDIA_TYPES = {"png": "image/png", "jpg": "image/jpeg", "webp": "image/webp"}
+
+
+def render_key(content_hash: str, page: int, zoom: float, fmt: str) -> RenderKey:
+    # 2 and 2.0 must hit the same entry
+    return (content_hash, int(page), f"{float(zoom):g}", fmt)
+
+
+def etag(key: RenderKey) -> str:
+    content_hash, page, zoom, fmt = key
+    return f'"{content_hash[:32]}-{page}-{zoom}-{fmt}"'
+
+
+class RenderCache:
+    """Byte-bounded memory LRU in front of a byte-bounded directory of rendered pages"""
+
+    def __init__(self, max_memory_bytes: int = 64 * 1024 * 1024, disk_dir: Optional[str] = None,
+                 max_disk_bytes: int = 512 * 1024 * 1024):
+        self.max_memory_bytes = max_memory_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[RenderKey, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        # Disk entries this process knows about, least recently used first: path -> size
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.memory_evictions = 0
+        self.disk_evictions = 0
+        self.invalidations = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._load_disk_index()
+
+    def _load_disk_index(self):
+        """Pick up pages rendered before a restart or by other workers, oldest first"""
+        entries = []
+        for root, _dirs, files in os.walk(self.disk_dir):
+            for name in files:
+                if name.startswith("."):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size))
+        for _mtime, path, size in sorted(entries):
+            self._disk[path] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def _disk_path(self, key: RenderKey) -> str:
+        content_hash, page, zoom, fmt = key
+        return os.path.join(self.disk_dir, content_hash[:2], f"{content_hash}-{page}-{zoom}.{fmt}")
+
+    # ---- memory tier --------------------------------------------------
+    def _remember(self, key: RenderKey, data: bytes):
+        # A single page bigger than an eighth of the budget would flush everything else
+        if len(data) > self.max_memory_bytes // 8:
+            return
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= len(previous)
+            self._memory[key] = data
+            self._memory_bytes += len(data)
+            while self._memory_bytes > self.max_memory_bytes and self._memory:
+                _key, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+                self.memory_evictions += 1
+
+    # ---- disk tier ----------------------------------------------------
+    def _evict_disk(self):
+        victims = []
+        with self._lock:
+            while self._disk_bytes > self.max_disk_bytes and self._disk:
+                path, size = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+                self.disk_evictions += 1
+                victims.append(path)
+        for path in victims:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _write_disk(self, key: RenderKey, data: bytes):
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so other workers never read a partial image
+        tmp_path = os.path.join(os.path.dirname(path), f".{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not write render cache file {path}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self._disk_bytes -= self._disk.pop(path, 0)
+            self._disk[path] = len(data)
+            self._disk_bytes += len(data)
+        self._evict_disk()
+
+    def _read_disk(self, key: RenderKey) -> Optional[bytes]:
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        with self._lock:
+            # Rendered by another worker: start tracking it
+            if path not in self._disk:
+                self._disk[path] = len(data)
+                self._disk_bytes += len(data)
+            self._disk.move_to_end(path)
+        return data
+
+    # ---- public API ---------------------------------------------------
+    def get(self, key: RenderKey) -> Optional[bytes]:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return data
+        if self.disk_dir:
+            data = self._read_disk(key)
+            if data is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                self._remember(key, data)
+                return data
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def contains(self, key: RenderKey) -> bool:
+        """Whether ``key`` is cached in either tier, without counting a lookup"""
+        with self._lock:
+            if key in self._memory:
+                return True
+        return bool(self.disk_dir) and os.path.exists(self._disk_path(key))
+
+    def put(self, key: RenderKey, data: bytes):
+        self._remember(key, data)
+        if self.disk_dir:
+            self._write_disk(key, data)
+
+    def invalidate(self, content_hash: str) -> int:
+        """Drop every cached page of one document version; returns how many entries went"""
+        removed = 0
+        with self._lock:
+            for key in [key for key in self._memory if key[0] == content_hash]:
+                self._memory_bytes -= len(self._memory.pop(key))
+                removed += 1
+        if self.disk_dir:
+            directory = os.path.join(self.disk_dir, content_hash[:2])
+            try:
+                names = [name for name in os.listdir(directory) if name.startswith(f"{content_hash}-")]
+            except OSError:
+                names = []
+            for name in names:
+                path = os.path.join(directory, name)
+                with self._lock:
+                    self._disk_bytes -= self._disk.pop(path, 0)
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+        if removed:
+            with self._lock:
+                self.invalidations += 1
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                "disk_dir": self.disk_dir,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+                "max_disk_bytes": self.max_disk_bytes,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else None,
+                "memory_evictions": self.memory_evictions,
+                "disk_evictions": self.disk_evictions,
+                "invalidations": self.invalidations,
+            }
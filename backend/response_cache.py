@@ -0,0 +1,298 @@
+"""
+Status-aware LRU cache for Gemini game responses.
+
+Entries are keyed on (endpoint, game_id, league, away_team, home_team) and
+expire according to the game's status: final games are effectively
+immutable, live games go stale quickly and scheduled games sit in between.
+An optional JSON snapshot keeps the cache warm across restarts, and an
+optional shared state backend lets several worker processes reuse each
+other's responses: the in-process LRU stays in front as a first tier.
+Snapshots are written on a worker thread so a write never stalls the
+event loop.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Set, Tuple
+
+STATUS_FINAL = "final"
+STATUS_LIVE = "live"
+STATUS_SCHEDULED = "scheduled"
+
+DEFAULT_TTLS = {
+    STATUS_FINAL: float(os.getenv("CACHE_TTL_FINAL", str(30 * 24 * 3600))),
+    STATUS_LIVE: float(os.getenv("CACHE_TTL_LIVE", "60")),
+    STATUS_SCHEDULED: float(os.getenv("CACHE_TTL_SCHEDULED", "1800")),
+}
+
+_FINAL_MARKERS = ("final", "post", "complete", "ended")
+_LIVE_MARKERS = ("in_progress", "in progress", "live", "halftime", "end_period", "delayed")
+_SCHEDULED_MARKERS = ("scheduled", "pre", "postponed", "upcoming")
+
+
+def normalize_status(status: Optional[str]) -> Optional[str]:
+    """Map ESPN-style status names (STATUS_FINAL, in, pre...) onto cache statuses"""
+    if not status:
+        return None
+    value = status.strip().lower()
+    if value.startswith("status_"):
+        value = value[len("status_"):]
+    if value == "in" or any(marker in value for marker in _LIVE_MARKERS):
+        return STATUS_LIVE
+    if any(value.startswith(marker) for marker in _SCHEDULED_MARKERS):
+        return STATUS_SCHEDULED
+    if any(value.startswith(marker) for marker in _FINAL_MARKERS):
+        return STATUS_FINAL
+    return None
+
+
+def game_day(date: Optional[str]) -> Optional[str]:
+    """Reduce an ISO date or datetime (e.g. ESPN's 2025-10-19T17:00Z) to YYYY-MM-DD"""
+    if not date:
+        return None
+    try:
+        return datetime.strptime(date[:10], "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def status_from_date(date: Optional[str]) -> Optional[str]:
+    """Guess a game's status from its YYYY-MM-DD date"""
+    day = game_day(date)
+    if day is None:
+        return None
+    game_day_date = datetime.strptime(day, "%Y-%m-%d").date()
+    today = datetime.now().date()
+    if game_day_date < today:
+        return STATUS_FINAL
+    if game_day_date > today:
+        return STATUS_SCHEDULED
+    return STATUS_LIVE
+
+
+def make_key(endpoint: str, game_id: str, league: str, away_team: str, home_team: str) -> str:
+    return "|".join([endpoint, str(game_id), (league or "").lower(), away_team, home_team])
+
+
+class ResponseCache:
+    """Thread-safe LRU of JSON-serialisable responses with per-status TTLs"""
+
+    def __init__(self, max_entries: int = 1024, ttls: Optional[Dict[str, float]] = None,
+                 snapshot_path: Optional[str] = None, snapshot_interval: float = 30.0, state: Any = None):
+        self.max_entries = max_entries
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self._entries: "OrderedDict[str, Tuple[float, str, Any]]" = OrderedDict()
+        # (game_id, league) -> (expires_at, status), LRU-bounded like the entries
+        self._status_hints: "OrderedDict[Tuple[str, str], Tuple[float, str]]" = OrderedDict()
+        self._snapshot_tasks: Set[asyncio.Future] = set()
+        self._lock = threading.Lock()
+        # Shared tier (StateBackend), only used when it actually spans processes
+        self.state = state if state is not None and state.shared else None
+        self._dirty = False
+        self._last_snapshot = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.shared_hits = 0
+
+    # ---- status -------------------------------------------------------
+    def record_status(self, game_id: str, league: str, status: Optional[str]):
+        """Remember a status observed in a model response (e.g. game details)"""
+        normalized = normalize_status(status)
+        ttl = self.ttls.get(normalized, 0) if normalized else 0
+        if ttl <= 0:
+            return
+        # A hint lives as long as an entry cached under that status would
+        with self._lock:
+            hint = (str(game_id), (league or "").lower())
+            self._status_hints[hint] = (time.time() + ttl, normalized)
+            self._status_hints.move_to_end(hint)
+            while len(self._status_hints) > self.max_entries:
+                self._status_hints.popitem(last=False)
+            self._dirty = True
+        if self.state is not None:
+            self.state.set("response_status", f"{game_id}|{(league or '').lower()}", normalized, ttl)
+
+    def resolve_status(self, game_id: str, league: str, status: Optional[str] = None,
+                       date: Optional[str] = None) -> str:
+        """Explicit status wins, then an observed hint, then the game date"""
+        resolved = normalize_status(status)
+        if resolved:
+            return resolved
+        hint = (str(game_id), (league or "").lower())
+        with self._lock:
+            expires_at, resolved = self._status_hints.get(hint, (0.0, None))
+            if resolved is not None and expires_at <= time.time():
+                del self._status_hints[hint]
+                resolved = None
+        if resolved is None and self.state is not None:
+            resolved = self.state.get("response_status", f"{game_id}|{(league or '').lower()}")
+        # Unknown games get the short TTL so live data is never held too long
+        return resolved or status_from_date(date) or STATUS_LIVE
+
+    # ---- entries ------------------------------------------------------
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, _status, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self._dirty = True
+            if self.state is None:
+                self.misses += 1
+                return None
+
+        # Another worker may have produced it
+        shared = self.state.get("response_cache", key)
+        with self._lock:
+            if shared is None:
+                self.misses += 1
+                return None
+            expires_at, status, value = shared
+            self._entries[key] = (expires_at, status, value)
+            self._trim()
+            self.hits += 1
+            self.shared_hits += 1
+            return value
+
+    def _trim(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def set(self, key: str, value: Any, status: str = STATUS_LIVE):
+        ttl = self.ttls.get(status, self.ttls[STATUS_LIVE])
+        if ttl <= 0:
+            return
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._entries[key] = (expires_at, status, value)
+            self._entries.move_to_end(key)
+            self._trim()
+            self._dirty = True
+        if self.state is not None:
+            self.state.set("response_cache", key, [expires_at, status, value], ttl)
+        self.maybe_snapshot()
+
+    def invalidate(self, key: str) -> bool:
+        with self._lock:
+            removed = self._entries.pop(key, None) is not None
+            self._dirty = self._dirty or removed
+        if self.state is not None:
+            removed = self.state.delete("response_cache", key) or removed
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._status_hints.clear()
+            self._dirty = True
+        if self.state is not None:
+            self.state.clear("response_cache")
+            self.state.clear("response_status")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "shared": self.state is not None,
+                "shared_hits": self.shared_hits,
+                "ttls": self.ttls,
+                "snapshot_path": self.snapshot_path,
+            }
+
+    # ---- snapshot -----------------------------------------------------
+    def load_snapshot(self) -> int:
+        """Load unexpired entries from the snapshot file, returns how many"""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return 0
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable response cache snapshot: {e}")
+            return 0
+
+        now = time.time()
+        loaded = 0
+        with self._lock:
+            for key, expires_at, status, value in data.get("entries", []):
+                if expires_at > now:
+                    self._entries[key] = (expires_at, status, value)
+                    loaded += 1
+            for hint in data.get("status_hints", []):
+                # Snapshots written before hints expired hold [game_id, league, status]
+                game_id, league, status = hint[:3]
+                expires_at = hint[3] if len(hint) > 3 else now + self.ttls.get(status, 0)
+                if expires_at > now:
+                    self._status_hints[(game_id, league)] = (expires_at, status)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            while len(self._status_hints) > self.max_entries:
+                self._status_hints.popitem(last=False)
+        return loaded
+
+    def save_snapshot(self):
+        if not self.snapshot_path:
+            return
+        now = time.time()
+        with self._lock:
+            entries = [[key, expires_at, status, value]
+                       for key, (expires_at, status, value) in self._entries.items()
+                       if expires_at > now]
+            hints = [[game_id, league, status, expires_at]
+                     for (game_id, league), (expires_at, status) in self._status_hints.items()
+                     if expires_at > now]
+            self._dirty = False
+            self._last_snapshot = now
+
+        directory = os.path.dirname(self.snapshot_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"entries": entries, "status_hints": hints}, f)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            print(f"Error saving response cache snapshot: {e}")
+
+    def maybe_snapshot(self):
+        """Write the snapshot if something changed and the interval has passed
+
+        Called from request handlers, so the write runs on a worker thread
+        when there's a running event loop.
+        """
+        if not self.snapshot_path:
+            return
+        now = time.time()
+        with self._lock:
+            if not self._dirty or now - self._last_snapshot < self.snapshot_interval:
+                return
+            # Claim this interval so concurrent sets don't start a second write
+            self._last_snapshot = now
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.save_snapshot()  # already off the event loop
+            return
+        task = loop.create_task(asyncio.to_thread(self.save_snapshot))
+        self._snapshot_tasks.add(task)
+        task.add_done_callback(self._snapshot_tasks.discard)
@@ -0,0 +1,510 @@
+"""
+Bounded storage for Cedar chat sessions.
+
+Hot sessions live in memory as lists of plain tuples, kept in LRU order
+under a byte budget. Sessions that go idle or fall off the end of the LRU
+are dropped from memory; with a SQLite file configured every message is
+also written through to disk, so evicted sessions (and sessions from before
+a restart) are reloaded on demand. Sessions untouched for longer than the
+retention period are deleted outright. A session's rolling conversation
+summary is stored with it, so it is bounded and expired the same way.
+
+Sessions are also indexed by last activity (and by chat context) so the
+session list can be paged with a cursor without scanning every session.
+
+With ``shared=True`` several worker processes can use the same SQLite file:
+hot copies are checked against the stored message count before use and
+appends take their sequence number from the database.
+"""
+import base64
+import bisect
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# (message_id, role, content, timestamp)
+Message = Tuple[str, str, str, str]
+
+# (text, covered): rolling summary of the first ``covered`` messages
+Summary = Tuple[str, int]
+
+# (last_activity, session_id), the sort key of the activity index and the paging cursor
+ActivityKey = Tuple[float, str]
+
+# Rough per-message overhead of the tuple and its four str objects
+_MESSAGE_OVERHEAD = 250
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    session_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    last_message_time TEXT,
+    context TEXT,
+    summary TEXT,
+    summary_covered INTEGER
+);
+CREATE TABLE IF NOT EXISTS chat_messages (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    message_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+"""
+
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS chat_sessions_activity ON chat_sessions (updated_at, session_id);
+CREATE INDEX IF NOT EXISTS chat_sessions_context_activity ON chat_sessions (context, updated_at, session_id);
+"""
+
+
+def message_size(message: Message) -> int:
+    return sum(len(field) for field in message) + _MESSAGE_OVERHEAD
+
+
+def encode_cursor(key: ActivityKey) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> ActivityKey:
+    """Inverse of encode_cursor; raises ValueError for anything it didn't produce"""
+    try:
+        activity, session_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return float(activity), str(session_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+class ActivityIndex:
+    """Session ids sorted by last activity, paged newest first"""
+
+    def __init__(self):
+        self._keys: List[ActivityKey] = []
+        self._by_session: Dict[str, ActivityKey] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def remove(self, session_id: str):
+        key = self._by_session.pop(session_id, None)
+        if key is not None:
+            del self._keys[bisect.bisect_left(self._keys, key)]
+
+    def touch(self, session_id: str, activity: float):
+        self.remove(session_id)
+        key = (activity, session_id)
+        bisect.insort(self._keys, key)
+        self._by_session[session_id] = key
+
+    def count(self, since: Optional[float] = None, until: Optional[float] = None) -> int:
+        """Keys with since <= activity < until, by bisection"""
+        hi = len(self._keys) if until is None else bisect.bisect_left(self._keys, (until, ""))
+        lo = 0 if since is None else bisect.bisect_left(self._keys, (since, ""))
+        return max(0, hi - lo)
+
+    def page(self, limit: int, before: Optional[ActivityKey] = None, since: Optional[float] = None,
+             until: Optional[float] = None) -> List[ActivityKey]:
+        """Up to ``limit`` keys older than ``before`` with since <= activity < until"""
+        hi = len(self._keys) if before is None else bisect.bisect_left(self._keys, before)
+        if until is not None:
+            hi = min(hi, bisect.bisect_left(self._keys, (until, "")))
+        lo = 0 if since is None else bisect.bisect_left(self._keys, (since, ""))
+        return self._keys[max(lo, hi - limit):hi][::-1]
+
+
+class _HotSession:
+    __slots__ = ("messages", "size", "last_access", "last_activity", "context", "summary")
+
+    def __init__(self, messages: List[Message], last_activity: Optional[float] = None, context: Optional[str] = None,
+                 summary: Optional[Summary] = None):
+        self.messages = messages
+        self.summary = summary
+        self.size = sum(message_size(m) for m in messages) + (len(summary[0]) if summary else 0)
+        self.last_access = time.time()
+        self.last_activity = last_activity if last_activity is not None else self.last_access
+        self.context = context
+
+
+class ChatSessionStore:
+    """LRU/TTL-bounded in-memory sessions with an optional SQLite spill file"""
+
+    def __init__(self, db_path: Optional[str] = None, max_memory_bytes: int = 64 * 1024 * 1024,
+                 idle_seconds: float = 1800.0, retention_seconds: float = 7 * 86400.0,
+                 sweep_interval: float = 60.0, shared: bool = False):
+        if shared and not db_path:
+            raise ValueError("A shared chat session store needs a SQLite file")
+        self.db_path = db_path
+        self.shared = shared
+        self.max_memory_bytes = max_memory_bytes
+        self.idle_seconds = idle_seconds
+        self.retention_seconds = retention_seconds
+        self.sweep_interval = sweep_interval
+        self._hot: "OrderedDict[str, _HotSession]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._last_sweep = time.time()
+        self.memory_bytes = 0
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self.expired = 0
+        self.stale_reloads = 0
+
+        # Memory-only stores index their hot sessions, SQLite stores use table indexes
+        self._activity = ActivityIndex()
+        self._context_activity: Dict[str, ActivityIndex] = {}
+
+        self._conn = None
+        if db_path:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA busy_timeout=5000")
+            self._conn.executescript(_SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(chat_sessions)")}
+            if "context" not in columns:
+                self._conn.execute("ALTER TABLE chat_sessions ADD COLUMN context TEXT")
+            if "summary" not in columns:
+                self._conn.execute("ALTER TABLE chat_sessions ADD COLUMN summary TEXT")
+                self._conn.execute("ALTER TABLE chat_sessions ADD COLUMN summary_covered INTEGER")
+            self._conn.executescript(_INDEXES)
+
+    # ---- memory management --------------------------------------------
+    def _admit(self, session_id: str, session: _HotSession):
+        self._hot[session_id] = session
+        self.memory_bytes += session.size
+        self._evict(keep=session_id)
+
+    def _drop(self, session_id: str):
+        session = self._hot.pop(session_id)
+        self.memory_bytes -= session.size
+        if self._conn is None:
+            # Without a spill file a dropped session is gone, take it out of the listing too
+            self._activity.remove(session_id)
+            if session.context in self._context_activity:
+                self._context_activity[session.context].remove(session_id)
+
+    def _record_activity(self, session_id: str, session: _HotSession, context: Optional[str]):
+        """Move the session to the front of the activity index (memory-only stores)"""
+        session.last_activity = time.time()
+        if context and context != session.context:
+            if session.context in self._context_activity:
+                self._context_activity[session.context].remove(session_id)
+            session.context = context
+        if self._conn is None:
+            self._activity.touch(session_id, session.last_activity)
+            if session.context:
+                self._context_activity.setdefault(session.context, ActivityIndex()).touch(
+                    session_id, session.last_activity
+                )
+
+    def _evict(self, keep: Optional[str] = None):
+        """Drop least recently used sessions until the hot set fits the budget"""
+        while self.memory_bytes > self.max_memory_bytes and len(self._hot) > 1:
+            session_id = next(iter(self._hot))
+            if session_id == keep:
+                self._hot.move_to_end(session_id)
+                session_id = next(iter(self._hot))
+            self._drop(session_id)
+            self.evictions += 1
+
+    def _sweep(self):
+        now = time.time()
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        # The LRU is ordered by last access, so idle sessions are at the front
+        while self._hot:
+            session_id, session = next(iter(self._hot.items()))
+            if now - session.last_access < self.idle_seconds:
+                break
+            self._drop(session_id)
+            self.evictions += 1
+        if self._conn is not None:
+            cutoff = now - self.retention_seconds
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "DELETE FROM chat_messages WHERE session_id IN "
+                    "(SELECT session_id FROM chat_sessions WHERE updated_at < ?)", (cutoff,)
+                )
+                cursor = self._conn.execute("DELETE FROM chat_sessions WHERE updated_at < ?", (cutoff,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.expired += cursor.rowcount
+            for session_id in [sid for sid, s in self._hot.items() if s.last_access < cutoff]:
+                self._drop(session_id)
+
+    def _is_stale(self, session_id: str, session: _HotSession) -> bool:
+        """Whether another process changed the session since this copy was loaded"""
+        row = self._conn.execute(
+            "SELECT updated_at, message_count FROM chat_sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row is None or row[0] != session.last_activity or row[1] != len(session.messages)
+
+    def _get(self, session_id: str) -> Optional[_HotSession]:
+        """The hot session, reloading it from disk if it was evicted"""
+        self._sweep()
+        session = self._hot.get(session_id)
+        if session is not None and self.shared and self._is_stale(session_id, session):
+            self._drop(session_id)
+            self.stale_reloads += 1
+            session = None
+        if session is not None:
+            self.hits += 1
+        elif self._conn is not None:
+            row = self._conn.execute(
+                "SELECT updated_at, context, summary, summary_covered FROM chat_sessions WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            rows = self._conn.execute(
+                "SELECT message_id, role, content, timestamp FROM chat_messages WHERE session_id = ? ORDER BY seq",
+                (session_id,)
+            ).fetchall()
+            summary = (row[2], row[3]) if row[2] is not None else None
+            session = _HotSession([tuple(r) for r in rows], last_activity=row[0], context=row[1], summary=summary)
+            self.loads += 1
+            self._admit(session_id, session)
+        else:
+            return None
+        session.last_access = time.time()
+        self._hot.move_to_end(session_id)
+        return session
+
+    # ---- public API ---------------------------------------------------
+    def create(self, session_id: str, context: Optional[str] = None):
+        with self._lock:
+            session = _HotSession([])
+            if session_id in self._hot:
+                self._drop(session_id)
+            self._admit(session_id, session)
+            self._record_activity(session_id, session, context)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO chat_sessions (session_id, created_at, updated_at, message_count, context) "
+                    "VALUES (?, ?, ?, 0, ?)", (session_id, session.last_activity, session.last_activity, session.context)
+                )
+                self._conn.execute("DELETE FROM chat_messages WHERE session_id = ?", (session_id,))
+
+    def exists(self, session_id: str) -> bool:
+        with self._lock:
+            return self._get(session_id) is not None
+
+    def append(self, session_id: str, message: Message, context: Optional[str] = None):
+        """Add a message, creating the session if needed, and mark the session active"""
+        with self._lock:
+            session = self._get(session_id)
+            if session is None:
+                self.create(session_id, context)
+                session = self._hot[session_id]
+            self._record_activity(session_id, session, context)
+            seq = len(session.messages)
+            if self._conn is not None:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    if self.shared:
+                        # Another worker may have appended (or swept the session) since it was loaded
+                        self._conn.execute(
+                            "INSERT OR IGNORE INTO chat_sessions (session_id, created_at, updated_at, message_count, context) "
+                            "VALUES (?, ?, ?, 0, ?)", (session_id, session.last_activity, session.last_activity, session.context)
+                        )
+                        seq = self._conn.execute(
+                            "SELECT message_count FROM chat_sessions WHERE session_id = ?", (session_id,)
+                        ).fetchone()[0]
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO chat_messages (session_id, seq, message_id, role, content, timestamp) "
+                        "VALUES (?, ?, ?, ?, ?, ?)", (session_id, seq, *message)
+                    )
+                    self._conn.execute(
+                        "UPDATE chat_sessions SET updated_at = ?, message_count = ?, last_message_time = ?, context = ? "
+                        "WHERE session_id = ?", (session.last_activity, seq + 1, message[3], session.context, session_id)
+                    )
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            if seq != len(session.messages):
+                # The hot copy missed other workers' messages, reload it with ours included
+                self._drop(session_id)
+                self.stale_reloads += 1
+                self._get(session_id)
+            else:
+                session.messages.append(message)
+                size = message_size(message)
+                session.size += size
+                self.memory_bytes += size
+            self._evict(keep=session_id)
+
+    def messages(self, session_id: str) -> List[Message]:
+        """Messages of a session in order, empty if it doesn't exist"""
+        with self._lock:
+            session = self._get(session_id)
+            return list(session.messages) if session is not None else []
+
+    def clear(self, session_id: str) -> bool:
+        """Remove every message but keep the session; False if it doesn't exist"""
+        with self._lock:
+            session = self._get(session_id)
+            if session is None:
+                return False
+            self.memory_bytes -= session.size
+            session.messages = []
+            session.summary = None
+            session.size = 0
+            self._record_activity(session_id, session, None)
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM chat_messages WHERE session_id = ?", (session_id,))
+                self._conn.execute(
+                    "UPDATE chat_sessions SET updated_at = ?, message_count = 0, last_message_time = NULL, "
+                    "summary = NULL, summary_covered = NULL WHERE session_id = ?", (session.last_activity, session_id)
+                )
+            return True
+
+    def summary(self, session_id: str) -> Optional[Summary]:
+        """The session's rolling summary, None if it has none or doesn't exist"""
+        with self._lock:
+            if self.shared:
+                # Another worker may have written a newer summary than the hot copy holds
+                row = self._conn.execute(
+                    "SELECT summary, summary_covered FROM chat_sessions WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                return (row[0], row[1]) if row is not None and row[0] is not None else None
+            session = self._get(session_id)
+            return session.summary if session is not None else None
+
+    def set_summary(self, session_id: str, text: str, covered: int) -> bool:
+        """Store the rolling summary of the first ``covered`` messages; False if the session is gone"""
+        with self._lock:
+            session = self._get(session_id)
+            if session is None:
+                return False
+            size = len(text) - (len(session.summary[0]) if session.summary else 0)
+            session.summary = (text, covered)
+            session.size += size
+            self.memory_bytes += size
+            if self._conn is not None:
+                # Never replace a summary another worker already carried further
+                self._conn.execute(
+                    "UPDATE chat_sessions SET summary = ?, summary_covered = ? "
+                    "WHERE session_id = ? AND (summary_covered IS NULL OR summary_covered <= ?)",
+                    (text, covered, session_id, covered)
+                )
+            self._evict(keep=session_id)
+            return True
+
+    def page_sessions(self, limit: int = 50, cursor: Optional[str] = None, context: Optional[str] = None,
+                      since: Optional[float] = None, until: Optional[float] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of sessions, most recently active first, plus the cursor of the next page
+
+        Finding the page costs O(log n + limit): a bisection of the in-memory
+        index or a range scan of the SQLite index. Keeping the in-memory
+        index sorted isn't free, each activity update shifts its list (O(n)
+        memmove). ``since``/``until`` bound the last activity as UNIX timestamps.
+        """
+        before = decode_cursor(cursor) if cursor else None
+        with self._lock:
+            if self._conn is None:
+                index = self._activity if context is None else self._context_activity.get(context, ActivityIndex())
+                keys = index.page(limit + 1, before, since, until)
+                rows = []
+                for activity, session_id in keys:
+                    session = self._hot[session_id]
+                    rows.append((session_id, len(session.messages),
+                                 session.messages[-1][3] if session.messages else None, session.context, activity))
+            else:
+                clauses, params = [], []
+                if context is not None:
+                    clauses.append("context = ?")
+                    params.append(context)
+                if since is not None:
+                    clauses.append("updated_at >= ?")
+                    params.append(since)
+                if until is not None:
+                    clauses.append("updated_at < ?")
+                    params.append(until)
+                if before is not None:
+                    clauses.append("(updated_at, session_id) < (?, ?)")
+                    params.extend(before)
+                where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+                rows = self._conn.execute(
+                    "SELECT session_id, message_count, last_message_time, context, updated_at FROM chat_sessions "
+                    f"{where}ORDER BY updated_at DESC, session_id DESC LIMIT ?", (*params, limit + 1)
+                ).fetchall()
+
+        sessions = [
+            {
+                "session_id": session_id,
+                "message_count": message_count,
+                "last_message_time": last_message_time,
+                "context": session_context,
+                "last_activity": activity,
+            }
+            for session_id, message_count, last_message_time, session_context, activity in rows[:limit]
+        ]
+        next_cursor = None
+        if len(rows) > limit:
+            last = sessions[-1]
+            next_cursor = encode_cursor((last["last_activity"], last["session_id"]))
+        return sessions, next_cursor
+
+    def count_sessions(self, context: Optional[str] = None, since: Optional[float] = None,
+                       until: Optional[float] = None) -> int:
+        """Number of sessions matching the page_sessions filters
+
+        O(log n) in memory, but with SQLite a COUNT(*) visits every matching
+        index entry, so callers should only ask for it when they need it.
+        """
+        with self._lock:
+            if self._conn is None:
+                index = self._activity if context is None else self._context_activity.get(context, ActivityIndex())
+                return index.count(since, until)
+            clauses, params = [], []
+            if context is not None:
+                clauses.append("context = ?")
+                params.append(context)
+            if since is not None:
+                clauses.append("updated_at >= ?")
+                params.append(since)
+            if until is not None:
+                clauses.append("updated_at < ?")
+                params.append(until)
+            where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+            return self._conn.execute(f"SELECT COUNT(*) FROM chat_sessions{where}", params).fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stored = None
+            if self._conn is not None:
+                stored = self._conn.execute("SELECT COUNT(*) FROM chat_sessions").fetchone()[0]
+            return {
+                "persistent": self._conn is not None,
+                "shared": self.shared,
+                "hot_sessions": len(self._hot),
+                "stored_sessions": stored,
+                "memory_bytes": self.memory_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                "hits": self.hits,
+                "loads_from_disk": self.loads,
+                "evictions": self.evictions,
+                "expired": self.expired,
+                "stale_reloads": self.stale_reloads,
+            }
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
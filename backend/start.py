@@ -2,11 +2,34 @@
 """
 PDF Editor Backend Startup Script
 """
+import argparse
 import uvicorn
 import os
 import sys
 
+def worker_count(value: str) -> int:
+    if value == "auto":
+        return os.cpu_count() or 1
+    return max(1, int(value))
+
 def main():
+    parser = argparse.ArgumentParser(description="Start the PDF Editor backend")
+    parser.add_argument("--workers", default=os.getenv("WORKERS", "1"),
+                        help="Number of uvicorn worker processes, or 'auto' for one per CPU (default: WORKERS or 1)")
+    parser.add_argument("--role", choices=["all", "pdf"], default=os.getenv("APP_ROLE", "all"),
+                        help="Endpoints to serve: 'all', or 'pdf' for a worker without the LLM stack (default: APP_ROLE or all)")
+    parser.add_argument("--migrate-uploads", action="store_true",
+                        help="Move loose uploads/*.pdf files into the blob store on startup, deleting duplicate copies "
+                             "(default: MIGRATE_UPLOADS)")
+    args = parser.parse_args()
+    workers = worker_count(args.workers)
+    # Read by create_app in every worker process
+    os.environ["APP_ROLE"] = args.role
+    if args.migrate_uploads:
+        os.environ["MIGRATE_UPLOADS"] = "1"
+    # PDF_WORKERS=auto shares the CPUs between this many workers
+    os.environ["WORKERS"] = str(workers)
+
     # Ensure we're in the backend directory
     backend_dir = os.path.dirname(os.path.abspath(__file__))
     os.chdir(backend_dir)
@@ -15,14 +38,25 @@ def main():
     print("📁 Backend directory:", backend_dir)
     print("🌐 Server will be available at: http://localhost:8000")
     print("📚 API docs will be available at: http://localhost:8000/docs")
+
+    if workers > 1:
+        # Workers only see each other's uploads, chat sessions and cached responses through shared state
+        os.environ.setdefault("STATE_BACKEND", "sqlite")
+        if os.environ["STATE_BACKEND"] != "sqlite":
+            print("⚠️  STATE_BACKEND is not sqlite, workers will not share uploads, sessions or caches")
+        print(f"👷 Running {workers} workers (state backend: {os.environ['STATE_BACKEND']}, reload disabled)")
+    if args.role != "all":
+        print(f"🧩 Role: {args.role}")
     print("=" * 50)
     
-    # Start the server
+    # Start the server; auto-reload only works with a single worker
     uvicorn.run(
-        "main:app",
+        "main:create_app",
+        factory=True,
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        reload=workers == 1,
+        workers=workers,
         log_level="info"
     )
 
@@ -0,0 +1,308 @@
+"""
+Shared state for running the API with several worker processes.
+
+State is a namespaced key-value store of JSON-serialisable values with
+optional TTLs. ``MemoryStateBackend`` keeps everything in the process (one
+worker, the old behaviour); ``SQLiteStateBackend`` keeps it in a local
+SQLite file in WAL mode so every worker on the box sees the same file
+metadata, cached responses and coordination flags.
+
+``backend.namespace(name)`` returns a dict-like view, so module-level dicts
+such as ``file_storage`` can be swapped for shared state as long as values
+are replaced rather than mutated in place.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+_MISSING = object()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS state_expiry ON state (expires_at) WHERE expires_at IS NOT NULL;
+"""
+
+
+class StateBackend(ABC):
+    """Interface shared by the in-process and multi-process backends"""
+
+    shared = False
+    # Expired entries are only skipped on read; writes delete them this often (seconds)
+    purge_interval = 60.0
+    _last_purge = 0.0
+
+    @abstractmethod
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        ...
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        ...
+
+    @abstractmethod
+    def set_if_absent(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """Store ``value`` unless a live entry exists; True if this call stored it"""
+
+    @abstractmethod
+    def delete(self, namespace: str, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def keys(self, namespace: str) -> List[str]:
+        ...
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        """Delete every expired entry; returns how many"""
+
+    def _maybe_purge(self, now: float):
+        if now - self._last_purge >= self.purge_interval:
+            self._last_purge = now
+            self.purge_expired()
+
+    def count(self, namespace: str) -> int:
+        return len(self.keys(namespace))
+
+    def clear(self, namespace: str):
+        for key in self.keys(namespace):
+            self.delete(namespace, key)
+
+    def namespace(self, name: str) -> "StateNamespace":
+        return StateNamespace(self, name)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": type(self).__name__, "shared": self.shared}
+
+
+class MemoryStateBackend(StateBackend):
+    """Per-process state; values are stored as-is without serialisation"""
+
+    def __init__(self):
+        self._data: Dict[str, Dict[str, Tuple[Any, Optional[float]]]] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, namespace: str, key: str, now: float) -> Any:
+        entry = self._data.get(namespace, {}).get(key)
+        if entry is None:
+            return _MISSING
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= now:
+            del self._data[namespace][key]
+            return _MISSING
+        return value
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        with self._lock:
+            value = self._live(namespace, key, time.time())
+        return default if value is _MISSING else value
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        now = time.time()
+        with self._lock:
+            self._data.setdefault(namespace, {})[key] = (value, now + ttl if ttl is not None else None)
+        self._maybe_purge(now)
+
+    def set_if_absent(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        now = time.time()
+        with self._lock:
+            if self._live(namespace, key, now) is not _MISSING:
+                return False
+            self._data.setdefault(namespace, {})[key] = (value, now + ttl if ttl is not None else None)
+        self._maybe_purge(now)
+        return True
+
+    def delete(self, namespace: str, key: str) -> bool:
+        with self._lock:
+            return self._data.get(namespace, {}).pop(key, None) is not None
+
+    def keys(self, namespace: str) -> List[str]:
+        now = time.time()
+        with self._lock:
+            entries = self._data.get(namespace, {})
+            return [key for key in list(entries) if self._live(namespace, key, now) is not _MISSING]
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        purged = 0
+        with self._lock:
+            for entries in self._data.values():
+                for key in [key for key, (_value, expires_at) in entries.items()
+                            if expires_at is not None and expires_at <= now]:
+                    del entries[key]
+                    purged += 1
+        return purged
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        with self._lock:
+            stats["namespaces"] = {name: len(entries) for name, entries in self._data.items()}
+        return stats
+
+
+class SQLiteStateBackend(StateBackend):
+    """State in a local SQLite file (WAL), shared by every process that opens it"""
+
+    shared = True
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM state WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (namespace, key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else default
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO state (namespace, key, value, expires_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), now + ttl if ttl is not None else None, now)
+            )
+        self._maybe_purge(now)
+
+    def set_if_absent(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "DELETE FROM state WHERE namespace = ? AND key = ? AND expires_at IS NOT NULL AND expires_at <= ?",
+                    (namespace, key, now)
+                )
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO state (namespace, key, value, expires_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (namespace, key, json.dumps(value), now + ttl if ttl is not None else None, now)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self._maybe_purge(now)
+        return cursor.rowcount == 1
+
+    def delete(self, namespace: str, key: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM state WHERE namespace = ? AND key = ?", (namespace, key))
+        return cursor.rowcount > 0
+
+    def keys(self, namespace: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key FROM state WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (namespace, time.time())
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def count(self, namespace: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM state WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (namespace, time.time())
+            ).fetchone()[0]
+
+    def clear(self, namespace: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM state WHERE namespace = ?", (namespace,))
+
+    def purge_expired(self) -> int:
+        # Every worker runs this on its own schedule; deleting expired rows twice is harmless
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM state WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+            )
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        with self._lock:
+            rows = self._conn.execute("SELECT namespace, COUNT(*) FROM state GROUP BY namespace").fetchall()
+        stats["db_path"] = self.db_path
+        stats["namespaces"] = {name: count for name, count in rows}
+        return stats
+
+
+class StateNamespace(MutableMapping):
+    """Dict-like view of one namespace of a state backend"""
+
+    def __init__(self, backend: StateBackend, name: str):
+        self.backend = backend
+        self.name = name
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.backend.get(self.name, key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any):
+        self.backend.set(self.name, key, value)
+
+    def __delitem__(self, key: str):
+        if not self.backend.delete(self.name, key):
+            raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        return self.backend.get(self.name, key, _MISSING) is not _MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.backend.keys(self.name))
+
+    def __len__(self) -> int:
+        return self.backend.count(self.name)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.backend.get(self.name, key, default)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self.backend.set(self.name, key, value, ttl)
+
+    def set_if_absent(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        return self.backend.set_if_absent(self.name, key, value, ttl)
+
+
+_default_backend: Optional[StateBackend] = None
+_default_lock = threading.Lock()
+
+
+def create_state_backend(kind: Optional[str] = None, db_path: Optional[str] = None) -> StateBackend:
+    """Backend from STATE_BACKEND ("memory" or "sqlite") and STATE_DB"""
+    kind = (kind or os.getenv("STATE_BACKEND", "memory")).lower()
+    if kind == "memory":
+        return MemoryStateBackend()
+    if kind == "sqlite":
+        return SQLiteStateBackend(db_path or os.getenv("STATE_DB", "data/state.db"))
+    raise ValueError(f"Unknown STATE_BACKEND {kind!r}, expected 'memory' or 'sqlite'")
+
+
+def default_state_backend() -> StateBackend:
+    """The process-wide backend configured by STATE_BACKEND, created on first call"""
+    global _default_backend
+    with _default_lock:
+        if _default_backend is None:
+            _default_backend = create_state_backend()
+        return _default_backend
@@ -0,0 +1,329 @@
+"""
+Structured output for model responses that should be JSON.
+
+Grounded Gemini calls can't use ``response_schema``, so responses arrive as
+free text: sometimes wrapped in ```json fences, sometimes followed by prose,
+sometimes cut off. ``parse_structured`` pulls the JSON value out of the text
+(strict ``raw_decode`` first, a tolerant parser that repairs quotes, commas
+and truncation second) and conforms it to a small declared schema. Each
+top-level section is validated on its own, so the well-formed parts of a
+partial response are kept and only the broken ones fall back to defaults.
+
+Schemas are plain dicts: ``{"type": "object", "properties": {...}}``,
+``{"type": "array", "items": {...}}`` or a scalar type (``string``,
+``integer``, ``number``, ``boolean``), each with an optional ``default``.
+"""
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+_FENCE = re.compile(r"```(?:json|JSON)?\s*(.*?)(?:```|$)", re.DOTALL)
+_NUMBER = re.compile(r"-?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+_IDENTIFIER = re.compile(r"[A-Za-z_$][\w$]*")
+_LITERALS = (("true", True), ("false", False), ("null", None), ("True", True), ("False", False), ("None", None))
+_ESCAPES = {'"': '"', "'": "'", "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_WHITESPACE = " \t\r\n"
+_MISSING = object()
+_decoder = json.JSONDecoder()
+
+
+class StructuredOutputError(ValueError):
+    """No JSON value could be recovered from the model response"""
+
+
+class _Truncated(Exception):
+    """Input ended (or stopped making sense) inside a value; carries what was parsed so far"""
+
+    def __init__(self, partial: Any = _MISSING):
+        super().__init__()
+        self.partial = partial
+
+
+class _TolerantParser:
+    """JSON parser that accepts single quotes, bare keys, Python literals and stray commas"""
+
+    def __init__(self, text: str, pos: int = 0):
+        self.text = text
+        self.pos = pos
+        self.repairs: List[str] = []
+
+    def _skip_whitespace(self):
+        text, pos = self.text, self.pos
+        while pos < len(text) and text[pos] in _WHITESPACE:
+            pos += 1
+        self.pos = pos
+
+    def value(self) -> Any:
+        self._skip_whitespace()
+        if self.pos >= len(self.text):
+            raise _Truncated()
+        ch = self.text[self.pos]
+        if ch == "{":
+            return self._object()
+        if ch == "[":
+            return self._array()
+        if ch in "\"'":
+            if ch == "'":
+                self.repairs.append("single-quoted string")
+            return self._string()
+        match = _NUMBER.match(self.text, self.pos)
+        if match:
+            if match.end() >= len(self.text):
+                raise _Truncated()  # the number may have been cut short
+            self.pos = match.end()
+            number = match.group(0)
+            return float(number) if any(c in number for c in ".eE") else int(number)
+        for word, literal in _LITERALS:
+            if self.text.startswith(word, self.pos):
+                self.pos += len(word)
+                return literal
+        self.repairs.append(f"unexpected {ch!r} at {self.pos}")
+        raise _Truncated()
+
+    def _object(self) -> Dict[str, Any]:
+        self.pos += 1
+        result: Dict[str, Any] = {}
+        while True:
+            self._skip_whitespace()
+            if self.pos >= len(self.text):
+                raise _Truncated(result)
+            ch = self.text[self.pos]
+            if ch == "}":
+                self.pos += 1
+                return result
+            if ch == ",":
+                self.pos += 1
+                continue
+            if ch in "\"'":
+                try:
+                    key = self._string()
+                except _Truncated:
+                    raise _Truncated(result)
+            else:
+                match = _IDENTIFIER.match(self.text, self.pos)
+                if not match:
+                    self.repairs.append(f"unexpected {ch!r} at {self.pos}")
+                    raise _Truncated(result)
+                self.repairs.append("unquoted key")
+                key = match.group(0)
+                self.pos = match.end()
+            self._skip_whitespace()
+            if self.pos >= len(self.text):
+                raise _Truncated(result)
+            if self.text[self.pos] == ":":
+                self.pos += 1
+            else:
+                self.repairs.append(f"missing ':' after {key!r}")
+            try:
+                result[key] = self.value()
+            except _Truncated as truncated:
+                # Keep a partially parsed container, drop a cut-off scalar
+                if isinstance(truncated.partial, (dict, list)):
+                    result[key] = truncated.partial
+                raise _Truncated(result)
+
+    def _array(self) -> List[Any]:
+        self.pos += 1
+        result: List[Any] = []
+        while True:
+            self._skip_whitespace()
+            if self.pos >= len(self.text):
+                raise _Truncated(result)
+            ch = self.text[self.pos]
+            if ch == "]":
+                self.pos += 1
+                return result
+            if ch == ",":
+                self.pos += 1
+                continue
+            try:
+                result.append(self.value())
+            except _Truncated as truncated:
+                if isinstance(truncated.partial, (dict, list)):
+                    result.append(truncated.partial)
+                raise _Truncated(result)
+
+    def _string(self) -> str:
+        text = self.text
+        quote = text[self.pos]
+        pos = self.pos + 1
+        chunks = []
+        while pos < len(text):
+            ch = text[pos]
+            if ch == quote:
+                self.pos = pos + 1
+                return "".join(chunks)
+            if ch == "\\":
+                if pos + 1 >= len(text):
+                    break
+                escape = text[pos + 1]
+                if escape == "u" and pos + 6 <= len(text):
+                    try:
+                        chunks.append(chr(int(text[pos + 2:pos + 6], 16)))
+                        pos += 6
+                        continue
+                    except ValueError:
+                        pass
+                chunks.append(_ESCAPES.get(escape, escape))
+                pos += 2
+                continue
+            chunks.append(ch)
+            pos += 1
+        self.pos = pos
+        raise _Truncated()
+
+
+def _json_body(text: str) -> str:
+    """The content of the first ```json fence that holds JSON, or the text itself"""
+    for match in _FENCE.finditer(text):
+        if "{" in match.group(1) or "[" in match.group(1):
+            return match.group(1)
+    return text
+
+
+def extract_json(text: str) -> Tuple[Any, bool, List[str]]:
+    """Recover the first JSON value in ``text``
+
+    Returns ``(value, complete, repairs)``; ``complete`` is False when the
+    value was cut off and only its well-formed leading part was kept.
+    """
+    body = _json_body(text or "")
+    starts = [index for index in (body.find("{"), body.find("[")) if index >= 0]
+    if not starts:
+        raise StructuredOutputError("no JSON object in the model response")
+    start = min(starts)
+    try:
+        value, _end = _decoder.raw_decode(body, start)
+        return value, True, []
+    except json.JSONDecodeError:
+        pass
+    parser = _TolerantParser(body, start)
+    try:
+        return parser.value(), True, parser.repairs
+    except _Truncated as truncated:
+        if truncated.partial is _MISSING:
+            raise StructuredOutputError("unparseable JSON in the model response")
+        return truncated.partial, False, parser.repairs + ["truncated"]
+
+
+def default_for(schema: Dict[str, Any]) -> Any:
+    """Zero value for a schema: empty strings, zeros and fully populated objects"""
+    if "default" in schema:
+        return schema["default"]
+    kind = schema.get("type")
+    if kind == "object":
+        return {name: default_for(sub) for name, sub in schema.get("properties", {}).items()}
+    if kind == "array":
+        return []
+    return {"string": "", "integer": 0, "number": 0.0, "boolean": False}.get(kind)
+
+
+def _to_number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        match = _NUMBER.search(value.replace(",", ""))
+        if match:
+            return float(match.group(0))
+    return None
+
+
+def conform(value: Any, schema: Dict[str, Any], issues: List[str], path: str = "$") -> Any:
+    """Coerce ``value`` to ``schema``, filling gaps with defaults and noting each problem"""
+    kind = schema.get("type")
+    if kind == "object":
+        if not isinstance(value, dict):
+            issues.append(f"{path}: expected object")
+            return default_for(schema)
+        properties = schema.get("properties", {})
+        result = {}
+        for name, sub in properties.items():
+            if name in value and value[name] is not None:
+                result[name] = conform(value[name], sub, issues, f"{path}.{name}")
+            else:
+                issues.append(f"{path}.{name}: missing")
+                result[name] = default_for(sub)
+        # Keep extra keys the model added, the frontend ignores what it doesn't know
+        for name, extra in value.items():
+            result.setdefault(name, extra)
+        return result
+    if kind == "array":
+        if not isinstance(value, list):
+            issues.append(f"{path}: expected array")
+            return default_for(schema)
+        items = schema.get("items")
+        if not items:
+            return value
+        return [conform(item, items, issues, f"{path}[{index}]") for index, item in enumerate(value)]
+    if kind == "string":
+        if isinstance(value, str):
+            return value
+        return str(value)
+    if kind in ("integer", "number"):
+        number = _to_number(value)
+        if number is None:
+            issues.append(f"{path}: expected {kind}")
+            return default_for(schema)
+        return int(round(number)) if kind == "integer" else number
+    if kind == "boolean":
+        if isinstance(value, bool):
+            return value
+        issues.append(f"{path}: expected boolean")
+        return default_for(schema)
+    return value
+
+
+class ParsedOutput:
+    __slots__ = ("data", "complete", "issues", "repairs", "valid_sections")
+
+    def __init__(self, data: Any, complete: bool, issues: List[str], repairs: List[str], valid_sections: List[str]):
+        self.data = data
+        self.complete = complete  # the response held a whole JSON value
+        self.issues = issues
+        self.repairs = repairs
+        self.valid_sections = valid_sections  # top-level properties that validated cleanly
+
+    def cacheable(self, required: Iterable[str]) -> bool:
+        """Whole, every ``required`` section valid and nothing filled in from defaults
+
+        Anything less is still worth returning, but caching it would keep
+        serving the defaults long after the model could have done better.
+        """
+        return self.complete and not self.issues and all(name in self.valid_sections for name in required)
+
+
+def validate(value: Any, schema: Dict[str, Any], complete: bool = True, repairs: Optional[List[str]] = None) -> ParsedOutput:
+    """Conform an already extracted value to ``schema``, one top-level section at a time"""
+    repairs = repairs or []
+    if schema.get("type") != "object" or not isinstance(value, dict):
+        issues: List[str] = []
+        return ParsedOutput(conform(value, schema, issues), complete, issues, repairs, [])
+
+    # Validate section by section so one bad part doesn't sink the rest
+    issues = []
+    data = {}
+    valid_sections = []
+    for name, sub in schema.get("properties", {}).items():
+        section_issues: List[str] = []
+        if name in value and value[name] is not None:
+            data[name] = conform(value[name], sub, section_issues, f"$.{name}")
+        else:
+            section_issues.append(f"$.{name}: missing")
+            data[name] = default_for(sub)
+        if not section_issues:
+            valid_sections.append(name)
+        issues.extend(section_issues)
+    for name, extra in value.items():
+        data.setdefault(name, extra)
+    return ParsedOutput(data, complete, issues, repairs, valid_sections)
+
+
+def parse_structured(text: str, schema: Dict[str, Any]) -> ParsedOutput:
+    """Extract, repair and validate a model response against ``schema``
+
+    Raises StructuredOutputError if the response holds no JSON at all.
+    """
+    value, complete, repairs = extract_json(text)
+    return validate(value, schema, complete, repairs)
@@ -0,0 +1,65 @@
+"""A failed announcer report page gets a placeholder and is retried alone, against a local stand-in client"""
+import asyncio
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault("CHAT_SESSIONS_DB", "")
+os.environ.setdefault("RESPONSE_CACHE_SNAPSHOT", "")
+
+import ai_api  # noqa: E402
+from llm_gateway import LLMGateway  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+
+
+class FakeModels:
+    """Answers every report page with valid JSON, except pages listed in ``broken`` which get prose"""
+
+    def __init__(self, broken=()):
+        self.broken = set(broken)
+        self.calls = []
+
+    def generate_content(self, model, contents, config):
+        template = contents.template_name
+        self.calls.append(template)
+        page = int(template[len("announcer-report-page")])
+        if page in self.broken:
+            return SimpleNamespace(text="Sorry, I can't help with that.", usage_metadata=None)
+        fields = ai_api.announcer_report_sections(False)[page - 1]["fields"]
+        return SimpleNamespace(text=json.dumps({field: f"{field} notes" for field in fields}), usage_metadata=None)
+
+
+@pytest.fixture
+def models(monkeypatch, tmp_path):
+    fake = FakeModels(broken={2})
+    gateway = LLMGateway(client=SimpleNamespace(models=fake), config={}, rate_per_minute=0)
+    monkeypatch.setattr(ai_api, "llm", gateway)
+    monkeypatch.setattr(ai_api, "response_cache", ResponseCache())
+    # The PDF is written to processed/ under the working directory
+    monkeypatch.chdir(tmp_path)
+    yield fake
+    gateway.shutdown()
+
+
+def test_failed_page_gets_placeholder_and_pdf_still_builds(models):
+    report, pdf_path = asyncio.run(ai_api.get_announcer_report_pdf("401", "KC", "BUF", "nfl", "2024-09-08"))
+    assert "page2" in report["error"]
+    page2 = ai_api.announcer_report_sections(False)[1]
+    assert report["page2"] == {"title": page2["title"], **{field: "" for field in page2["fields"]}}
+    assert report["page1"]["awayTeamRecord"] == "awayTeamRecord notes"
+    assert pdf_path and os.path.exists(pdf_path)
+
+
+def test_retry_regenerates_only_the_failed_page(models):
+    asyncio.run(ai_api.get_announcer_report_pdf("401", "KC", "BUF", "nfl", "2024-09-08"))
+    assert sorted(set(models.calls)) == [ai_api.report_template_name(page, False) for page in (1, 2, 3)]
+
+    models.calls.clear()
+    models.broken.clear()
+    report, pdf_path = asyncio.run(ai_api.get_announcer_report_pdf("401", "KC", "BUF", "nfl", "2024-09-08"))
+    assert models.calls == [ai_api.report_template_name(2, False)]
+    assert "error" not in report
+    assert report["page2"]["keyMatchups"] == "keyMatchups notes"
+    assert pdf_path
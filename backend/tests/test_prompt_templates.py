@@ -0,0 +1,130 @@
+"""Prefix reuse of the ai_api prompt templates, driven through the gateway with a local stand-in client"""
+import asyncio
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from chat_context import estimate_tokens
+from llm_gateway import LLMGateway
+from prompt_templates import PromptRegistry
+
+os.environ.setdefault("CHAT_SESSIONS_DB", "")
+os.environ.setdefault("RESPONSE_CACHE_SNAPSHOT", "")
+
+import ai_api  # noqa: E402
+
+QB = {"quarterback_name": "A", "completion_percentage": 60.0, "passing_yards": 200, "completions": 20, "attempts": 30}
+TEAM = {"score": 21, "stats": {"totalYards": 350, "passingYards": 250, "rushingYards": 100, "turnovers": 1,
+                               "timeOfPossession": "30:00", "firstDowns": 20, "penalties": 5, "penaltyYards": 40}}
+
+
+class FakeModels:
+    """Answers each template with valid JSON and reports implicit prefix caching like the provider"""
+
+    def __init__(self):
+        self.prompts = []
+
+    def _answer(self, template: str) -> str:
+        if template == "quarterback-stats":
+            return json.dumps({"away_team": QB, "home_team": QB})
+        if template == "game-summary":
+            return json.dumps({"gameInfo": {"gameId": "g", "awayTeam": "a", "homeTeam": "h", "league": "nfl"},
+                               "awayTeam": TEAM, "homeTeam": TEAM, "players": []})
+        if template == "game-details":
+            return json.dumps({"gameId": "g", "competitions": [], "status": {"type": {"name": "STATUS_FINAL"}}})
+        if template.startswith("announcer-report-page"):
+            page = int(template[len("announcer-report-page")])
+            fields = ai_api.announcer_report_sections(False)[page - 1]["fields"]
+            return json.dumps({field: f"{field} notes" for field in fields})
+        return "Cedar says hi"
+
+    def generate_content(self, model, contents, config):
+        # Tokens shared with the longest common prefix of an earlier prompt count as cached
+        shared = max((len(os.path.commonprefix([earlier, contents])) for earlier in self.prompts), default=0)
+        self.prompts.append(str(contents))
+        usage = SimpleNamespace(prompt_token_count=estimate_tokens(contents),
+                                cached_content_token_count=estimate_tokens(contents[:shared]) if shared else 0)
+        return SimpleNamespace(text=self._answer(contents.template_name), usage_metadata=usage)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """A fresh registry holding ai_api's templates, wired to a gateway with the fake client"""
+    fresh = PromptRegistry()
+    for name in ai_api.prompts.stats():
+        template = ai_api.prompts.get(name)
+        fresh.register(name, template.prefix, template.suffix)
+    models = FakeModels()
+    gateway = LLMGateway(client=SimpleNamespace(models=models), config={}, rate_per_minute=0,
+                         usage_observer=fresh.record_usage)
+    monkeypatch.setattr(ai_api, "prompts", fresh)
+    monkeypatch.setattr(ai_api, "llm", gateway)
+    yield fresh
+    gateway.shutdown()
+
+
+def assert_reuse(stats, name, calls):
+    """The first call sends the prefix cold, every later one within the window can reuse it"""
+    template = stats[name]
+    assert template["calls"] == calls
+    assert template["prefix_tokens_sent"] == calls * template["prefix_tokens"]
+    assert template["prefix_tokens_reusable"] == (calls - 1) * template["prefix_tokens"]
+    assert template["prefix_hit_rate"] == round((calls - 1) / calls, 4)
+    # The stand-in provider saw at least the static prefix again on every repeat
+    assert template["provider_cached_tokens"] >= template["prefix_tokens_reusable"]
+    assert template["provider_prompt_tokens"] > template["provider_cached_tokens"]
+
+
+def test_prefix_reuse_per_endpoint(registry):
+    games = [("401", "KC", "BUF"), ("402", "DAL", "PHI"), ("403", "SF", "SEA")]
+
+    async def drive():
+        session_id = ai_api.create_chat_session()
+        for message in ("Who leads the league in sacks?", "And in interceptions?", "Thanks!"):
+            ai_api.add_message_to_session(session_id, "user", message, "general")
+            await ai_api.cedar_chat_response(message, session_id, "general")
+        for game_id, away, home in games:
+            key = f"test:{game_id}"
+            await ai_api._generate_game_summary(key, game_id, away, home, "nfl", None, "final")
+            await ai_api._generate_game_details(key, game_id, away, home, "nfl", "final")
+            await ai_api._generate_quarterback_stats(key, game_id, away, home, "nfl", "final")
+            report = await ai_api._generate_announcer_report(game_id, away, home, "nfl", "2024-09-08")
+            assert "error" not in report
+
+    asyncio.run(drive())
+    stats = registry.stats()
+    assert_reuse(stats, "chat-general", 3)
+    for name in ("game-summary", "game-details", "quarterback-stats"):
+        assert_reuse(stats, name, len(games))
+    for page in (1, 2, 3):
+        assert_reuse(stats, ai_api.report_template_name(page, False), len(games))
+    # Templates that weren't used sent nothing
+    assert stats["chat-nfl"]["calls"] == 0
+    assert stats[ai_api.report_template_name(1, True)]["calls"] == 0
+
+
+def test_changed_prefix_is_a_miss():
+    registry = PromptRegistry()
+    registry.register("t", "static prefix " * 10, "{value}")
+    registry.render("t", value=1)
+    registry.render("t", value=2)
+    registry.register("t", "edited prefix " * 10, "{value}")
+    registry.render("t", value=3)
+    stats = registry.stats()["t"]
+    assert stats["calls"] == 3
+    assert stats["prefix_tokens_reusable"] == estimate_tokens("static prefix " * 10)
+
+
+def test_reuse_window_expires(monkeypatch):
+    registry = PromptRegistry(reuse_window=60)
+    registry.register("t", "static prefix " * 10, "{value}")
+    now = [1000.0]
+    monkeypatch.setattr("prompt_templates.time.time", lambda: now[0])
+    registry.render("t", value=1)
+    now[0] += 30
+    registry.render("t", value=2)
+    now[0] += 120
+    registry.render("t", value=3)
+    assert registry.stats()["t"]["prefix_hit_rate"] == round(1 / 3, 4)
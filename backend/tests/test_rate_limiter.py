@@ -0,0 +1,208 @@
+"""Token bucket, retry policy and circuit breaker, plus the gateway driving them against a local fake client"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from llm_gateway import LLMGateway, LLMUnavailableError
+from rate_limiter import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    CircuitBreaker,
+    PriorityTokenBucket,
+    RetryPolicy,
+    retry_after_seconds,
+)
+
+
+class FakeAPIError(Exception):
+    """Shaped like genai's APIError: an int ``code``, response headers and the JSON error details"""
+
+    def __init__(self, code: int, headers=None, details=None):
+        super().__init__(f"{code} error")
+        self.code = code
+        self.response = SimpleNamespace(status_code=code, headers=headers or {})
+        self.details = details
+
+
+class FakeModels:
+    """Raises the queued errors first, then answers; streams split the answer into chunks"""
+
+    def __init__(self, errors=(), text="hello world", stream_errors_after=None):
+        self.errors = list(errors)
+        self.text = text
+        self.stream_errors_after = stream_errors_after
+        self.calls = 0
+
+    def generate_content(self, model, contents, config):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return SimpleNamespace(text=self.text, usage_metadata=None)
+
+    def generate_content_stream(self, model, contents, config):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        for index, word in enumerate(self.text.split(" ")):
+            if self.stream_errors_after is not None and index == self.stream_errors_after:
+                raise FakeAPIError(503)
+            yield SimpleNamespace(text=word, usage_metadata=None)
+
+
+def make_gateway(models, **kwargs):
+    kwargs.setdefault("rate_per_minute", 0)
+    kwargs.setdefault("retry_policy", RetryPolicy(max_retries=3, base_delay=0.01, max_delay=0.02))
+    return LLMGateway(client=SimpleNamespace(models=models), config={}, **kwargs)
+
+
+async def collect(stream):
+    return [chunk async for chunk in stream]
+
+
+def test_bucket_grants_burst_then_refills():
+    async def scenario():
+        bucket = PriorityTokenBucket(rate_per_minute=600, burst=2)  # one token every 0.1s
+        assert await bucket.acquire(timeout=0)
+        assert await bucket.acquire(timeout=0)
+        assert not await bucket.acquire(timeout=0.01)
+        assert await bucket.acquire(timeout=1)
+        assert bucket.timeouts == 1
+
+    asyncio.run(scenario())
+
+
+def test_bucket_serves_interactive_waiters_before_background():
+    async def scenario():
+        bucket = PriorityTokenBucket(rate_per_minute=1200, burst=1)
+        assert await bucket.acquire()
+        order = []
+
+        async def wait(priority, name):
+            await bucket.acquire(priority)
+            order.append(name)
+
+        background = [asyncio.create_task(wait(PRIORITY_BACKGROUND, f"bg{i}")) for i in range(2)]
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(wait(PRIORITY_INTERACTIVE, "chat"))
+        await asyncio.gather(interactive, *background)
+        return order
+
+    assert asyncio.run(scenario()) == ["chat", "bg0", "bg1"]
+
+
+def test_retry_after_read_from_header_and_retry_info():
+    assert retry_after_seconds(FakeAPIError(429, headers={"Retry-After": "7"})) == 7.0
+    details = {"error": {"details": [{"@type": "RetryInfo", "retryDelay": "12s"}]}}
+    assert retry_after_seconds(FakeAPIError(429, details=details)) == 12.0
+    assert retry_after_seconds(FakeAPIError(429)) is None
+
+
+def test_retry_policy_honours_retry_after_and_gives_up():
+    policy = RetryPolicy(max_retries=2, base_delay=0.5, max_retry_after=30)
+    delay = policy.delay(1, FakeAPIError(429, headers={"Retry-After": "4"}))
+    assert 4.0 <= delay <= 4.5
+    assert 0 <= policy.delay(1, FakeAPIError(503)) <= 1.0
+    assert policy.delay(3, FakeAPIError(503)) is None
+    assert policy.delay(1, FakeAPIError(429, headers={"Retry-After": "120"})) is None
+    assert policy.delay(1, FakeAPIError(400)) is None
+    assert policy.delay(1, ValueError("bad prompt")) is None
+
+
+def test_breaker_trips_then_admits_one_probe():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown_seconds=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+
+
+def test_generate_retries_rate_limits_and_upstream_errors():
+    models = FakeModels(errors=[FakeAPIError(429, headers={"Retry-After": "0"}), FakeAPIError(503)])
+    gateway = make_gateway(models)
+    assert asyncio.run(gateway.generate("hi")) == "hello world"
+    assert models.calls == 3
+    assert gateway.retries == 2
+    assert gateway.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_generate_surfaces_unavailable_when_retries_run_out():
+    models = FakeModels(errors=[FakeAPIError(503, headers={"Retry-After": "3"})] * 5)
+    gateway = make_gateway(models, retry_policy=RetryPolicy(max_retries=1, base_delay=0.01, max_retry_after=0.5))
+    with pytest.raises(LLMUnavailableError) as excinfo:
+        asyncio.run(gateway.generate("hi"))
+    assert excinfo.value.retry_after == 3.0
+    assert models.calls == 1
+
+
+def test_generate_does_not_retry_bad_requests():
+    models = FakeModels(errors=[FakeAPIError(400)])
+    gateway = make_gateway(models)
+    with pytest.raises(FakeAPIError):
+        asyncio.run(gateway.generate("hi"))
+    assert models.calls == 1
+    assert gateway.upstream_errors == 0
+
+
+def test_open_breaker_fails_fast():
+    models = FakeModels(errors=[FakeAPIError(503)] * 10)
+    gateway = make_gateway(models, breaker=CircuitBreaker(failure_threshold=2, cooldown_seconds=60),
+                           retry_policy=RetryPolicy(max_retries=0))
+    for _ in range(2):
+        with pytest.raises(LLMUnavailableError):
+            asyncio.run(gateway.generate("hi"))
+    with pytest.raises(LLMUnavailableError) as excinfo:
+        asyncio.run(gateway.generate("hi"))
+    assert models.calls == 2
+    assert excinfo.value.retry_after > 0
+
+
+def test_stream_retries_errors_before_the_first_chunk():
+    models = FakeModels(errors=[FakeAPIError(503)])
+    gateway = make_gateway(models)
+    assert asyncio.run(collect(gateway.stream("hi"))) == ["hello", "world"]
+    assert models.calls == 2
+    assert gateway.retries == 1
+
+
+def test_stream_does_not_retry_after_text_was_sent():
+    models = FakeModels(text="one two three", stream_errors_after=1)
+    gateway = make_gateway(models)
+    received = []
+
+    async def consume():
+        async for chunk in gateway.stream("hi"):
+            received.append(chunk)
+
+    with pytest.raises(FakeAPIError):
+        asyncio.run(consume())
+    assert received == ["one"]
+    assert models.calls == 1
+    assert gateway.upstream_errors == 1
+
+
+def test_aborted_stream_is_neither_success_nor_failure():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=0.01)
+    breaker.record_failure()
+    gateway = make_gateway(FakeModels(text="one two three"), breaker=breaker)
+    time.sleep(0.02)
+
+    async def abort_after_first_chunk():
+        stream = gateway.stream("hi")
+        assert await stream.__anext__() == "one"
+        await stream.aclose()
+
+    asyncio.run(abort_after_first_chunk())
+    # The half-open probe was released without closing the breaker
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.consecutive_failures == 1
+    assert gateway.upstream_errors == 0
+    assert breaker.allow()
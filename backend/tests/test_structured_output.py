@@ -0,0 +1,96 @@
+import pytest
+
+from structured_output import StructuredOutputError, extract_json, parse_structured
+
+QB_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "quarterback_name": {"type": "string", "default": "Unknown"},
+        "passing_yards": {"type": "integer"},
+        "completion_percentage": {"type": "number"},
+    },
+}
+SCHEMA = {"type": "object", "properties": {"away_team": QB_SCHEMA, "home_team": QB_SCHEMA}}
+SECTIONS = SCHEMA["properties"]
+
+GOOD = ('{"away_team": {"quarterback_name": "A", "passing_yards": 250, "completion_percentage": 64.5}, '
+        '"home_team": {"quarterback_name": "B", "passing_yards": 180, "completion_percentage": 58.0}}')
+
+
+def test_plain_json_is_cacheable():
+    parsed = parse_structured(GOOD, SCHEMA)
+    assert parsed.complete and not parsed.issues and not parsed.repairs
+    assert parsed.valid_sections == ["away_team", "home_team"]
+    assert parsed.cacheable(SECTIONS)
+
+
+def test_fenced_json_with_surrounding_prose():
+    parsed = parse_structured(f"Here are the stats:\n```json\n{GOOD}\n```\nLet me know!", SCHEMA)
+    assert parsed.data["away_team"]["passing_yards"] == 250
+    assert parsed.cacheable(SECTIONS)
+
+
+def test_unclosed_fence():
+    value, complete, _repairs = extract_json("```json\n{\"a\": 1}")
+    assert value == {"a": 1} and complete
+
+
+def test_truncated_keeps_the_leading_sections():
+    text = GOOD[:GOOD.index('"home_team"') + 40]
+    parsed = parse_structured(text, SCHEMA)
+    assert not parsed.complete
+    assert "truncated" in parsed.repairs
+    assert parsed.data["away_team"]["quarterback_name"] == "A"
+    assert "away_team" in parsed.valid_sections
+    assert "home_team" not in parsed.valid_sections
+    assert not parsed.cacheable(SECTIONS)
+
+
+def test_truncated_number_is_dropped():
+    value, complete, _repairs = extract_json('{"a": 1, "b": 12')
+    assert value == {"a": 1} and not complete
+
+
+def test_single_quoted_strings():
+    parsed = parse_structured("{'away_team': {'quarterback_name': 'O\\'Connell', 'passing_yards': '231 yds', "
+                              "'completion_percentage': 61}, 'home_team': {'quarterback_name': 'B', "
+                              "'passing_yards': 100, 'completion_percentage': 50.5}}", SCHEMA)
+    assert "single-quoted string" in parsed.repairs
+    assert parsed.data["away_team"]["quarterback_name"] == "O'Connell"
+    # Coerced from "231 yds" and 61
+    assert parsed.data["away_team"]["passing_yards"] == 231
+    assert parsed.data["away_team"]["completion_percentage"] == 61.0
+    assert parsed.cacheable(SECTIONS)
+
+
+def test_bare_keys_python_literals_and_trailing_commas():
+    value, complete, repairs = extract_json("{final: True, score: [1, 2,], note: None,}")
+    assert value == {"final": True, "score": [1, 2], "note": None}
+    assert complete
+    assert "unquoted key" in repairs
+
+
+def test_empty_object_is_not_cacheable():
+    parsed = parse_structured("{}", SCHEMA)
+    assert parsed.complete
+    assert parsed.valid_sections == []
+    assert parsed.data["away_team"] == {"quarterback_name": "Unknown", "passing_yards": 0,
+                                        "completion_percentage": 0.0}
+    assert not parsed.cacheable(SECTIONS)
+
+
+def test_defaulted_fields_are_not_cacheable():
+    parsed = parse_structured('{"away_team": {"quarterback_name": "A", "passing_yards": "n/a"}, '
+                              '"home_team": {"quarterback_name": "B", "passing_yards": 1, '
+                              '"completion_percentage": 50}}', SCHEMA)
+    assert parsed.complete
+    assert parsed.valid_sections == ["home_team"]
+    assert "$.away_team.passing_yards: expected integer" in parsed.issues
+    assert "$.away_team.completion_percentage: missing" in parsed.issues
+    assert not parsed.cacheable(SECTIONS)
+    assert parsed.cacheable(["home_team"]) is False  # issues anywhere block caching
+
+
+def test_no_json_raises():
+    with pytest.raises(StructuredOutputError):
+        parse_structured("Sorry, I can't find that game.", SCHEMA)
@@ -0,0 +1,343 @@
+"""
+Persistent manifest of the PDFs in ``uploads/``.
+
+Startup used to open (main.py) or fully rasterise (main_alt.py) every
+upload just to learn its page count and page size, so boot time grew with
+the archive. The manifest keeps that metadata together with each file's
+size, mtime and content hash in a small SQLite table (WAL, safe to share
+between workers). Loading it is one query; an entry is checked against its
+file (one stat) when the file is used, and a background scan inspects only
+files that are new or changed since they were recorded.
+
+Uploads are stored by content: the bytes live once in
+``uploads/blobs/<sha[:2]>/<sha256>.pdf`` and each ``file_id`` is a row
+pointing at its blob. Uploading a document that is already stored costs
+one hash and one insert, nothing is re-parsed, and a blob is deleted only
+when its last ``file_id`` is released. Uploads from before the blob store
+(``uploads/{file_id}_{name}.pdf``) are registered where they are; the
+scan moves them into it, dropping duplicate copies, only when asked to
+(``scan(migrate=True)``).
+
+The inspector that reads page count and size is passed in, so each backend
+keeps its own PDF library and page size units.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# path -> {"total_pages": int, "page_size": {"width": float, "height": float}}
+Inspector = Callable[[str], Dict[str, Any]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS upload_manifest (
+    file_id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    total_pages INTEGER NOT NULL,
+    page_width REAL NOT NULL,
+    page_height REAL NOT NULL,
+    created_at TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS upload_manifest_sha256 ON upload_manifest (sha256);
+"""
+
+_COLUMNS = "file_id, filename, file_path, total_pages, page_width, page_height, created_at, sha256, size, mtime"
+
+
+def file_id_from_name(filename: str) -> str:
+    """Uploads are stored as ``{file_id}_{original name}``"""
+    return filename.split("_")[0]
+
+
+def _original_name(file_id: str, name: str) -> str:
+    return name[len(file_id) + 1:] if name.startswith(f"{file_id}_") else name
+
+
+def sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _row_to_info(row: Tuple) -> Dict[str, Any]:
+    file_id, filename, file_path, total_pages, width, height, created_at, sha256, size, mtime = row
+    return {
+        "file_id": file_id,
+        "filename": filename,
+        "file_path": file_path,
+        "total_pages": total_pages,
+        "page_size": {"width": width, "height": height},
+        "created_at": created_at,
+        "sha256": sha256,
+        "size": size,
+        "mtime": mtime,
+    }
+
+
+class UploadManifest:
+    """File metadata for uploads/, validated lazily and refreshed by an incremental scan"""
+
+    def __init__(self, db_path: str, inspect: Inspector, uploads_dir: str = "uploads", scan_workers: int = 4):
+        self.db_path = db_path
+        self.inspect = inspect
+        self.uploads_dir = uploads_dir
+        self.scan_workers = scan_workers
+        self.last_scan: Optional[Dict[str, Any]] = None
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+
+    def load(self) -> List[Dict[str, Any]]:
+        """Every recorded file, without touching the files themselves"""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {_COLUMNS} FROM upload_manifest").fetchall()
+        return [_row_to_info(row) for row in rows]
+
+    def get(self, file_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM upload_manifest WHERE file_id = ?", (file_id,)
+            ).fetchone()
+        return _row_to_info(row) if row is not None else None
+
+    def record(self, info: Dict[str, Any], sha256: Optional[str] = None) -> Dict[str, Any]:
+        """Store ``info`` with the file's current size, mtime and hash; returns the stored entry"""
+        stat = os.stat(info["file_path"])
+        entry = dict(info)
+        entry["sha256"] = sha256 or info.get("sha256") or sha256_file(info["file_path"])
+        entry["size"] = stat.st_size
+        entry["mtime"] = stat.st_mtime
+        self._write([entry])
+        return entry
+
+    def _write(self, entries: List[Dict[str, Any]]):
+        rows = [
+            (entry["file_id"], entry["filename"], entry["file_path"], entry["total_pages"],
+             entry["page_size"]["width"], entry["page_size"]["height"], entry["created_at"],
+             entry["sha256"], entry["size"], entry["mtime"])
+            for entry in entries
+        ]
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO upload_manifest ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.uploads_dir, "blobs", sha256[:2], f"{sha256}.pdf")
+
+    def store(self, file_id: str, filename: str, source_path: str, sha256: str,
+              created_at: Optional[str] = None, info: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], bool]:
+        """Register ``source_path`` as ``file_id``, taking the file over; returns ``(entry, deduplicated)``
+
+        If the content is already stored, the source file is dropped and the
+        new entry shares the existing blob and its metadata. Otherwise the
+        file is inspected (unless ``info`` already holds page count and size)
+        and moved into the blob store; inspection errors propagate and leave
+        the source file where it is.
+        """
+        created_at = created_at or datetime.now().isoformat()
+        blob_path = self.blob_path(sha256)
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM upload_manifest WHERE sha256 = ? LIMIT 1", (sha256,)
+            ).fetchone()
+        known = _row_to_info(row) if row is not None else None
+        if known is None or known["file_path"] != blob_path:
+            info = info or self.inspect(source_path)
+            known = {"total_pages": info["total_pages"], "page_size": info["page_size"]}
+        entry = {
+            "file_id": file_id,
+            "filename": filename,
+            "file_path": blob_path,
+            "total_pages": known["total_pages"],
+            "page_size": known["page_size"],
+            "created_at": created_at,
+            "sha256": sha256,
+        }
+        with self._lock:
+            # Serialised with release() across workers, so a blob can't vanish between the check and the insert
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                deduplicated = os.path.exists(blob_path)
+                if deduplicated:
+                    os.remove(source_path)
+                else:
+                    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                    os.replace(source_path, blob_path)
+                stat = os.stat(blob_path)
+                entry["size"] = stat.st_size
+                entry["mtime"] = stat.st_mtime
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO upload_manifest ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (entry["file_id"], entry["filename"], entry["file_path"], entry["total_pages"],
+                     entry["page_size"]["width"], entry["page_size"]["height"], entry["created_at"],
+                     entry["sha256"], entry["size"], entry["mtime"])
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return entry, deduplicated
+
+    def release(self, file_id: str) -> Optional[str]:
+        """Forget ``file_id``; deletes its blob if no other file_id uses it and returns that blob's hash"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT sha256, file_path FROM upload_manifest WHERE file_id = ?", (file_id,)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                sha256, file_path = row
+                self._conn.execute("DELETE FROM upload_manifest WHERE file_id = ?", (file_id,))
+                remaining = self._conn.execute(
+                    "SELECT COUNT(*) FROM upload_manifest WHERE file_path = ?", (file_path,)
+                ).fetchone()[0]
+                if remaining == 0 and os.path.exists(file_path):
+                    os.remove(file_path)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return sha256 if remaining == 0 else None
+
+    def references(self, sha256: str) -> int:
+        """How many file_ids share this content"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM upload_manifest WHERE sha256 = ?", (sha256,)).fetchone()[0]
+
+    def remove(self, file_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM upload_manifest WHERE file_id = ?", (file_id,))
+
+    def _inspect_file(self, file_id: str, filename: str, file_path: str, stat: os.stat_result) -> Dict[str, Any]:
+        info = self.inspect(file_path)
+        return {
+            "file_id": file_id,
+            "filename": filename,
+            "file_path": file_path,
+            "total_pages": info["total_pages"],
+            "page_size": info["page_size"],
+            "created_at": info.get("created_at") or datetime.fromtimestamp(os.path.getctime(file_path)).isoformat(),
+            "sha256": sha256_file(file_path),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+        }
+
+    def validate(self, info: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Check an entry against its file: the same entry if unchanged, a fresh one if the file
+        changed, None (and the entry dropped) if the file is gone or no longer a readable PDF"""
+        try:
+            stat = os.stat(info["file_path"])
+        except OSError:
+            self.remove(info["file_id"])
+            return None
+        if stat.st_size == info.get("size") and stat.st_mtime == info.get("mtime"):
+            return info
+        try:
+            fresh = self._inspect_file(info["file_id"], info["filename"], info["file_path"], stat)
+        except Exception as e:
+            print(f"Dropping unreadable upload {info['file_path']}: {e}")
+            self.remove(info["file_id"])
+            return None
+        fresh["created_at"] = info.get("created_at") or fresh["created_at"]
+        self._write([fresh])
+        return fresh
+
+    def _adopt(self, file_id: str, name: str, path: str) -> Dict[str, Any]:
+        """Move an upload stored the old way (``{file_id}_{name}.pdf``) into the blob store"""
+        filename = _original_name(file_id, name)
+        created_at = datetime.fromtimestamp(os.path.getctime(path)).isoformat()
+        entry, _deduplicated = self.store(file_id, filename, path, sha256_file(path), created_at)
+        return entry
+
+    def scan(self, migrate: bool = False) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """Pick up loose uploads and forget entries whose file disappeared
+
+        Loose ``uploads/*.pdf`` files that are new or changed are inspected
+        and hashed in parallel and registered in place. With ``migrate=True``
+        every loose file is moved into the blob store instead, and a copy of
+        content that is already stored is deleted. Returns
+        ``(new_or_changed_entries, removed_file_ids)``.
+        """
+        with self._lock:
+            known = {
+                file_id: (file_path, size, mtime)
+                for file_id, file_path, size, mtime in self._conn.execute(
+                    "SELECT file_id, file_path, size, mtime FROM upload_manifest"
+                )
+            }
+
+        candidates = []
+        if os.path.isdir(self.uploads_dir):
+            with os.scandir(self.uploads_dir) as entries:
+                for entry in entries:
+                    if not entry.name.lower().endswith(".pdf") or not entry.is_file():
+                        continue
+                    file_id = file_id_from_name(entry.name)
+                    stat = entry.stat()
+                    recorded = known.get(file_id)
+                    if not migrate and recorded is not None and recorded == (entry.path, stat.st_size, stat.st_mtime):
+                        continue
+                    candidates.append((file_id, entry.name, entry.path, stat))
+
+        def scan_candidate(candidate):
+            file_id, name, path, stat = candidate
+            try:
+                if migrate:
+                    return self._adopt(file_id, name, path)
+                return self._inspect_file(file_id, _original_name(file_id, name), path, stat)
+            except Exception as e:
+                print(f"Skipping invalid PDF {name}: {e}")
+                return None
+
+        changed: List[Dict[str, Any]] = []
+        if candidates:
+            with ThreadPoolExecutor(max_workers=max(1, self.scan_workers), thread_name_prefix="upload-scan") as pool:
+                changed = [entry for entry in pool.map(scan_candidate, candidates) if entry is not None]
+            if not migrate:
+                self._write(changed)
+
+        # One stat per file, however many file_ids share it
+        present = {path: os.path.exists(path) for path in {file_path for file_path, _size, _mtime in known.values()}}
+        seen = {entry["file_id"] for entry in changed}
+        removed = [file_id for file_id, (file_path, _size, _mtime) in known.items()
+                   if not present[file_path] and file_id not in seen]
+        for file_id in removed:
+            self.remove(file_id)
+
+        with self._lock:
+            files = self._conn.execute("SELECT COUNT(*) FROM upload_manifest").fetchone()[0]
+        self.last_scan = {"files": files, "migrate": migrate, "inspected": len(candidates),
+                          "changed": len(changed), "removed": len(removed)}
+        return changed, removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, blobs, blob_bytes, total_bytes = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT sha256), "
+                "(SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT sha256, size FROM upload_manifest)), "
+                "COALESCE(SUM(size), 0) FROM upload_manifest"
+            ).fetchone()
+        return {"db_path": self.db_path, "entries": count, "blobs": blobs, "blob_bytes": blob_bytes,
+                "bytes_saved_by_dedup": total_bytes - blob_bytes, "last_scan": self.last_scan}
+
+    def close(self):
+        self._conn.close()
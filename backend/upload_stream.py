@@ -0,0 +1,223 @@
+"""
+Streaming and resumable PDF uploads.
+
+``IncomingUpload`` writes an upload to a temp file chunk by chunk as it
+arrives. The first bytes must be a PDF header, the size limit is enforced
+the moment it is crossed and the SHA-256 is computed on the way through,
+so an upload is never held in memory whole.
+
+``ChunkedUploads`` keeps partial uploads on disk between requests: a
+client sends a large file in pieces, and after a dropped connection asks
+for the offset the server has and carries on from there. Each session is
+a ``.part`` file plus a small JSON sidecar, so any worker can take the
+next chunk.
+"""
+import hashlib
+import json
+import os
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+from upload_manifest import sha256_file
+
+PDF_MAGIC = b"%PDF-"
+
+
+class UploadRejected(Exception):
+    """An upload that can't be accepted; ``status_code`` is the HTTP status to answer with"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class IncomingUpload:
+    """Temp file that checks, measures and hashes an upload while it is written
+
+    With ``resume=True`` chunks are appended to what ``path`` already holds.
+    ``digest`` is the running hash of those bytes if the caller still has
+    it; without it the hash is computed from disk once the upload is done.
+    """
+
+    def __init__(self, path: str, max_bytes: int, resume: bool = False, digest: Optional[Any] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.size = os.path.getsize(path) if resume else 0
+        self.digest = digest if resume else hashlib.sha256()
+        self._head = b""
+        if self.size:
+            with open(path, "rb") as f:
+                self._head = f.read(len(PDF_MAGIC))
+        self._file = open(path, "ab" if resume else "wb")
+
+    def write(self, chunk: bytes):
+        if self.size + len(chunk) > self.max_bytes:
+            raise UploadRejected(413, f"Upload is larger than {self.max_bytes} bytes")
+        if len(self._head) < len(PDF_MAGIC):
+            # Refuse anything that isn't a PDF before taking the rest of the body
+            self._head = (self._head + chunk)[:len(PDF_MAGIC)]
+            if not PDF_MAGIC.startswith(self._head):
+                raise UploadRejected(400, "Not a PDF file")
+        self._file.write(chunk)
+        if self.digest is not None:
+            self.digest.update(chunk)
+        self.size += len(chunk)
+
+    def close(self):
+        self._file.close()
+
+    def finish(self):
+        """Close the file; the upload must hold at least a complete PDF header"""
+        self.close()
+        if self._head != PDF_MAGIC:
+            raise UploadRejected(400, "Not a PDF file")
+
+    def sha256(self) -> str:
+        return self.digest.hexdigest() if self.digest is not None else sha256_file(self.path)
+
+    def discard(self):
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class ChunkedUploads:
+    """Resumable uploads held in ``directory`` until they are completed, aborted or go stale"""
+
+    def __init__(self, directory: str, max_bytes: int, chunk_bytes: int, ttl_seconds: float = 24 * 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.chunk_bytes = chunk_bytes
+        self.ttl_seconds = ttl_seconds
+        # Running hash of sessions this process received chunks for: upload_id -> (offset, digest)
+        self._digests: Dict[str, Tuple[int, Any]] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, upload_id: str) -> Tuple[str, str]:
+        # upload ids are generated here; anything else can't name a session
+        name = str(uuid.UUID(upload_id))
+        return os.path.join(self.directory, f"{name}.json"), os.path.join(self.directory, f"{name}.part")
+
+    def _load(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            meta_path, _part_path = self._paths(upload_id)
+            with open(meta_path) as f:
+                return json.load(f)
+        except (ValueError, OSError):
+            return None
+
+    def _status(self, session: Dict[str, Any]) -> Dict[str, Any]:
+        _meta_path, part_path = self._paths(session["upload_id"])
+        return {**session, "offset": os.path.getsize(part_path), "chunk_size": self.chunk_bytes,
+                "max_bytes": self.max_bytes}
+
+    def create(self, filename: str, total_size: Optional[int] = None) -> Dict[str, Any]:
+        if total_size is not None and total_size > self.max_bytes:
+            raise UploadRejected(413, f"Upload is larger than {self.max_bytes} bytes")
+        self.expire()
+        upload_id = str(uuid.uuid4())
+        meta_path, part_path = self._paths(upload_id)
+        session = {"upload_id": upload_id, "filename": filename, "total_size": total_size, "created_at": time.time()}
+        open(part_path, "wb").close()
+        with open(meta_path, "w") as f:
+            json.dump(session, f)
+        self._digests[upload_id] = (0, hashlib.sha256())
+        return self._status(session)
+
+    def status(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        session = self._load(upload_id)
+        return self._status(session) if session is not None else None
+
+    def _require(self, upload_id: str) -> Dict[str, Any]:
+        session = self._load(upload_id)
+        if session is None:
+            raise UploadRejected(404, "Upload not found")
+        return session
+
+    def open_chunk(self, upload_id: str, offset: int) -> IncomingUpload:
+        """Writer for the next chunk, which must start where the stored bytes end"""
+        session = self._require(upload_id)
+        _meta_path, part_path = self._paths(upload_id)
+        current = os.path.getsize(part_path)
+        if offset != current:
+            raise UploadRejected(409, f"Upload is at offset {current}, not {offset}")
+        known = self._digests.pop(upload_id, None)
+        digest = known[1] if known is not None and known[0] == current else None
+        limit = session["total_size"] if session["total_size"] is not None else self.max_bytes
+        return IncomingUpload(part_path, limit, resume=True, digest=digest)
+
+    def chunk_written(self, upload_id: str, incoming: IncomingUpload) -> Dict[str, Any]:
+        """Close a chunk writer, keeping its running hash for the next chunk"""
+        incoming.close()
+        if incoming.digest is not None:
+            self._digests[upload_id] = (incoming.size, incoming.digest)
+        # Touch the sidecar so active sessions don't expire
+        meta_path, _part_path = self._paths(upload_id)
+        os.utime(meta_path)
+        return self._status(self._require(upload_id))
+
+    def complete(self, upload_id: str) -> Tuple[IncomingUpload, str]:
+        """Finished upload and its original filename; the session is gone afterwards"""
+        session = self._require(upload_id)
+        meta_path, part_path = self._paths(upload_id)
+        size = os.path.getsize(part_path)
+        if session["total_size"] is not None and size != session["total_size"]:
+            raise UploadRejected(409, f"Upload has {size} of {session['total_size']} bytes")
+        known = self._digests.pop(upload_id, None)
+        incoming = IncomingUpload(part_path, self.max_bytes, resume=True,
+                                  digest=known[1] if known is not None and known[0] == size else None)
+        os.remove(meta_path)
+        return incoming, session["filename"]
+
+    def temp_path(self) -> str:
+        """Temp file for a single-request streaming upload, on the same filesystem as the sessions"""
+        return os.path.join(self.directory, f"stream-{uuid.uuid4()}.tmp")
+
+    def abort(self, upload_id: str) -> bool:
+        self._digests.pop(upload_id, None)
+        try:
+            paths = self._paths(upload_id)
+        except ValueError:
+            return False
+        removed = False
+        for path in paths:
+            try:
+                os.remove(path)
+                removed = True
+            except OSError:
+                pass
+        return removed
+
+    def expire(self) -> int:
+        """Drop sessions that haven't received a chunk within the TTL, and temp files left by a crash"""
+        cutoff = time.time() - self.ttl_seconds
+        expired = 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) >= cutoff:
+                    continue
+                if name.endswith(".json"):
+                    expired += self.abort(name[:-len(".json")])
+                elif name.endswith(".tmp"):
+                    os.remove(path)
+            except OSError:
+                continue
+        return expired
+
+    def stats(self) -> Dict[str, Any]:
+        sessions, stored = 0, 0
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                sessions += 1
+            elif name.endswith(".part"):
+                try:
+                    stored += os.path.getsize(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+        return {"sessions": sessions, "stored_bytes": stored, "max_bytes": self.max_bytes,
+                "chunk_size": self.chunk_bytes}